@@ -12,7 +12,9 @@ from langgraph.prebuilt import ToolNode
 from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, PromptTemplate
 from langgraph.checkpoint.memory import MemorySaver
 from research_tool_rag.configs import config
+from research_tool_rag.db_store.qdrant import normalise_filters
 from research_tool_rag.rag.pipeline import RAGPipeline
+from research_tool_rag.utils.memo import model_name, template_version
 from research_tool_rag.utils.utils import setup_logging
 
 # Setup logging
@@ -53,22 +55,32 @@ def get_us_state_lawtype(
     law_type: LawType = ""
 ) -> Command:
     """Update state with US state abbreviation and optional law type."""
+    # The arguments come from the LLM: an unknown law type is dropped, not fatal.
+    try:
+        normalise_filters(state_abbrev, law_type)
+        note = "Updated state_code and law_type"
+    except ValueError as e:
+        law_type = None
+        note = f"Updated state_code; ignored law_type: {e}"
     return Command(update={
         "state_code": state_abbrev,
-        "law_type": law_type,
-        "messages": [ToolMessage("Updated state_code and law_type", tool_call_id=tool_call_id)]
+        "law_type": law_type or None,
+        "messages": [ToolMessage(note, tool_call_id=tool_call_id)]
     })
 
 # Bind tools to LLM
 llm_with_tools = pipeline.llm.bind_tools([get_us_state_lawtype])
 
+ASSISTANT_PROMPT = "Extract state code and law type from the following messages."
+QUERY_BUILDER_TEMPLATE = "Expand or refine the following legal query for clarity and precision:\nQuery: {query}\nExpanded query:"
+
 # Assistant node to extract state and law type
 def assistant(state: ExtractState):
     messages = trim_messages(
         state["messages"], max_tokens=100000, strategy="last", token_counter=pipeline.llm, allow_partial=False
     )
     response = llm_with_tools.invoke(
-        [SystemMessage(content="Extract state code and law type from the following messages.")] + messages[-1:]
+        [SystemMessage(content=ASSISTANT_PROMPT)] + messages[-1:]
     )
     return {"messages": [response], 'query':messages[0].content}
 
@@ -80,7 +92,7 @@ def query_builder(state: ExtractState):
             HumanMessagePromptTemplate(
                 prompt=PromptTemplate(
                     input_variables=["query"],
-                    template="Expand or refine the following legal query for clarity and precision:\nQuery: {query}\nExpanded query:"
+                    template=QUERY_BUILDER_TEMPLATE
                 )
             )
         ]
@@ -125,7 +137,15 @@ def gather_info(state: ExtractState)->  ExtractState:
 
 # Retrieval node using RAGPipeline
 def retrieve(state: ExtractState):
-    retrieved = pipeline.retrieve({"question": state["query"],"state":state['state_code']})
+    law_type = state.get("law_type")
+    try:
+        normalise_filters(state.get("state_code"), law_type)
+    except ValueError as e:
+        logger.warning(f"Retrieving without the law type filter: {e}")
+        law_type = None
+    retrieved = pipeline.retrieve(
+        {"question": state["query"], "state_code": state.get("state_code"), "law_type": law_type}
+    )
     return {"context": retrieved["context"]}
 
 # Generation node using RAGPipeline
@@ -137,11 +157,27 @@ def generate(state: ExtractState):
     generated = pipeline.generate(overall_state)
     return {"answer": generated["answer"], "sources": generated["sources"]}
 
+# Memoized nodes: the tool schema is part of the assistant's prompt, so it is versioned too
+memoized_assistant = pipeline.memo.wrap(
+    "assistant",
+    assistant,
+    key=lambda state: "\n".join([state["messages"][0].content, state["messages"][-1].content]),
+    version=template_version(ASSISTANT_PROMPT + str(get_us_state_lawtype.args)),
+    model=model_name(pipeline.llm),
+)
+memoized_query_builder = pipeline.memo.wrap(
+    "query_builder",
+    query_builder,
+    key=lambda state: state["query"],
+    version=template_version(QUERY_BUILDER_TEMPLATE),
+    model=model_name(pipeline.llm),
+)
+
 # Build LangGraph
 builder = StateGraph(ExtractState)
-builder.add_node("assistant", assistant)
+builder.add_node("assistant", memoized_assistant)
 builder.add_node("gather_info", gather_info)
-builder.add_node("query_builder", query_builder)
+builder.add_node("query_builder", memoized_query_builder)
 builder.add_node("state_checker_router",state_checker_router)
 builder.add_node("tools", ToolNode([get_us_state_lawtype]))
 builder.add_node("retrieve", retrieve)
@@ -6,14 +6,13 @@ from langchain import hub
 from langgraph.graph import START, StateGraph
 
 from research_tool_rag.configs import config
-from research_tool_rag.db_store.qdrant import QdrantDB
+from research_tool_rag.db_store.numpy_index import open_db
 from research_tool_rag.state.state_schema import InputState, OutputState, OverallState
 
 
 class ProfileAgent:
     def __init__(self):
-        self.db = QdrantDB()
-        self.vector_store = self.db.vector_store
+        self.db = open_db()
         self.prompt = hub.pull("rlm/rag-prompt")
         self.prompt.messages[0].prompt.template = (
             """You are a helpful and accurate assistant specialized in answering questions based on the index Akshay's profile. Use only the information provided in the retrieved context to answer the question. If the answer cannot be found in the context, clearly state that you don't know. Keep your answer concise and limited to a maximum of three sentences.\nQuestion: {question}\nContext: {context}\nAnswer:"""
@@ -77,7 +76,7 @@ class ProfileAgent:
         self.LawType = Literal["laws", "regulations"]
 
     def retrieve(self, state: InputState) -> OverallState:
-        retrieved_docs = self.vector_store.similarity_search(query=state["question"])
+        retrieved_docs = self.db.similarity_search(state["question"])
         breakpoint()  # For debugging, remove in production
         return {"question": state["question"], "context": retrieved_docs}
 
@@ -16,9 +16,7 @@ def ingest_profile(profile_path: str, collection_name: str = None):
     except Exception:
         config_collection = None
     collection = collection_name or config_collection or "PROFILE_COLLECTION"
-    qdb = QdrantDB()
-    if hasattr(qdb, "collection_name"):
-        qdb.collection_name = collection
+    qdb = QdrantDB(collection_name=collection)
     with open(profile_path, "r") as f:
         json_str = f.read()
     doc = Document(page_content=json_str, metadata={"source": str(profile_path)})
@@ -26,6 +24,7 @@ def ingest_profile(profile_path: str, collection_name: str = None):
         f"Indexing entire profile JSON from {profile_path} into Qdrant collection '{collection}'."
     )
     qdb.vector_store.add_documents(documents=[doc])
+    qdb.mark_changed()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,15 @@
+import json
+
 import requests
 import streamlit as st
 
-FASTAPI_RAG_ENDPOINT = "http://localhost:8000/rag"
+FASTAPI_RAG_STREAM_ENDPOINT = "http://localhost:8000/rag/stream"
+
+STATUS_BY_ROUTE = {
+    "retrieve": "Searching the statutes...",
+    "rewrite_query": "Rephrasing the question for search...",
+    "generate_direct_with_suggestions": "Answering...",
+}
 
 st.set_page_config(page_title="Lawyer's Chatbot", page_icon="💬")
 st.title("🦅 Il(l)eagle Chatbot")
@@ -29,6 +37,20 @@ for msg in st.session_state.messages:
                     st.markdown(f"- {source}")
 
 
+def iter_sse(response):
+    """Yield (event, data) pairs from a server-sent-events response."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:") :].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:") :].strip())
+
+
 # Function to handle user input or suggested prompt
 def process_user_input(prompt_text):
     st.session_state.messages.append({"role": "user", "content": prompt_text})
@@ -37,38 +59,61 @@ def process_user_input(prompt_text):
         {"role": msg["role"], "content": msg["content"]} for msg in st.session_state.messages
     ]
 
-    try:
-        with st.spinner("Thinking..."):
-            response = requests.post(
-                FASTAPI_RAG_ENDPOINT,
+    bot_response = "⚠️ No response from RAG."
+    suggested_prompts = []
+    sources = []
+    with st.chat_message("assistant"):
+        status = st.empty()
+        placeholder = st.empty()
+        status.caption("Thinking...")
+        try:
+            # Only connecting is bounded; the answer streams for as long as generation takes.
+            with requests.post(
+                FASTAPI_RAG_STREAM_ENDPOINT,
                 json={"query": prompt_text, "chat_history": chat_history_for_api},
-                timeout=10,
-            )
-            response.raise_for_status()
-            rag_output = response.json()
-
-        bot_response = rag_output.get("answer", "⚠️ No response from RAG.")
-        suggested_prompts = rag_output.get("suggested_prompts", [])
-        sources = rag_output.get("sources", [])
-
-    except Exception as e:
-        bot_response = f"⚠️ Error communicating with backend: {e}"
-        suggested_prompts = []
-        sources = []
+                stream=True,
+                timeout=(10, None),
+            ) as response:
+                response.raise_for_status()
+                streamed = ""
+                for event, data in iter_sse(response):
+                    if event == "classified":
+                        status.caption(STATUS_BY_ROUTE.get(data["route"], "Thinking..."))
+                    elif event == "sources":
+                        sources = data["sources"]
+                        status.caption(f"Found {len(sources)} sections, writing the answer...")
+                    elif event == "token":
+                        streamed += data["token"]
+                        placeholder.markdown(streamed + "▌")
+                    elif event == "answer":
+                        bot_response = data.get("answer", bot_response)
+                        suggested_prompts = data.get("suggested_prompts", [])
+                        sources = data.get("sources") or sources
+                        # Show the answer now; follow-up prompts arrive in a later event.
+                        placeholder.markdown(bot_response)
+                        if data.get("suggestions_id"):
+                            status.caption("Suggesting follow-up questions...")
+                    elif event == "suggestions":
+                        suggested_prompts = data.get("suggested_prompts", [])
+                    elif event == "error":
+                        raise RuntimeError(data.get("detail"))
+        except Exception as e:
+            bot_response = f"⚠️ Error communicating with backend: {e}"
+            suggested_prompts = []
+            sources = []
+
+        status.empty()
+        placeholder.markdown(bot_response)
+        if sources:
+            st.markdown("# Sources:")
+            for source in sources:
+                st.markdown(f"- {source}")
 
     st.session_state.messages.append(
         {"role": "assistant", "content": bot_response, "sources": sources}
     )
     st.session_state["suggested_prompts"] = suggested_prompts
 
-    with st.chat_message("assistant"):
-        st.markdown(bot_response)
-
-        if sources:
-            st.markdown("# Sources:")
-            for source in sources:
-                st.markdown(f"- {source}")
-
     # # Display assistant message immediately
     # with st.chat_message("assistant"):
     #     st.markdown(bot_response)
@@ -0,0 +1,180 @@
+"""
+Memory/recall/latency report for the dense vector storage settings (``CollectionSettings``).
+
+Copies the dense vectors and payloads of the configured collection (its first ``--limit``
+points) into one scratch collection per setting and runs the same questions against each.
+Recall@k is measured against an exact float32 search of the same collection, latency is
+that of single dense queries with the setting's search params. RAM is estimated from
+Qdrant's storage layout: the vectors kept in memory (float32, int8 or one bit per
+dimension), the HNSW links and, unless they are on disk, the payloads. Scratch collections
+are dropped afterwards unless ``--keep``.
+
+    python -m research_tool_rag.benchmarks.collection_settings --limit 50000 --k 10
+"""
+import argparse
+import json
+import math
+import time
+
+from qdrant_client import models
+
+from research_tool_rag.benchmarks.rag_concurrency import QUESTIONS
+from research_tool_rag.configs import config
+from research_tool_rag.db_store.qdrant import CollectionSettings, QdrantDB
+
+SETTINGS = {
+    "float32": CollectionSettings(),
+    "float32-disk": CollectionSettings(vectors_on_disk=True, payload_on_disk=True),
+    "scalar": CollectionSettings(quantization="scalar", vectors_on_disk=True, payload_on_disk=True),
+    "scalar-norescore": CollectionSettings(
+        quantization="scalar", rescore=False, vectors_on_disk=True, payload_on_disk=True
+    ),
+    "binary": CollectionSettings(
+        quantization="binary", oversampling=3.0, vectors_on_disk=True, payload_on_disk=True
+    ),
+    "binary-norescore": CollectionSettings(
+        quantization="binary", rescore=False, vectors_on_disk=True, payload_on_disk=True
+    ),
+    "scalar-m8": CollectionSettings(
+        quantization="scalar", vectors_on_disk=True, payload_on_disk=True, hnsw_m=8
+    ),
+    "scalar-m32": CollectionSettings(
+        quantization="scalar",
+        vectors_on_disk=True,
+        payload_on_disk=True,
+        hnsw_m=32,
+        hnsw_ef_construct=200,
+    ),
+}
+
+# Exact search ignoring the quantized copy: the recall reference.
+EXACT = models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+
+
+def ram_estimate(settings: CollectionSettings, points: int, dim: int, payload_bytes: int) -> int:
+    """Bytes of RAM the collection needs beyond the page cache."""
+    ram = 0 if settings.vectors_on_disk else points * dim * 4
+    if settings.always_ram:
+        if settings.quantization == "scalar":
+            ram += points * dim
+        elif settings.quantization == "binary":
+            ram += points * math.ceil(dim / 8)
+    # Level 0 of the graph holds up to 2 * m 4-byte links per point.
+    ram += points * settings.hnsw_m * 2 * 4
+    if not settings.payload_on_disk:
+        ram += payload_bytes
+    return ram
+
+
+def load_points(db: QdrantDB, limit: int):
+    points, offset = [], None
+    while len(points) < limit:
+        page, offset = db.client.scroll(
+            collection_name=db.collection_name,
+            limit=min(256, limit - len(points)),
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        for point in page:
+            vector = point.vector
+            if isinstance(vector, dict):
+                vector = vector[db.vector_store.vector_name]
+            points.append(models.PointStruct(id=point.id, vector=vector, payload=point.payload))
+        if offset is None:
+            break
+    return points
+
+
+def questions(db: QdrantDB, points, count: int):
+    """The fixed benchmark questions, then section names spread over the copied points."""
+    texts = list(QUESTIONS)
+    step = max(len(points) // max(count - len(texts), 1), 1)
+    for point in points[::step]:
+        name = (point.payload.get(db.vector_store.metadata_payload_key) or {}).get(
+            "hierarchical_name"
+        )
+        if name and name not in texts:
+            texts.append(name)
+    return [db.embeddings.embed_query(text) for text in texts[:count]]
+
+
+def build(db: QdrantDB, name: str, settings: CollectionSettings, points, dim: int) -> None:
+    if db.client.collection_exists(name):
+        db.client.delete_collection(name)
+    db.client.create_collection(
+        collection_name=name,
+        **settings.create_kwargs(dim, db.distance),
+        # Build the HNSW graph even for small samples, as it is for the real collection.
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1),
+    )
+    for start in range(0, len(points), 256):
+        db.client.upsert(collection_name=name, points=points[start : start + 256], wait=True)
+    while db.client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def measure(db: QdrantDB, name: str, settings: CollectionSettings, vectors, k: int):
+    recalls, latencies = [], []
+    for vector in vectors:
+        truth = db.client.query_points(name, query=vector, limit=k, search_params=EXACT).points
+        start = time.perf_counter()
+        found = db.client.query_points(
+            name, query=vector, limit=k, search_params=settings.search_params()
+        ).points
+        latencies.append(time.perf_counter() - start)
+        expected = {point.id for point in truth}
+        if expected:
+            recalls.append(len(expected & {point.id for point in found}) / len(expected))
+    return sum(recalls) / max(len(recalls), 1), latencies
+
+
+def _p(latencies, pct: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(int(len(latencies) * pct), len(latencies) - 1)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector storage settings.")
+    parser.add_argument("--settings", nargs="+", choices=list(SETTINGS), default=list(SETTINGS))
+    parser.add_argument("--limit", type=int, default=50_000, help="Points copied per setting.")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collections.")
+    args = parser.parse_args()
+
+    config.use_config("online")
+    db = QdrantDB()
+    points = load_points(db, args.limit)
+    if not points:
+        raise SystemExit(f"Collection {db.collection_name} is empty, ingest something first")
+    dim = len(points[0].vector)
+    payload_bytes = sum(len(json.dumps(point.payload, default=str)) for point in points)
+    vectors = questions(db, points, args.queries)
+    print(f"{len(points)} points of dimension {dim}, {len(vectors)} queries, k={args.k}")
+
+    print(
+        f"{'setting':>17} {'quant':>6} {'rescore':>7} {'on disk':>7} {'m':>3} {'ef_c':>5} "
+        f"{'RAM MB':>8} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7}"
+    )
+    for label in args.settings:
+        settings = SETTINGS[label]
+        name = f"{db.collection_name}_bench_{label.replace('-', '_')}"
+        build(db, name, settings, points, dim)
+        try:
+            recall, latencies = measure(db, name, settings, vectors, args.k)
+        finally:
+            if not args.keep:
+                db.client.delete_collection(name)
+        ram = ram_estimate(settings, len(points), dim, payload_bytes)
+        print(
+            f"{label:>17} {settings.quantization or '-':>6} "
+            f"{'yes' if settings.quantization and settings.rescore else '-':>7} "
+            f"{'yes' if settings.vectors_on_disk else '-':>7} {settings.hnsw_m:>3} "
+            f"{settings.hnsw_ef_construct:>5} {ram / 2**20:>8.1f} {recall:>7.3f} "
+            f"{_p(latencies, 0.5):>7.2f} {_p(latencies, 0.95):>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
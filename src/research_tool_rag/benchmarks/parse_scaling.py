@@ -0,0 +1,51 @@
+"""
+Parse-only scaling benchmark for the multi-process parsing mode of the ingest pipeline.
+
+Parses the same set of XML files once per worker count and reports throughput and speedup
+relative to a single worker. Nothing is embedded or written to Qdrant.
+
+    python -m research_tool_rag.benchmarks.parse_scaling --content_set ny-laws --workers 1 2 4 8 16
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+from research_tool_rag.preprocessing.parallel import parse_file, parse_files
+
+
+def run(files, workers: int):
+    start = time.perf_counter()
+    if workers == 1:
+        sections = sum(len(parse_file(path)[1]) for path in files)
+    else:
+        sections = sum(len(records) for _, records, _ in parse_files(files, workers))
+    return sections, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel XML parsing.")
+    parser.add_argument("--content_set", type=str, required=True)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, os.cpu_count() or 1])
+    parser.add_argument("--limit", type=int, default=None, help="Only parse the first N files.")
+    args = parser.parse_args()
+
+    root = Path(__file__).parent.parent.parent.parent
+    files = sorted(root.glob(f"data/00.raw/{args.content_set}/*/**/*.xml"))[: args.limit]
+    # Largest files first so one big title does not end up alone at the tail of the run.
+    files.sort(key=lambda path: path.stat().st_size, reverse=True)
+    print(f"{len(files)} files, {sum(p.stat().st_size for p in files) / 2**20:.1f} MB")
+
+    baseline = None
+    print(f"{'workers':>7} {'sections':>9} {'seconds':>8} {'sections/s':>11} {'speedup':>8}")
+    for workers in sorted(set(args.workers)):
+        sections, seconds = run(files, workers)
+        baseline = baseline or seconds
+        print(
+            f"{workers:>7} {sections:>9} {seconds:>8.2f} "
+            f"{sections / seconds:>11.1f} {baseline / seconds:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Concurrency benchmark for the RAG serving path.
+
+Sends the same burst of questions through the blocking path (``RAGPipeline.run`` on a
+40-thread pool, which is what FastAPI gives a sync ``def`` endpoint) and through the async
+path (``RAGPipeline.arun`` gathered on one event loop, as the async endpoint does), and
+reports throughput and latency percentiles for each concurrency level. Uses the configured
+LLM, embedding model and Qdrant, so numbers include real network latency. The questions
+repeat, so the answer cache, node memo and embedding cache are turned off: every request
+does the full work, and the async run is not served from what the sync run cached.
+
+    python -m research_tool_rag.benchmarks.rag_concurrency --concurrency 10 50 200 --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from research_tool_rag.configs import config
+from research_tool_rag.rag.pipeline import RAGPipeline
+
+# Default size of the AnyIO thread limiter Starlette runs sync endpoints on.
+SYNC_THREADS = 40
+
+QUESTIONS = [
+    "What happens to unclaimed bank deposits in New York?",
+    "Who can register a vessel on the New York canal system?",
+    "What are the penalties for violating agricultural market regulations in New York?",
+    "How long before abandoned property is turned over to the state comptroller?",
+]
+
+
+async def _timed(call, question: str, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        start = time.perf_counter()
+        await call(question)
+        return time.perf_counter() - start
+
+
+async def run_sync(pipeline: RAGPipeline, questions, concurrency: int):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    with ThreadPoolExecutor(max_workers=SYNC_THREADS) as pool:
+
+        async def call(question):
+            await loop.run_in_executor(pool, pipeline.run, question)
+
+        return await asyncio.gather(*(_timed(call, q, semaphore) for q in questions))
+
+
+async def run_async(pipeline: RAGPipeline, questions, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(_timed(pipeline.arun, q, semaphore) for q in questions))
+
+
+def _percentile(latencies, pct: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(int(len(latencies) * pct), len(latencies) - 1)]
+
+
+async def bench(pipeline: RAGPipeline, questions, concurrency_levels):
+    # Everything runs on one event loop: the async Qdrant and LLM clients bind to the loop
+    # they are first used on.
+    print(
+        f"{'path':>5} {'conc':>5} {'requests':>9} {'seconds':>8} {'req/s':>7} "
+        f"{'p50 s':>6} {'p95 s':>6}"
+    )
+    for concurrency in concurrency_levels:
+        for name, runner in (("sync", run_sync), ("async", run_async)):
+            start = time.perf_counter()
+            latencies = await runner(pipeline, questions, concurrency)
+            seconds = time.perf_counter() - start
+            print(
+                f"{name:>5} {concurrency:>5} {len(latencies):>9} {seconds:>8.2f} "
+                f"{len(latencies) / seconds:>7.1f} {statistics.median(latencies):>6.2f} "
+                f"{_percentile(latencies, 0.95):>6.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async RAG serving.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    config.use_config("online")
+    config.answer_cache_enabled = False
+    config.node_memo_ttls = {}
+    config.embedding_cache_path = None
+    pipeline = RAGPipeline()
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.requests)]
+    asyncio.run(bench(pipeline, questions, sorted(set(args.concurrency))))
+
+
+if __name__ == "__main__":
+    main()
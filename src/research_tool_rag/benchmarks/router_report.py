@@ -0,0 +1,113 @@
+"""
+Offline accuracy/latency report for the local query router against the LLM router.
+
+Classifies a labelled evaluation set (disjoint from the router's own examples) with
+``LocalRouter`` and with the ``classify_query`` LLM prompt, and reports per router:
+coverage (questions decided without abstaining), accuracy on decided questions, agreement
+with the LLM and latency. The local router is timed end to end through ``route()``,
+including its question embedding call (the embedding cache is bypassed), next to the LLM
+call it replaces. A margin sweep shows the coverage/accuracy trade-off to pick
+``router_margin`` for the configured embedding model.
+
+    python -m research_tool_rag.benchmarks.router_report --margins 0 0.02 0.05 0.1
+"""
+import argparse
+import time
+
+from research_tool_rag.configs import config
+from research_tool_rag.rag.router import GENERAL, HYDE, RETRIEVAL, LocalRouter
+
+EVAL = [
+    ("hey", GENERAL),
+    ("thank you so much", GENERAL),
+    ("what's your name?", GENERAL),
+    ("can you help me with something?", GENERAL),
+    ("what does 'statute of frauds' mean in general?", GENERAL),
+    ("good evening!", GENERAL),
+    ("What happens to unclaimed wages held by an employer in New York?", RETRIEVAL),
+    (
+        "How long can a utility keep an unclaimed customer deposit before it is abandoned?",
+        RETRIEVAL,
+    ),
+    ("What permits are needed to build a dock on a New York canal?", RETRIEVAL),
+    ("Can the canal corporation charge tolls for recreational boats?", RETRIEVAL),
+    ("What does § 1310 of the New York abandoned property law require?", RETRIEVAL),
+    ("What must a holder of abandoned property do before paying it to the comptroller?", RETRIEVAL),
+    ("What is the penalty for failing to report abandoned property on time?", RETRIEVAL),
+    ("stuff about canals", HYDE),
+    ("unclaimed money", HYDE),
+    ("fines?", HYDE),
+    ("my boat thing", HYDE),
+    ("property rules in ny", HYDE),
+    ("help with a deposit", HYDE),
+]
+
+
+def _p(latencies, pct: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(int(len(latencies) * pct), len(latencies) - 1)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the local router with the LLM router.")
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.0, 0.02, 0.05, 0.1])
+    parser.add_argument("--skip_llm", action="store_true", help="Only evaluate the local router.")
+    args = parser.parse_args()
+
+    config.use_config("online")
+    from research_tool_rag.rag.pipeline import RAGPipeline
+
+    # The raw embedding model, not the cached one: a new question pays for the call.
+    embeddings = config.embeddings
+    router = LocalRouter(
+        embeddings, min_similarity=config.router_min_similarity, margin=config.router_margin
+    )
+    centroids = router.centroids()
+
+    latencies = []
+    for question, _ in EVAL:
+        start = time.perf_counter()
+        router.route(question)
+        latencies.append(time.perf_counter() - start)
+    print(
+        f"local router (margin {router.margin}, embedding included): "
+        f"p50 {_p(latencies, 0.5):.1f} ms, p95 {_p(latencies, 0.95):.1f} ms"
+    )
+    # The margin sweep only needs each question's vector once.
+    vectors = [embeddings.embed_query(question) for question, _ in EVAL]
+
+    llm_labels = {}
+    if not args.skip_llm:
+        pipeline = RAGPipeline()
+        latencies = []
+        for question, expected in EVAL:
+            start = time.perf_counter()
+            raw = pipeline.llm_invoke(pipeline._classify_prompt({"question": question}))
+            latencies.append(time.perf_counter() - start)
+            llm_labels[question] = raw.strip().lower()
+        correct = sum(llm_labels[q] == expected for q, expected in EVAL)
+        print(
+            f"llm router: accuracy {correct / len(EVAL):.2%}, "
+            f"p50 {_p(latencies, 0.5):.1f} ms, p95 {_p(latencies, 0.95):.1f} ms"
+        )
+
+    print(f"{'margin':>6} {'coverage':>9} {'accuracy':>9} {'agree llm':>10}")
+    for margin in args.margins:
+        router.margin = margin
+        decided = correct = agree = 0
+        for (question, expected), vector in zip(EVAL, vectors):
+            label = router.rule(question) or router.decide(vector, centroids)[0]
+            if label is None:
+                continue
+            decided += 1
+            correct += label == expected
+            agree += label == llm_labels.get(question)
+        print(
+            f"{margin:>6.2f} {decided / len(EVAL):>9.2%} "
+            f"{correct / decided if decided else 0:>9.2%} "
+            f"{agree / decided if decided and llm_labels else 0:>10.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
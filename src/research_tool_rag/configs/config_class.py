@@ -1,6 +1,7 @@
 import getpass
 import logging
 import os
+from pathlib import Path
 from typing import Literal
 
 from langchain.chat_models import init_chat_model
@@ -8,6 +9,8 @@ from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 # from src.research_tool_rag.configs.defaults import defaults
 
+DATA_DIR = Path(__file__).parent.parent.parent.parent.resolve() / "data"
+
 
 if not os.environ.get("GOOGLE_API_KEY"):
     os.environ["GOOGLE_API_KEY"] = getpass.getpass("Enter API key for Google Gemini: ")
@@ -16,6 +19,7 @@ config_mode = {
     "online": {
         "llm": init_chat_model("gemini-2.0-flash", model_provider="google_genai"),
         "embeddings": GoogleGenerativeAIEmbeddings(model="models/embedding-001"),
+        "embedding_dim": 768,
         "db_url": "localhost",
         "db_port": 6333,
         "collection_name": "US_LAWS",
@@ -44,5 +48,99 @@ class Config:
         )
         self.llm = model_db_config.get("llm", "None")
         self.embeddings = model_db_config.get("embeddings", "None")
+        # None means "ask the embedding model", which costs one embedding call per QdrantDB.
+        self.embedding_dim = model_db_config.get("embedding_dim", None)
         self.db_url = model_db_config.get("db_url", "localhost")
         self.db_port = model_db_config.get("db_port", 6333)
+        # Embedded Qdrant inside this process instead of the server at db_url:db_port:
+        # ":memory:" (gone on exit) or a directory, which one process can open at a time.
+        self.db_path = model_db_config.get("db_path", None)
+        # Dense-only collections with at most numpy_index_max_points points are served from
+        # an in-process NumPy copy (see db_store.numpy_index.open_db), stored as float32 or
+        # float16; 0 turns this off. Hybrid collections listed here (names or aliases) are
+        # served from it too, without BM25 fusion.
+        self.numpy_index_collections = model_db_config.get("numpy_index_collections", ())
+        self.numpy_index_max_points = model_db_config.get("numpy_index_max_points", 5_000)
+        self.numpy_index_dir = model_db_config.get("numpy_index_dir", DATA_DIR / "06.numpy_index")
+        self.numpy_index_dtype = model_db_config.get("numpy_index_dtype", "float32")
+        # Persistent embedding cache shared by ingestion and queries; None disables it.
+        self.embedding_cache_path = model_db_config.get(
+            "embedding_cache_path", DATA_DIR / "03.embedding_cache" / "embeddings.sqlite3"
+        )
+        self.embedding_cache_max_entries = model_db_config.get(
+            "embedding_cache_max_entries", 500_000
+        )
+        # "sections" regroups chunk hits into whole sections, "chunks" returns raw chunk hits.
+        self.retrieval_mode = model_db_config.get("retrieval_mode", "sections")
+        # Dense + BM25 sparse search fused with RRF; needs a collection created with it.
+        self.hybrid_retrieval = model_db_config.get("hybrid_retrieval", True)
+        # Dense vector storage, applied when a collection is created (see CollectionSettings;
+        # compare settings on the real corpus with benchmarks.collection_settings).
+        # vector_quantization: None, "scalar" (int8) or "binary"; quantized searches rescore
+        # quantization_oversampling x k candidates with the original vectors.
+        self.vector_quantization = model_db_config.get("vector_quantization", None)
+        self.quantization_always_ram = model_db_config.get("quantization_always_ram", True)
+        self.quantization_rescore = model_db_config.get("quantization_rescore", True)
+        self.quantization_oversampling = model_db_config.get("quantization_oversampling", 2.0)
+        self.vectors_on_disk = model_db_config.get("vectors_on_disk", False)
+        self.payload_on_disk = model_db_config.get("payload_on_disk", False)
+        self.hnsw_m = model_db_config.get("hnsw_m", 16)
+        self.hnsw_ef_construct = model_db_config.get("hnsw_ef_construct", 100)
+        self.hnsw_ef = model_db_config.get("hnsw_ef", None)
+        # Semantic answer cache: answers are reused for questions at least this similar.
+        self.answer_cache_enabled = model_db_config.get("answer_cache_enabled", True)
+        self.answer_cache_threshold = model_db_config.get("answer_cache_threshold", 0.95)
+        self.answer_cache_ttl = model_db_config.get("answer_cache_ttl", 7 * 24 * 3600)
+        self.answer_cache_max_entries = model_db_config.get("answer_cache_max_entries", 10_000)
+        # Memoized LLM-calling graph nodes: {node name: TTL seconds}; unlisted nodes always run.
+        self.node_memo_path = model_db_config.get(
+            "node_memo_path", DATA_DIR / "04.node_memo" / "memo.sqlite3"
+        )
+        self.node_memo_ttls = model_db_config.get(
+            "node_memo_ttls",
+            {
+                "classify_query": 30 * 24 * 3600,
+                "rewrite_query": 7 * 24 * 3600,
+                "assistant": 7 * 24 * 3600,
+                "query_builder": 7 * 24 * 3600,
+            },
+        )
+        self.node_memo_lru_size = model_db_config.get("node_memo_lru_size", 1024)
+        # Local query router in front of the classify LLM call; thresholds are cosine
+        # similarities, tune them per embedding model with benchmarks.router_report.
+        self.router_enabled = model_db_config.get("router_enabled", True)
+        self.router_min_similarity = model_db_config.get("router_min_similarity", 0.55)
+        self.router_margin = model_db_config.get("router_margin", 0.05)
+        # Start retrieval alongside classify_query instead of after it.
+        self.speculative_retrieval = model_db_config.get("speculative_retrieval", True)
+        # Cross-encoder rerank between retrieve and generate: retrieval returns
+        # rerank_candidates hits and the best rerank_top_n reach the prompt. Skipped when less
+        # than the estimated rerank time plus rerank_deadline_reserve seconds (kept for
+        # generation) is left before the request deadline.
+        self.rerank_enabled = model_db_config.get("rerank_enabled", False)
+        self.rerank_model = model_db_config.get(
+            "rerank_model", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+        )
+        self.rerank_top_n = model_db_config.get("rerank_top_n", 4)
+        self.rerank_candidates = model_db_config.get("rerank_candidates", 40)
+        self.rerank_batch_size = model_db_config.get("rerank_batch_size", 16)
+        self.rerank_deadline_reserve = model_db_config.get("rerank_deadline_reserve", 3.0)
+        # Retrieved passages are deduplicated and cut down to this many prompt tokens;
+        # sections longer than context_max_passage_tokens keep their most relevant sentences.
+        self.context_packing_enabled = model_db_config.get("context_packing_enabled", True)
+        self.context_token_budget = model_db_config.get("context_token_budget", 3000)
+        self.context_max_passage_tokens = model_db_config.get("context_max_passage_tokens", 1200)
+        self.context_dedup_threshold = model_db_config.get("context_dedup_threshold", 0.8)
+        # Follow-up prompts are generated after the answer is returned, by suggestions_llm
+        # (None: the answering llm; a cheaper model works well) and fetched by id within ttl.
+        self.suggestions_enabled = model_db_config.get("suggestions_enabled", True)
+        self.suggestions_llm = model_db_config.get("suggestions_llm", None)
+        self.suggestions_ttl = model_db_config.get("suggestions_ttl", 300.0)
+        # astream waits this long for them after the answer, then sends a pending event.
+        self.suggestions_stream_wait = model_db_config.get("suggestions_stream_wait", 10.0)
+        # Follow-up questions stored in section payloads by rag.enrich_follow_ups are used as
+        # suggested_prompts when the retrieved sections have them (no LLM call at all).
+        self.follow_ups_from_payload = model_db_config.get("follow_ups_from_payload", True)
+        self.follow_ups_store_path = model_db_config.get(
+            "follow_ups_store_path", DATA_DIR / "05.follow_ups" / "follow_ups.sqlite3"
+        )
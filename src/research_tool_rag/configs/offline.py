@@ -5,6 +5,7 @@ from langchain_ollama import OllamaEmbeddings, OllamaLLM
 model_db_config = {
     "llm": OllamaLLM(model="mistral"),
     "embeddings": OllamaEmbeddings(model="mistral"),
+    "embedding_dim": 4096,
     "db_url": "localhost",
     "db_port": 6333,
     "collection_name": "US_LAWS_offline",
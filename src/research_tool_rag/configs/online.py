@@ -11,6 +11,7 @@ if not os.environ.get("GOOGLE_API_KEY"):
 model_db_config = {
     "llm": init_chat_model("gemini-2.0-flash", model_provider="google_genai"),
     "embeddings": GoogleGenerativeAIEmbeddings(model="models/embedding-001"),
+    "embedding_dim": 768,
     "db_url": "localhost",
     "db_port": 6333,
     "collection_name": "US_LAWS",
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Optional
+
+from qdrant_client import models
+
+from research_tool_rag.db_store.qdrant import QdrantDB
+from research_tool_rag.utils.utils import text_hash
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """
+    Caches final answers (``OutputState`` dicts) by question embedding in a dedicated Qdrant
+    collection, ``<collection>_answer_cache``.
+
+    A lookup returns the stored answer of the nearest cached question if its similarity is
+    at least ``threshold``, so rephrasings of a question already answered skip the whole
+    graph. Answers are only shared within one retrieval ``scope`` (the state / law type
+    filter they were retrieved under, ``"*"`` for any). Entries are tagged with the
+    concrete collection that served them (``QdrantDB.resolve()``): once a reindex is
+    promoted, older entries stop matching and are removed on the next eviction pass.
+    Entries also expire after ``ttl`` seconds, and at most ``max_entries`` are kept, least
+    recently used evicted first.
+    """
+
+    # Re-resolving the alias on every request would add a round trip per lookup.
+    VERSION_TTL = 30.0
+    # Run an eviction pass every EVICT_EVERY stores.
+    EVICT_EVERY = 100
+
+    def __init__(
+        self,
+        db: QdrantDB,
+        threshold: float = 0.95,
+        ttl: Optional[float] = 7 * 24 * 3600,
+        max_entries: Optional[int] = 10_000,
+    ):
+        self.db = db
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.collection_name = f"{db.alias or db.collection_name}_answer_cache"
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        self._version = None
+        self._version_checked = 0.0
+
+        if not db.client.collection_exists(self.collection_name):
+            self._create()
+
+    def _create(self) -> None:
+        logger.info(f"Creating answer cache collection {self.collection_name}")
+        self.db.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=models.VectorParams(size=self.db.vector_size, distance="Cosine"),
+        )
+        if self.db.local:
+            # No payload indexes in embedded mode, see QdrantDB._ensure_payload_indexes.
+            return
+        for key, schema in (
+            ("version", models.PayloadSchemaType.KEYWORD),
+            ("scope", models.PayloadSchemaType.KEYWORD),
+            ("created_at", models.PayloadSchemaType.FLOAT),
+            ("accessed_at", models.PayloadSchemaType.FLOAT),
+        ):
+            self.db.client.create_payload_index(self.collection_name, key, schema)
+
+    @classmethod
+    def from_config(cls, db: QdrantDB, config) -> Optional["SemanticAnswerCache"]:
+        if not getattr(config, "answer_cache_enabled", False):
+            return None
+        return cls(
+            db,
+            threshold=config.answer_cache_threshold,
+            ttl=config.answer_cache_ttl,
+            max_entries=config.answer_cache_max_entries,
+        )
+
+    def _version_expired(self) -> bool:
+        return time.monotonic() - self._version_checked > self.VERSION_TTL
+
+    def _set_version(self, version: Optional[str]) -> str:
+        self._version = version or self.db.collection_name
+        self._version_checked = time.monotonic()
+        return self._version
+
+    def version(self) -> str:
+        if self._version_expired():
+            self._set_version(self.db.resolve())
+        return self._version
+
+    async def aversion(self) -> str:
+        if self._version_expired():
+            self._set_version(await self.db.aresolve())
+        return self._version
+
+    def _filter(self, version: str, scope: str) -> models.Filter:
+        must = [
+            models.FieldCondition(key="version", match=models.MatchValue(value=version)),
+            models.FieldCondition(key="scope", match=models.MatchValue(value=scope)),
+        ]
+        if self.ttl is not None:
+            must.append(
+                models.FieldCondition(
+                    key="created_at", range=models.Range(gte=time.time() - self.ttl)
+                )
+            )
+        return models.Filter(must=must)
+
+    @staticmethod
+    def _point_id(version: str, scope: str, question: str) -> str:
+        question = " ".join(question.lower().split())
+        return str(uuid.UUID(text_hash(f"{version}:{scope}:{question}")))
+
+    def _query(self, vector, version: str, scope: str) -> dict:
+        return dict(
+            collection_name=self.collection_name,
+            query=vector,
+            query_filter=self._filter(version, scope),
+            score_threshold=self.threshold,
+            limit=1,
+            with_payload=True,
+        )
+
+    def _hit(self, points) -> Optional[dict]:
+        if not points:
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"Answer cache hit ({points[0].score:.3f}): {points[0].payload['question']!r}")
+        return points[0].payload["answer"]
+
+    def lookup(self, question: str, scope: str = "*:*") -> Optional[dict]:
+        vector = self.db.embeddings.embed_query(question)
+        points = self.db.client.query_points(**self._query(vector, self.version(), scope)).points
+        if points:
+            self.db.client.set_payload(
+                self.collection_name,
+                {"accessed_at": time.time()},
+                points=[points[0].id],
+                wait=False,
+            )
+        return self._hit(points)
+
+    async def alookup(self, question: str, scope: str = "*:*") -> Optional[dict]:
+        vector = await self.db.embeddings.aembed_query(question)
+        version = await self.aversion()
+        response = await self.db.async_client.query_points(**self._query(vector, version, scope))
+        if response.points:
+            await self.db.async_client.set_payload(
+                self.collection_name,
+                {"accessed_at": time.time()},
+                points=[response.points[0].id],
+                wait=False,
+            )
+        return self._hit(response.points)
+
+    def _point(
+        self, question: str, answer: dict, vector, version: str, scope: str
+    ) -> models.PointStruct:
+        now = time.time()
+        return models.PointStruct(
+            id=self._point_id(version, scope, question),
+            vector=vector,
+            payload={
+                "question": question,
+                "answer": answer,
+                "version": version,
+                "scope": scope,
+                "created_at": now,
+                "accessed_at": now,
+            },
+        )
+
+    def store(self, question: str, answer: dict, scope: str = "*:*") -> None:
+        # Same query embedding as the lookup, so this is served by the embedding cache.
+        vector = self.db.embeddings.embed_query(question)
+        point = self._point(question, answer, vector, self.version(), scope)
+        self.db.client.upsert(self.collection_name, points=[point], wait=False)
+        self._stores += 1
+        if self._stores % self.EVICT_EVERY == 0:
+            self.evict()
+
+    async def astore(self, question: str, answer: dict, scope: str = "*:*") -> None:
+        vector = await self.db.embeddings.aembed_query(question)
+        point = self._point(question, answer, vector, await self.aversion(), scope)
+        await self.db.async_client.upsert(self.collection_name, points=[point], wait=False)
+        self._stores += 1
+        if self._stores % self.EVICT_EVERY == 0:
+            await asyncio.to_thread(self.evict)
+
+    def evict(self) -> None:
+        """Drop stale-version and expired entries, then the least recently used overflow."""
+        stale = [
+            models.Filter(
+                must_not=[
+                    models.FieldCondition(
+                        key="version", match=models.MatchValue(value=self.version())
+                    )
+                ]
+            )
+        ]
+        if self.ttl is not None:
+            stale.append(
+                models.FieldCondition(
+                    key="created_at", range=models.Range(lt=time.time() - self.ttl)
+                )
+            )
+        self.db.client.delete(self.collection_name, points_selector=models.Filter(should=stale))
+
+        if self.max_entries is None:
+            return
+        excess = self.db.client.count(self.collection_name).count - self.max_entries
+        if excess > 0:
+            points, _ = self.db.client.scroll(
+                self.collection_name,
+                limit=excess,
+                order_by=models.OrderBy(key="accessed_at", direction="asc"),
+                with_payload=False,
+            )
+            self.db.client.delete(self.collection_name, points_selector=[p.id for p in points])
+            logger.info(f"Evicted {len(points)} least recently used answers")
+
+    def clear(self) -> None:
+        """Drop every cached answer, e.g. after re-ingesting into the same collection."""
+        self.db.client.delete_collection(self.collection_name)
+        self._create()
+        logger.info(f"Cleared answer cache {self.collection_name}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "collection": self.collection_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
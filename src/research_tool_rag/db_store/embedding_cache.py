@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from research_tool_rag.utils.kv_store import SqliteKVStore
+from research_tool_rag.utils.utils import text_hash
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings object with a persistent local cache, so re-ingesting unchanged
+    sections and repeated questions do not pay API latency and quota again.
+
+    Keys are ``(model name, query|document, utils.text_hash(text))``. The query/document
+    kind is part of the key because models such as Gemini embed the same text differently
+    for retrieval queries and for indexed documents.
+    """
+
+    def __init__(self, embeddings: Embeddings, store: SqliteKVStore, model_name: str = None):
+        self.embeddings = embeddings
+        self.store = store
+        self.model_name = model_name or getattr(embeddings, "model", type(embeddings).__name__)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _key(self, kind: str, text: str) -> Optional[str]:
+        # text_hash rejects empty strings; those are simply never cached.
+        if not text.strip():
+            return None
+        return f"{self.model_name}:{kind}:{text_hash(text)}"
+
+    def _lookup(self, kind: str, texts: List[str]):
+        keys = [self._key(kind, text) for text in texts]
+        found = self.store.get_many(key for key in keys if key is not None)
+        vectors = [
+            np.frombuffer(found[key], dtype=np.float32).tolist() if key in found else None
+            for key in keys
+        ]
+        # Deduplicate misses so a batch with repeated texts embeds each text once.
+        missing: Dict[str, List[int]] = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(texts[i], []).append(i)
+        # Both count requested texts: a text repeated in a batch counts every time, even
+        # though it is embedded once.
+        misses = sum(len(positions) for positions in missing.values())
+        with self._lock:
+            self.hits += len(texts) - misses
+            self.misses += misses
+        return keys, vectors, missing
+
+    def _fill(self, keys, vectors, missing, embedded: List[List[float]]) -> List[List[float]]:
+        new_entries = {}
+        for positions, vector in zip(missing.values(), embedded):
+            for i in positions:
+                vectors[i] = vector
+            if keys[positions[0]] is not None:
+                new_entries[keys[positions[0]]] = np.asarray(vector, dtype=np.float32).tobytes()
+        self.store.put_many(new_entries)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._lookup("document", texts)
+        if missing:
+            embedded = self.embeddings.embed_documents(list(missing))
+            vectors = self._fill(keys, vectors, missing, embedded)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, vectors, missing = self._lookup("query", [text])
+        if missing:
+            vectors = self._fill(keys, vectors, missing, [self.embeddings.embed_query(text)])
+        return vectors[0]
+
+    # SQLite reads and writes go through a worker thread to keep the event loop free.
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = await asyncio.to_thread(self._lookup, "document", texts)
+        if missing:
+            embedded = await self.embeddings.aembed_documents(list(missing))
+            vectors = await asyncio.to_thread(self._fill, keys, vectors, missing, embedded)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, vectors, missing = await asyncio.to_thread(self._lookup, "query", [text])
+        if missing:
+            embedded = [await self.embeddings.aembed_query(text)]
+            vectors = await asyncio.to_thread(self._fill, keys, vectors, missing, embedded)
+        return vectors[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# One wrapper per (embeddings object, cache file) so every QdrantDB in the process shares
+# the same hit/miss counters.
+_cached: Dict[tuple, CachedEmbeddings] = {}
+_cached_lock = threading.Lock()
+
+
+def cached_embeddings(
+    embeddings: Embeddings, path: Union[str, Path], max_entries: Optional[int] = None
+) -> CachedEmbeddings:
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings
+    key = (id(embeddings), str(path))
+    with _cached_lock:
+        if key not in _cached:
+            logger.info(f"Caching embeddings in {path}")
+            _cached[key] = CachedEmbeddings(embeddings, SqliteKVStore(path, max_entries))
+        return _cached[key]
+
+
+def embedding_cache_stats() -> List[dict]:
+    return [wrapper.stats() for wrapper in _cached.values()]
@@ -0,0 +1,550 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import models
+
+from research_tool_rag.configs import config
+from research_tool_rag.db_store.qdrant import QdrantDB
+from research_tool_rag.preprocessing.chunking import Chunk, stitch_chunks
+
+logger = logging.getLogger(__name__)
+
+# Scores match Qdrant's for these: cosine similarity and dot product, higher is better.
+DISTANCES = ("Cosine", "Dot")
+
+
+class NumpyIndex:
+    """
+    Dense vectors in one matrix (float32, or float16 for half the memory), with payloads
+    kept alongside and filter fields turned into NumPy columns.
+
+    A search is one matrix-vector product over the rows that pass the filter, then
+    ``argpartition`` for the top k. On disk the matrix is a ``.npy`` file that ``load()``
+    memory-maps, so reopening an index costs milliseconds.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ids: List[Union[str, int]],
+        contents: List[str],
+        metadatas: List[dict],
+        distance: str = "Cosine",
+        fingerprint: str = "",
+    ):
+        if distance not in DISTANCES:
+            raise ValueError(f"Unsupported distance {distance!r}, expected one of {DISTANCES}")
+        self.vectors = vectors
+        self.ids = list(ids)
+        self.contents = list(contents)
+        self.metadatas = list(metadatas)
+        self.distance = distance
+        self.fingerprint = fingerprint
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def prepare(vectors, distance: str, dtype: str = "float32") -> np.ndarray:
+        # Cosine rows are stored normalised: the search is then a plain dot product.
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if distance == "Cosine" and len(matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+        return matrix.astype(dtype, copy=False)
+
+    @classmethod
+    def build(
+        cls,
+        vectors,
+        ids: List[Union[str, int]],
+        contents: List[str],
+        metadatas: List[dict],
+        distance: str = "Cosine",
+        dtype: str = "float32",
+        fingerprint: str = "",
+    ) -> "NumpyIndex":
+        dim = len(vectors[0]) if len(vectors) else 0
+        matrix = cls.prepare(vectors, distance, dtype).reshape(len(ids), dim)
+        return cls(matrix, ids, contents, metadatas, distance, fingerprint)
+
+    def append(self, vectors, ids, contents, metadatas) -> None:
+        rows = self.prepare(vectors, self.distance, self.vectors.dtype.name)
+        self.vectors = np.concatenate([np.asarray(self.vectors), rows]) if len(self) else rows
+        self.ids += list(ids)
+        self.contents += list(contents)
+        self.metadatas += list(metadatas)
+        self._columns.clear()
+
+    def column(self, field: str) -> np.ndarray:
+        if field not in self._columns:
+            column = np.empty(len(self), dtype=object)
+            column[:] = [metadata.get(field) for metadata in self.metadatas]
+            self._columns[field] = column
+        return self._columns[field]
+
+    def mask(self, filter: Optional[Union[models.Filter, dict]]) -> Optional[np.ndarray]:
+        """
+        Rows matching ``filter``: a Qdrant filter of ``must`` keyword matches on metadata
+        fields (what ``QdrantDB.metadata_filter`` builds), or a ``{field: value}`` dict.
+        Raises NotImplementedError for anything else.
+        """
+        if not filter:
+            return None
+        if isinstance(filter, dict):
+            conditions = [(field, [value]) for field, value in filter.items()]
+        else:
+            if filter.should or filter.must_not or filter.min_should:
+                raise NotImplementedError("Only 'must' filters are supported")
+            must = filter.must if isinstance(filter.must, list) else [filter.must]
+            prefix = f"{QdrantVectorStore.METADATA_KEY}."
+            conditions = []
+            for condition in must or []:
+                match = getattr(condition, "match", None)
+                if not isinstance(condition, models.FieldCondition) or not (
+                    condition.key.startswith(prefix)
+                    and isinstance(match, (models.MatchValue, models.MatchAny))
+                ):
+                    raise NotImplementedError(f"Unsupported filter condition {condition!r}")
+                values = [match.value] if isinstance(match, models.MatchValue) else match.any
+                conditions.append((condition.key[len(prefix) :], values))
+        mask = np.ones(len(self), dtype=bool)
+        for field, values in conditions:
+            column = self.column(field)
+            if len(values) == 1:
+                mask &= column == values[0]
+            else:
+                accepted = set(values)
+                mask &= np.fromiter((value in accepted for value in column), bool, len(column))
+        return mask
+
+    def search(
+        self, vector: List[float], k: int = 4, mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """``(row, score)`` of the ``k`` best rows (among ``mask``), best first."""
+        query = self.prepare([vector], self.distance)[0]
+        rows = None if mask is None else np.flatnonzero(mask)
+        matrix = self.vectors if rows is None else self.vectors[rows]
+        if not len(matrix) or k <= 0:
+            return []
+        # float16 has no BLAS kernel; the product runs on a float32 copy of the rows.
+        scores = np.asarray(matrix, dtype=np.float32) @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if rows is not None:
+            return [(int(rows[i]), float(scores[i])) for i in top]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write to directory ``path``, each file replaced atomically and index.json last."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with open(path / "vectors.npy.tmp", "wb") as f:
+            np.save(f, np.asarray(self.vectors))
+        os.replace(path / "vectors.npy.tmp", path / "vectors.npy")
+        with open(path / "points.json.tmp", "w") as f:
+            json.dump({"ids": self.ids, "contents": self.contents, "metadatas": self.metadatas}, f)
+        os.replace(path / "points.json.tmp", path / "points.json")
+        with open(path / "index.json.tmp", "w") as f:
+            json.dump(
+                {"distance": self.distance, "count": len(self), "fingerprint": self.fingerprint}, f
+            )
+        os.replace(path / "index.json.tmp", path / "index.json")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "NumpyIndex":
+        path = Path(path)
+        with open(path / "index.json") as f:
+            info = json.load(f)
+        with open(path / "points.json") as f:
+            points = json.load(f)
+        vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        if not len(points["ids"]) == len(vectors) == info["count"]:
+            raise ValueError(f"Inconsistent NumPy index at {path}")
+        return cls(
+            vectors,
+            points["ids"],
+            points["contents"],
+            points["metadatas"],
+            info["distance"],
+            info["fingerprint"],
+        )
+
+    @classmethod
+    def from_qdrant(cls, db: QdrantDB, fingerprint: str = "", dtype: str = "float32"):
+        """Copy the dense vectors and payloads of ``db``'s collection."""
+        vectors, ids, contents, metadatas = [], [], [], []
+        offset = None
+        while True:
+            points, offset = db.client.scroll(
+                collection_name=db.collection_name,
+                limit=1000,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            for point in points:
+                vector = point.vector
+                if isinstance(vector, dict):
+                    vector = vector[db.vector_store.vector_name]
+                payload = point.payload or {}
+                vectors.append(vector)
+                ids.append(point.id)
+                contents.append(payload.get(db.vector_store.content_payload_key, ""))
+                metadatas.append(payload.get(db.vector_store.metadata_payload_key) or {})
+            if offset is None:
+                break
+        return cls.build(vectors, ids, contents, metadatas, db.distance, dtype, fingerprint)
+
+
+class NumpyVectorStore(VectorStore):
+    """LangChain vector store over a ``NumpyIndex``; ``add_texts`` saves to ``path`` if set."""
+
+    def __init__(
+        self,
+        index: NumpyIndex,
+        embedding: Embeddings,
+        collection_name: str = "",
+        path: Optional[Union[str, Path]] = None,
+    ):
+        self.index = index
+        self.embedding = embedding
+        self.collection_name = collection_name
+        self.path = path
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        self.index.append(self.embedding.embed_documents(texts), ids, texts, metadatas)
+        if self.path is not None:
+            self.index.save(self.path)
+        return ids
+
+    def _documents(
+        self, index: NumpyIndex, hits: List[Tuple[int, float]]
+    ) -> List[Tuple[Document, float]]:
+        # Same metadata as QdrantDB._document_from_point, so callers can't tell the difference.
+        return [
+            (
+                Document(
+                    page_content=index.contents[row],
+                    metadata={
+                        **index.metadatas[row],
+                        "_id": index.ids[row],
+                        "_collection_name": self.collection_name,
+                    },
+                ),
+                score,
+            )
+            for row, score in hits
+        ]
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter=None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        index = self.index
+        return self._documents(index, index.search(embedding, k, index.mask(filter)))
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter=None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        # One index per call: NumpyDB may swap in a refreshed one meanwhile.
+        index = self.index
+        # Raise on unsupported filters before paying for the embedding.
+        mask = index.mask(filter)
+        vector = self.embedding.embed_query(query)
+        return self._documents(index, index.search(vector, k, mask))
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter=None, **kwargs: Any
+    ) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k, filter)]
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, filter=None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        index = self.index
+        mask = index.mask(filter)
+        vector = await self.embedding.aembed_query(query)
+        # Microseconds to milliseconds of compute for the sizes this index is used at.
+        return self._documents(index, index.search(vector, k, mask))
+
+    async def asimilarity_search(
+        self, query: str, k: int = 4, filter=None, **kwargs: Any
+    ) -> List[Document]:
+        hits = await self.asimilarity_search_with_score(query, k, filter)
+        return [document for document, _ in hits]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        distance: str = "Cosine",
+        dtype: str = "float32",
+        path: Optional[Union[str, Path]] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        index = NumpyIndex.build(np.empty((0, 0)), [], [], [], distance, dtype)
+        store = cls(index, embedding, path=path)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+
+class NumpyDB:
+    """
+    ``QdrantDB``'s read path served in-process from a ``NumpyIndex`` copy of a small
+    collection: no client round trip per query. Search is dense only (no BM25 fusion).
+    Filters the index can't evaluate are sent to Qdrant, and so is everything else
+    (writes, scrolls, the answer cache's client): the wrapped ``QdrantDB`` stays the
+    source of truth.
+
+    Searches re-check the collection's fingerprint at most every ``REFRESH_INTERVAL``
+    seconds, in a background thread, and swap in a rebuilt index when the point count,
+    the change marker write jobs leave (``QdrantDB.mark_changed``) or the collection
+    behind the alias changed.
+    """
+
+    # A check is two small requests; this only bounds them under heavy traffic.
+    REFRESH_INTERVAL = 5.0
+
+    def __init__(self, qdrant: QdrantDB, index: NumpyIndex):
+        self.qdrant = qdrant
+        self.vector_store = NumpyVectorStore(index, qdrant.embeddings, qdrant.collection_name)
+        self._lock = threading.Lock()
+        self._checked = time.monotonic()
+        self._refreshing = False
+
+    def __getattr__(self, name: str):
+        return getattr(self.qdrant, name)
+
+    @property
+    def index(self) -> NumpyIndex:
+        return self.vector_store.index
+
+    def refresh(self) -> bool:
+        """Reload the index if the collection changed; True if a new one is served."""
+        index = load_index(self.qdrant, current=self.index)
+        if index is self.index:
+            return False
+        logger.info(f"Serving {self.qdrant.collection_name} from a refreshed NumPy index")
+        self.vector_store.index = index
+        return True
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception(f"Refreshing the NumPy index of {self.qdrant.collection_name} failed")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _check(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._refreshing or now - self._checked < self.REFRESH_INTERVAL:
+                return
+            self._checked = now
+            self._refreshing = True
+        threading.Thread(
+            target=self._refresh_in_background, name="numpy-index-refresh", daemon=True
+        ).start()
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Tuple[Document, float]]:
+        self._check()
+        try:
+            if vector is not None:
+                return self.vector_store.similarity_search_by_vector_with_score(
+                    vector, k=k, filter=filter
+                )
+            return self.vector_store.similarity_search_with_score(query, k=k, filter=filter)
+        except NotImplementedError:
+            return self.qdrant.similarity_search_with_score(
+                query, k=k, filter=filter, vector=vector
+            )
+
+    async def asimilarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Tuple[Document, float]]:
+        self._check()
+        try:
+            if vector is not None:
+                return self.vector_store.similarity_search_by_vector_with_score(
+                    vector, k=k, filter=filter
+                )
+            return await self.vector_store.asimilarity_search_with_score(query, k=k, filter=filter)
+        except NotImplementedError:
+            return await self.qdrant.asimilarity_search_with_score(
+                query, k=k, filter=filter, vector=vector
+            )
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Document]:
+        hits = self.similarity_search_with_score(query, k=k, filter=filter, vector=vector)
+        return [document for document, _ in hits]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Document]:
+        hits = await self.asimilarity_search_with_score(query, k=k, filter=filter, vector=vector)
+        return [document for document, _ in hits]
+
+    def fetch_sections(self, section_ids: List[str]) -> Dict[str, str]:
+        chunks: Dict[str, List[Chunk]] = {section_id: [] for section_id in section_ids}
+        index = self.index
+        for row in np.flatnonzero(index.mask(self.qdrant._section_filter(section_ids))):
+            metadata = index.metadatas[row]
+            if metadata["section_id"] in chunks:
+                chunks[metadata["section_id"]].append(
+                    Chunk(
+                        index=metadata.get("chunk_index", 0),
+                        text=index.contents[row],
+                        char_start=metadata.get("chunk_start", 0),
+                        token_count=metadata.get("token_count", 0),
+                    )
+                )
+        return {section_id: stitch_chunks(parts) for section_id, parts in chunks.items()}
+
+    async def afetch_sections(self, section_ids: List[str]) -> Dict[str, str]:
+        return self.fetch_sections(section_ids)
+
+    def search_sections(
+        self,
+        query: str,
+        k: int = 4,
+        oversample: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Document]:
+        """Same as ``QdrantDB.search_sections``, from the index."""
+        hits = self.similarity_search_with_score(
+            query, k=k * oversample, filter=filter, vector=vector
+        )
+        best = QdrantDB._best_sections(hits, k)
+        multi_chunk = QdrantDB._multi_chunk(best)
+        texts = self.fetch_sections(multi_chunk) if multi_chunk else {}
+        return QdrantDB._section_documents(best, texts)
+
+    async def asearch_sections(
+        self,
+        query: str,
+        k: int = 4,
+        oversample: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Document]:
+        hits = await self.asimilarity_search_with_score(
+            query, k=k * oversample, filter=filter, vector=vector
+        )
+        best = QdrantDB._best_sections(hits, k)
+        multi_chunk = QdrantDB._multi_chunk(best)
+        texts = self.fetch_sections(multi_chunk) if multi_chunk else {}
+        return QdrantDB._section_documents(best, texts)
+
+
+def _fingerprint(db: QdrantDB, collection: str) -> str:
+    # Point count and the marker write jobs replace after every write (QdrantDB.mark_changed):
+    # two small requests, however large the collection. Deletes show in the count.
+    count = db.client.count(collection, exact=True).count
+    return f"{collection}:{count}:{db.change_marker(collection) or ''}"
+
+
+def load_index(db: QdrantDB, current: Optional[NumpyIndex] = None) -> NumpyIndex:
+    """
+    The NumPy index of ``db``'s collection: ``current`` if it is still up to date, else the
+    one saved under ``numpy_index_dir`` for the concrete collection, rebuilt from Qdrant
+    when its fingerprint (point count and change marker) no longer matches.
+    """
+    collection = db.resolve() or db.collection_name
+    fingerprint = _fingerprint(db, collection)
+    if current is not None and current.fingerprint == fingerprint:
+        return current
+    path = Path(config.numpy_index_dir) / collection
+    if (path / "index.json").exists():
+        try:
+            index = NumpyIndex.load(path)
+            if index.fingerprint == fingerprint:
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Rebuilding unreadable NumPy index at {path}: {e}")
+    logger.info(f"Building NumPy index of {collection} at {path}")
+    index = NumpyIndex.from_qdrant(
+        db, fingerprint, dtype=getattr(config, "numpy_index_dtype", "float32")
+    )
+    index.save(path)
+    return index
+
+
+def open_db(collection_name: Optional[str] = None) -> Union[QdrantDB, NumpyDB]:
+    """
+    The database serving code should use for ``collection_name``: a ``NumpyDB`` when the
+    collection has at most ``numpy_index_max_points`` points and is served dense-only (no
+    BM25 vector, or ``hybrid_retrieval`` off), so the copy gives nothing up; else the
+    ``QdrantDB``. Collections listed in ``numpy_index_collections`` are served from NumPy
+    even when hybrid, trading BM25 fusion for in-process search.
+
+    The index is kept under ``numpy_index_dir``, per concrete collection (so promoting a
+    new version behind an alias starts a new index), and rebuilt from Qdrant when the
+    collection's point count or change marker differs from when it was written. Code
+    writing to the collection other than the ingest and enrichment jobs must call
+    ``QdrantDB.mark_changed`` for the change to be picked up.
+    """
+    db = QdrantDB(collection_name=collection_name)
+    max_points = getattr(config, "numpy_index_max_points", 0)
+    listed = db.collection_name in getattr(config, "numpy_index_collections", ())
+    if not max_points or (db.hybrid and not listed) or db.distance not in DISTANCES:
+        return db
+    count = db.client.count(db.collection_name, exact=True).count
+    if not count or count > max_points:
+        return db
+    if db.hybrid:
+        logger.info(f"Serving {db.collection_name} dense-only, without BM25 fusion")
+    index = load_index(db)
+    logger.info(f"Serving {db.collection_name} ({count} points) from the NumPy index")
+    return NumpyDB(db, index)
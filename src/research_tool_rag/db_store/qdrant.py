@@ -1,46 +1,239 @@
+import asyncio
+import functools
 import logging
+import threading
+import time
+import uuid
 from collections import namedtuple
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
 
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient, models
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
 
 from research_tool_rag.configs import config
+from research_tool_rag.db_store.embedding_cache import cached_embeddings
+from research_tool_rag.db_store.sparse import HashedBM25
+from research_tool_rag.preprocessing.chunking import Chunk, stitch_chunks
 
 logger = logging.getLogger(__name__)
 
 SearchResult = namedtuple("SearchResult", ["name", "content"])
 
+# Named sparse (BM25) vector stored next to the unnamed dense vector.
+SPARSE_VECTOR_NAME = "sparse"
+
+# One vectorless point per collection whose payload write jobs replace after every write;
+# copies of a collection (the NumPy index) compare it to tell whether they are stale.
+CHANGES_COLLECTION = "collection_changes"
+
+# Metadata fields retrieval filters on; each gets a keyword payload index.
+INDEXED_FIELDS = ("state", "law_type", "title", "section_id")
+LAW_TYPES = {
+    "law": "laws",
+    "laws": "laws",
+    "reg": "regs",
+    "regs": "regs",
+    "regulation": "regs",
+    "regulations": "regs",
+}
+
+
+def normalise_filters(
+    state: Optional[str] = None, law_type: Optional[str] = None
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Map user-facing filter values onto the stored payload values: states are lower-case
+    abbreviations ("NY" -> "ny") and law types "laws" or "regs" ("regulations" -> "regs").
+    """
+    state = (state or "").strip().lower() or None
+    if law_type:
+        normalised = LAW_TYPES.get(law_type.strip().lower())
+        if normalised is None:
+            raise ValueError(f"Unknown law_type {law_type!r}, expected 'laws' or 'regs'")
+        law_type = normalised
+    return state, law_type or None
+
+
+# One embedded client per location: every ":memory:" client is a separate empty store, and
+# a storage path can only be opened by one client at a time.
+_LOCAL_CLIENTS: Dict[str, QdrantClient] = {}
+_LOCAL_CLIENTS_LOCK = threading.Lock()
+
+
+def local_client(location: str) -> QdrantClient:
+    """The process-wide embedded Qdrant for ``location`` (":memory:" or a directory)."""
+    location = str(location)
+    with _LOCAL_CLIENTS_LOCK:
+        if location not in _LOCAL_CLIENTS:
+            logger.info(f"Opening embedded Qdrant at {location}")
+            if location == ":memory:":
+                _LOCAL_CLIENTS[location] = QdrantClient(location=location)
+            else:
+                Path(location).mkdir(parents=True, exist_ok=True)
+                _LOCAL_CLIENTS[location] = QdrantClient(path=location)
+        return _LOCAL_CLIENTS[location]
+
+
+class LocalAsyncClient:
+    """
+    The ``AsyncQdrantClient`` methods QdrantDB uses, over an embedded client.
+
+    ``AsyncQdrantClient`` has a local mode of its own, but it would open a second store
+    (":memory:") or find the path locked, so calls go to the shared sync client in a worker
+    thread instead and the event loop never blocks on a search.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+        if not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+@dataclass
+class CollectionSettings:
+    """
+    How a collection stores and indexes its dense vectors; applied when it is created.
+
+    ``quantization`` keeps a compressed copy of every vector that HNSW searches on
+    ("scalar": int8, 4x smaller than float32; "binary": one bit per dimension, 32x
+    smaller). With ``rescore`` the best ``oversampling`` x k candidates are scored again
+    against the original vectors, which ``vectors_on_disk`` leaves memory-mapped on disk.
+    ``payload_on_disk`` does the same for payloads; indexed payload fields stay in RAM.
+    ``hnsw_ef`` is the search-time beam width (None: Qdrant's default).
+    """
+
+    quantization: Optional[str] = None
+    quantile: float = 0.99
+    always_ram: bool = True
+    rescore: bool = True
+    oversampling: float = 2.0
+    vectors_on_disk: bool = False
+    payload_on_disk: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_ef: Optional[int] = None
+
+    def __post_init__(self):
+        if self.quantization not in (None, "scalar", "binary"):
+            raise ValueError(
+                f"Unknown quantization {self.quantization!r}, expected None, 'scalar' or 'binary'"
+            )
+
+    @classmethod
+    def from_config(cls, config) -> "CollectionSettings":
+        return cls(
+            quantization=getattr(config, "vector_quantization", None),
+            always_ram=getattr(config, "quantization_always_ram", True),
+            rescore=getattr(config, "quantization_rescore", True),
+            oversampling=getattr(config, "quantization_oversampling", 2.0),
+            vectors_on_disk=getattr(config, "vectors_on_disk", False),
+            payload_on_disk=getattr(config, "payload_on_disk", False),
+            hnsw_m=getattr(config, "hnsw_m", 16),
+            hnsw_ef_construct=getattr(config, "hnsw_ef_construct", 100),
+            hnsw_ef=getattr(config, "hnsw_ef", None),
+        )
+
+    def quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, quantile=self.quantile, always_ram=self.always_ram
+                )
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=self.always_ram)
+            )
+        return None
+
+    def create_kwargs(self, size: int, distance: str) -> dict:
+        """Dense vector arguments for ``create_collection``."""
+        return dict(
+            vectors_config=models.VectorParams(
+                size=size, distance=distance, on_disk=self.vectors_on_disk
+            ),
+            hnsw_config=models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct),
+            quantization_config=self.quantization_config(),
+            on_disk_payload=self.payload_on_disk,
+        )
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        quantization = None
+        if self.quantization is not None:
+            quantization = models.QuantizationSearchParams(
+                rescore=self.rescore, oversampling=self.oversampling
+            )
+        if quantization is None and self.hnsw_ef is None:
+            return None
+        return models.SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+    def differences(self, collection_config: models.CollectionConfig) -> List[str]:
+        """Settings an existing collection was created with that differ from these."""
+        params = collection_config.params
+        vectors = params.vectors
+        if isinstance(vectors, dict):
+            vectors = vectors.get(QdrantVectorStore.VECTOR_NAME)
+        quantization = collection_config.quantization_config or (
+            vectors.quantization_config if vectors is not None else None
+        )
+        found = {
+            "quantization": next(
+                (kind for kind in ("scalar", "binary") if getattr(quantization, kind, None)), None
+            ),
+            "vectors_on_disk": bool(vectors is not None and vectors.on_disk),
+            "payload_on_disk": bool(params.on_disk_payload),
+            "hnsw_m": collection_config.hnsw_config.m,
+            "hnsw_ef_construct": collection_config.hnsw_config.ef_construct,
+        }
+        return [
+            f"{name}={value!r} (configured {getattr(self, name)!r})"
+            for name, value in found.items()
+            if value != getattr(self, name)
+        ]
+
 
 class QdrantDB:
     client: QdrantClient
+    async_client: Union[AsyncQdrantClient, LocalAsyncClient]
     collection_name: str
     vector_store: QdrantVectorStore
 
-    def __init__(self, collection_name=None):
+    def __init__(self, collection_name=None, settings: Optional[CollectionSettings] = None):
         # Use provided collection_name, else config, else default
         try:
             # from research_tool_rag.configs import config
             config_collection = getattr(config, "collection_name", None)
         except Exception:
             config_collection = None
+        # collection_name may be a concrete collection or an alias pointing at one.
         self.collection_name = collection_name or config_collection or "PROFILE_COLLECTION"
-        # Initialize Qdrant with defaults if config is missing values
-        db_url = getattr(config, "db_url", "localhost")
-        db_port = getattr(config, "db_port", 6333)
-        self.client = QdrantClient(db_url, port=db_port)
-
-        # Always ensure collection has correct vector size
-        expected_size = 768
-        # Always force recreate the collection with the correct vector size before using it
-        self.client.recreate_collection(
-            collection_name=self.collection_name,
-            vectors_config=models.VectorParams(
-                size=expected_size,
-                distance=getattr(config, "model_db_config", {}).get(
-                    "collection_distance", "Cosine"
-                ),
-            ),
-        )
+        # Set on instances returned by new_version(); promote() points this alias at us.
+        self.alias: Optional[str] = None
+        # Embedded, in-process Qdrant when db_path is set, else the server at db_url:db_port.
+        db_path = getattr(config, "db_path", None)
+        self.local = bool(db_path)
+        if self.local:
+            self.client = local_client(db_path)
+            self.async_client = LocalAsyncClient(self.client)
+        else:
+            # Initialize Qdrant with defaults if config is missing values
+            db_url = getattr(config, "db_url", "localhost")
+            db_port = getattr(config, "db_port", 6333)
+            self.client = QdrantClient(db_url, port=db_port)
+            # Used by the a* methods so the async serving path never blocks the event loop.
+            self.async_client = AsyncQdrantClient(db_url, port=db_port)
 
         # Try to get embeddings from config.model_db_config if available
         embeddings = None
@@ -52,138 +245,499 @@ class QdrantDB:
             raise ValueError(
                 "No embedding model found in config or model_db_config. Please set one."
             )
+        if getattr(config, "embedding_cache_path", None):
+            embeddings = cached_embeddings(
+                embeddings,
+                config.embedding_cache_path,
+                getattr(config, "embedding_cache_max_entries", None),
+            )
+
+        self.vector_size = getattr(config, "embedding_dim", None) or len(
+            embeddings.embed_query("dimension probe")
+        )
+        self.distance = getattr(config, "collection_distance_metric", "Cosine")
+        # Dense + BM25 retrieval fused with reciprocal rank fusion; _open_collection turns
+        # it off for collections created without the sparse vector.
+        self.hybrid = getattr(config, "hybrid_retrieval", True)
+        self.sparse_embeddings = HashedBM25()
+        self.settings = settings or CollectionSettings.from_config(config)
+        # Rescoring/oversampling for quantized collections, passed with every dense search.
+        self.search_params = self.settings.search_params()
+        self._open_collection()
+
         self.vector_store = QdrantVectorStore(
             client=self.client,
             collection_name=self.collection_name,
-            # vectors_config=models.VectorParams(
-            #         size=4096, distance=config.model_db_config.get("collection_distance", "Cosine"),),
             embedding=embeddings,
-            # force_recreate=True,  
+            distance=models.Distance(self.distance),
+            retrieval_mode=RetrievalMode.HYBRID if self.hybrid else RetrievalMode.DENSE,
+            sparse_embedding=self.sparse_embeddings if self.hybrid else None,
+            sparse_vector_name=SPARSE_VECTOR_NAME,
+            # _open_collection already checked the vector size, skip the probe embedding call.
+            validate_collection_config=False,
+        )
+
+    def resolve(self, name: Optional[str] = None) -> Optional[str]:
+        """
+        Return the concrete collection behind ``name`` (an alias or a collection name),
+        or None if neither exists.
+        """
+        name = name or self.collection_name
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == name:
+                return alias.collection_name
+        return name if self.client.collection_exists(name) else None
+
+    async def aresolve(self, name: Optional[str] = None) -> Optional[str]:
+        name = name or self.collection_name
+        for alias in (await self.async_client.get_aliases()).aliases:
+            if alias.alias_name == name:
+                return alias.collection_name
+        return name if await self.async_client.collection_exists(name) else None
+
+    def _open_collection(self) -> None:
+        """
+        Open the collection if it exists and check it matches the embedding model, otherwise
+        create it. Existing data is never dropped here.
+        """
+        target = self.resolve()
+        if target is None:
+            logger.info(
+                f"Creating collection {self.collection_name} "
+                f"(size={self.vector_size}, distance={self.distance}, {self.settings})"
+            )
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                **self.settings.create_kwargs(self.vector_size, self.distance),
+                # IDF is computed by Qdrant from the collection, HashedBM25 stores only TF.
+                sparse_vectors_config={
+                    SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)
+                },
+            )
+            self._ensure_payload_indexes(self.collection_name)
+            return
+
+        collection_config = self.client.get_collection(target).config
+        params = collection_config.params
+        if self.hybrid and SPARSE_VECTOR_NAME not in (params.sparse_vectors or {}):
+            logger.warning(
+                f"Collection {target} has no {SPARSE_VECTOR_NAME!r} vector, using dense-only "
+                f"retrieval. Reindex with QdrantDB.new_version() to enable hybrid search."
+            )
+            self.hybrid = False
+        vectors = params.vectors
+        if isinstance(vectors, dict):
+            vectors = vectors.get(QdrantVectorStore.VECTOR_NAME)
+        if vectors is None or vectors.size != self.vector_size:
+            found = None if vectors is None else vectors.size
+            raise ValueError(
+                f"Collection {target} stores vectors of size {found} but the configured "
+                f"embedding model produces {self.vector_size}. Reindex into a new collection "
+                f"with QdrantDB.new_version() instead of reusing this one."
+            )
+        # Embedded mode neither quantizes nor builds HNSW (it searches exhaustively) and
+        # does not keep those settings, so there is nothing to compare.
+        differences = [] if self.local else self.settings.differences(collection_config)
+        if differences:
+            # Storage settings only take effect on creation; searching still works.
+            logger.warning(
+                f"Collection {target} was created with {', '.join(differences)}. "
+                f"Reindex with QdrantDB.new_version() to apply the configured settings."
+            )
+        logger.info(f"Using existing collection {target} for {self.collection_name}")
+        self._ensure_payload_indexes(target)
+
+    def _ensure_payload_indexes(self, collection: str) -> None:
+        # Filtered searches use these instead of scanning every point's payload. Creating
+        # an index on an existing collection is a one-off background job in Qdrant.
+        if self.local:
+            # Embedded mode always scans payloads and would only warn about the indexes.
+            return
+        existing = self.client.get_collection(collection).payload_schema or {}
+        for field in INDEXED_FIELDS:
+            key = f"{QdrantVectorStore.METADATA_KEY}.{field}"
+            if key not in existing:
+                logger.info(f"Creating keyword index on {key} in {collection}")
+                self.client.create_payload_index(
+                    collection, key, models.PayloadSchemaType.KEYWORD, wait=True
+                )
+
+    @staticmethod
+    def metadata_filter(
+        state: Optional[str] = None, law_type: Optional[str] = None
+    ) -> Optional[models.Filter]:
+        """Filter on jurisdiction and law type (see ``normalise_filters``); None if neither."""
+        state, law_type = normalise_filters(state, law_type)
+        must = [
+            models.FieldCondition(
+                key=f"{QdrantVectorStore.METADATA_KEY}.{field}",
+                match=models.MatchValue(value=value),
+            )
+            for field, value in (("state", state), ("law_type", law_type))
+            if value
+        ]
+        return models.Filter(must=must) if must else None
+
+    @classmethod
+    def new_version(
+        cls, alias: Optional[str] = None, settings: Optional[CollectionSettings] = None
+    ) -> "QdrantDB":
+        """
+        Create an empty, versioned collection for a full reindex of ``alias``.
+
+        Serving keeps reading through the alias while the new collection is filled; call
+        ``promote()`` once ingestion has finished to switch traffic over atomically.
+        """
+        alias = alias or getattr(config, "collection_name", None) or "PROFILE_COLLECTION"
+        db = cls(collection_name=f"{alias}_v{time.strftime('%Y%m%d%H%M%S')}", settings=settings)
+        db.alias = alias
+        return db
+
+    def promote(self, drop_previous: bool = False) -> Optional[str]:
+        """
+        Atomically point ``self.alias`` at this collection. Returns the collection that
+        served the alias before, which is kept for rollback unless ``drop_previous``.
+        """
+        if self.alias is None:
+            raise ValueError("promote() is only valid on a QdrantDB built by new_version()")
+
+        previous = self.resolve(self.alias)
+        operations = []
+        if previous == self.alias:
+            # A plain collection still sits under the alias name (created before aliases
+            # were used). It has to go before the alias can take its name, so this one-time
+            # migration leaves a short window with nothing to serve.
+            logger.warning(f"Dropping legacy collection {self.alias} to replace it with an alias")
+            self.client.delete_collection(self.alias)
+            previous = None
+        elif previous is not None:
+            operations.append(
+                models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=self.alias))
+            )
+        operations.append(
+            models.CreateAliasOperation(
+                create_alias=models.CreateAlias(
+                    collection_name=self.collection_name, alias_name=self.alias
+                )
+            )
+        )
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        logger.info(f"Alias {self.alias} now points at {self.collection_name}")
+
+        if drop_previous and previous is not None:
+            self.client.delete_collection(previous)
+            logger.info(f"Dropped previous collection {previous}")
+        return previous
+
+    @property
+    def embeddings(self):
+        return self.vector_store.embeddings
+
+    @staticmethod
+    def _change_point_id(collection: str) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"collection-changes/{collection}"))
+
+    def mark_changed(self) -> str:
+        """
+        Record that points or payloads of the concrete collection changed. Jobs that write
+        to it (ingest, follow-up enrichment) call this after each write, so readers that
+        keep a copy can tell it is stale from ``change_marker`` without scanning it.
+        Returns the new marker.
+        """
+        collection = self.resolve() or self.collection_name
+        if not self.client.collection_exists(CHANGES_COLLECTION):
+            self.client.create_collection(CHANGES_COLLECTION, vectors_config={})
+        marker = uuid.uuid4().hex
+        self.client.upsert(
+            CHANGES_COLLECTION,
+            points=[
+                models.PointStruct(
+                    id=self._change_point_id(collection),
+                    vector={},
+                    payload={"collection": collection, "marker": marker},
+                )
+            ],
+            wait=True,
+        )
+        return marker
+
+    def change_marker(self, collection: Optional[str] = None) -> Optional[str]:
+        """The last ``mark_changed`` marker of ``collection``; None if it was never marked."""
+        collection = collection or self.resolve() or self.collection_name
+        if not self.client.collection_exists(CHANGES_COLLECTION):
+            return None
+        points = self.client.retrieve(
+            CHANGES_COLLECTION, [self._change_point_id(collection)], with_payload=True
+        )
+        return points[0].payload.get("marker") if points else None
+
+    def upsert_documents(
+        self,
+        documents: List[Document],
+        vectors: List[List[float]],
+        ids: Optional[List[str]] = None,
+        wait: bool = True,
+    ) -> None:
+        """
+        Bulk upsert already embedded documents in a single request.
+        Payloads use the same layout as ``vector_store.add_documents`` so that
+        ``similarity_search`` keeps working on points written here. The BM25 vectors
+        are computed here, they cost microseconds per document.
+        """
+        if ids is None:
+            ids = [uuid.uuid4().hex for _ in documents]
+        points = []
+        for point_id, doc, vector in zip(ids, documents, vectors):
+            point_vectors = {self.vector_store.vector_name: vector}
+            if self.hybrid:
+                sparse = self.sparse_embeddings.embed_document(doc.page_content)
+                point_vectors[SPARSE_VECTOR_NAME] = models.SparseVector(
+                    indices=sparse.indices, values=sparse.values
+                )
+            points.append(
+                models.PointStruct(
+                    id=point_id,
+                    vector=point_vectors,
+                    payload={
+                        self.vector_store.content_payload_key: doc.page_content,
+                        self.vector_store.metadata_payload_key: doc.metadata,
+                    },
+                )
+            )
+        self.client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+
+    def _document_from_point(self, point, score: Optional[float] = None) -> Document:
+        payload = point.payload or {}
+        metadata = dict(payload.get(self.vector_store.metadata_payload_key) or {})
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = self.collection_name
+        if score is not None:
+            metadata["score"] = score
+        return Document(
+            page_content=payload.get(self.vector_store.content_payload_key, ""),
+            metadata=metadata,
+        )
+
+    def _section_filter(self, section_ids: List[str]) -> models.Filter:
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key=f"{self.vector_store.metadata_payload_key}.section_id",
+                    match=models.MatchAny(any=list(section_ids)),
+                )
+            ]
+        )
+
+    def _add_chunks(self, chunks: Dict[str, List[Chunk]], points) -> None:
+        for point in points:
+            document = self._document_from_point(point)
+            metadata = document.metadata
+            chunks[metadata["section_id"]].append(
+                Chunk(
+                    index=metadata.get("chunk_index", 0),
+                    text=document.page_content,
+                    char_start=metadata.get("chunk_start", 0),
+                    token_count=metadata.get("token_count", 0),
+                )
+            )
+
+    def fetch_sections(self, section_ids: List[str]) -> Dict[str, str]:
+        """
+        Rebuild the full text of several sections from their chunks with a single filtered
+        scroll (paged only if the sections have more chunks than one page holds).
+        """
+        chunks: Dict[str, List[Chunk]] = {section_id: [] for section_id in section_ids}
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._section_filter(section_ids),
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            self._add_chunks(chunks, points)
+            if offset is None:
+                break
+        return {section_id: stitch_chunks(parts) for section_id, parts in chunks.items()}
+
+    async def afetch_sections(self, section_ids: List[str]) -> Dict[str, str]:
+        chunks: Dict[str, List[Chunk]] = {section_id: [] for section_id in section_ids}
+        offset = None
+        while True:
+            points, offset = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._section_filter(section_ids),
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            self._add_chunks(chunks, points)
+            if offset is None:
+                break
+        return {section_id: stitch_chunks(parts) for section_id, parts in chunks.items()}
+
+    @staticmethod
+    def _best_sections(hits, k: int) -> Dict[str, Document]:
+        best: Dict[str, Document] = {}
+        for document, score in hits:
+            # Points written before chunking may lack section_id; each is its own section.
+            section_id = document.metadata.get("section_id") or document.metadata["_id"]
+            if section_id not in best:
+                document.metadata["score"] = score
+                best[section_id] = document
+            if len(best) == k:
+                break
+        return best
+
+    @staticmethod
+    def _multi_chunk(best: Dict[str, Document]) -> List[str]:
+        return [sid for sid, doc in best.items() if doc.metadata.get("chunk_count", 1) > 1]
+
+    @staticmethod
+    def _section_documents(best: Dict[str, Document], texts: Dict[str, str]) -> List[Document]:
+        sections = []
+        for section_id, document in best.items():
+            metadata = {
+                key: value
+                for key, value in document.metadata.items()
+                if key not in ("paragraph_id", "chunk_index", "chunk_start", "token_count")
+            }
+            sections.append(
+                Document(
+                    page_content=texts.get(section_id, document.page_content), metadata=metadata
+                )
+            )
+        return sections
+
+    def search_sections(
+        self,
+        query: str,
+        k: int = 4,
+        oversample: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Document]:
+        """
+        Search chunks (dense and BM25 fused when ``hybrid``), regroup the hits by
+        ``section_id`` and return up to ``k`` whole sections ranked by their best chunk.
+        ``oversample`` x ``k`` chunks are searched so that several hits in one long section
+        still leave room for ``k`` sections. Every matched section is then rebuilt in one
+        batched request, not one per section. ``vector`` is the query's embedding, if the
+        caller already has it.
+        """
+        hits = self.similarity_search_with_score(
+            query, k=k * oversample, filter=filter, vector=vector
         )
+        best = self._best_sections(hits, k)
+        multi_chunk = self._multi_chunk(best)
+        texts = self.fetch_sections(multi_chunk) if multi_chunk else {}
+        return self._section_documents(best, texts)
 
-    # @staticmethod
-    # def chunk_section(texts: List[str], max_tokens=512, overlap=50):
-    #     """Split section into chunks while retaining IDs."""
-
-    #     chunks = []
-    #     for text in texts:
-    #         # # Tokenize text without truncation to get all tokens
-    #         # inputs = llm_tokenizer(text, return_tensors='pt', padding=False, truncation=False)
-    #         # input_ids = inputs['input_ids'][0]  # tensor of token ids for this text
-
-    #         # start = 0
-    #         # while start < len(input_ids):
-    #         #     end = start + max_tokens
-    #         #     chunk_ids = input_ids[start:end]
-    #         #     chunk_text = llm_tokenizer.decode(chunk_ids, skip_special_tokens=True)
-    #         #     yield (chunk_ids, chunk_text.strip())
-    #         #     start += max_tokens - overlap
-
-    #         tokens = tokenizer(text, return_tensors="pt")
-    #         input_ids = tokens["input_ids"].squeeze(0)  # [batch, seq] -> [seq]
-    #         attention_masks = tokens["attention_mask"].squeeze(0)
-
-    #         for i in range(0, len(input_ids) - max_tokens + 1, max_tokens - overlap):
-    #             chunk_ids = input_ids[i : i + max_tokens]
-    #             chunk_masks = attention_masks[i : i + max_tokens]
-    #             chunks.append((chunk_ids, chunk_masks))
-
-    #         # Handle last chunk if it's shorter
-    #         if len(input_ids) % (max_tokens - overlap) != 0:
-    #             chunk_ids = input_ids[-max_tokens:]
-    #             chunk_masks = attention_masks[-max_tokens:]
-    #             chunks.append((chunk_ids, chunk_masks))
-
-    #     for chunk in chunks:
-    #         yield chunk
-
-    # def embed(self, text) -> List[float]:
-    #     """Create embetextdding for a piece of text."""
-    #     inputs = tokenizer(text, return_tensors="pt")
-    #     with torch.no_grad():
-    #         outputs = model(**inputs)
-    #     # Average pool
-    #     return outputs.last_hidden_state.mean(dim=1)
-
-    # def index_sections(self, sections: List[Node]):
-    #     """Index sections into Qdrant with metadata linking back to their IDs."""
-    #     sections = sections
-    #     points = []
-    #     for section in sections:
-    #         section_id = str(section.id)
-    #         logger.info(f"Indexing section {section.hierarchical_name}")
-    #         for idx, chunk in enumerate(
-    #             self.chunk_section([section.hierarchical_name, section.content])
-    #         ):
-    #             chunk_ids, chunk_masks = chunk
-    #             # vector = self.embed(chunk)
-    #             with torch.no_grad():
-    #                 outputs = model(
-    #                     input_ids=chunk_ids.unsqueeze(0), attention_mask=chunk_masks.unsqueeze(0)
-    #                 )
-    #                 emb = outputs.last_hidden_state.mean(dim=1)
-    #             text = tokenizer.decode(chunk_ids, skip_special_tokens=True)
-    #             if idx == 0:
-    #                 text = f"{text} ----- "
-    #             vector = emb
-    #             point = PointStruct(
-    #                 id=str(uuid.uuid4()),
-    #                 # Convert tensor to list
-    #                 vector=vector[0],
-    #                 payload={
-    #                     "section_id": section_id,
-    #                     "number": section.number,
-    #                     "name": section.name,
-    #                     "state": section.hierarchy.state,
-    #                     "law_type": section.hierarchy.law_type,
-    #                     "title": section.hierarchical_title,
-    #                     "hierarchical_name": section.hierarchical_name,
-    #                     "hierarchical_number": section.hierarchical_number,
-    #                     "paragraph_id": f"{section_id}_{idx}",
-    #                     "paragraph_content": text,
-    #                 },
-    #             )
-    #             # Batch-upsert
-    #             self.client.upsert(collection_name=self.collection_name, points=[point])
-
-    # def search(self, query, collection_name="US_Laws", top=5):
-    #     """Search Qdrant for semantic match to a query."""
-    #     result = []
-    #     inputs = tokenizer(query, return_tensors="pt")
-    #     with torch.no_grad():
-    #         outputs = model(**inputs)
-    #     embedding = outputs.last_hidden_state.mean(dim=1)
-
-    #     semantic_search_res = self.client.search(
-    #         collection_name=collection_name, query_vector=embedding[0], limit=top, with_payload=True
-    #     )
-
-    #     semantic_search_res = list(semantic_search_res)
-    #     semantic_search_res.sort(key=lambda x: x.score, reverse=True)
-    #     result_section_ids = set([res.payload["section_id"] for res in semantic_search_res])
-
-    #     for section_id in result_section_ids:
-
-    #         filter_condition = Filter(
-    #             must=[FieldCondition(key="section_id", match=MatchValue(value=section_id))]
-    #         )
-
-    #         # Perform semantic search with filter
-    #         res = self.client.scroll(
-    #             collection_name=self.collection_name,
-    #             limit=100,
-    #             scroll_filter=filter_condition,
-    #         )[0]
-    #         res.sort(key=lambda x: x.payload["paragraph_id"])
-
-    #         name = res[0].payload["hierarchical_name"]
-    #         content = (" ".join([r.payload["paragraph_content"] for r in res])).split(" ----- ")[1]
-    #         result.append(SearchResult(name, content))
-
-    #     return result
-
-    # # example usage:
-    # results = search("abandoned property procedures")
-    # for res in results:
-    #     print("Chunk:", res.payload['paragraph_content'])
-    #     print("Section IDs!", res.payload['section_id'])
+    def _hybrid_query(self, vector, query: str, k: int, filter: Optional[models.Filter]) -> dict:
+        # Same request QdrantVectorStore sends in HYBRID mode: both candidate lists are
+        # filtered server side and fused with reciprocal rank fusion in one round trip.
+        sparse = self.sparse_embeddings.embed_query(query)
+        return dict(
+            prefetch=[
+                models.Prefetch(
+                    query=vector,
+                    using=self.vector_store.vector_name,
+                    filter=filter,
+                    params=self.search_params,
+                    limit=k,
+                ),
+                models.Prefetch(
+                    query=models.SparseVector(indices=sparse.indices, values=sparse.values),
+                    using=SPARSE_VECTOR_NAME,
+                    filter=filter,
+                    limit=k,
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+        )
+
+    def _search(self, vector, query: str, k: int, filter: Optional[models.Filter]) -> dict:
+        if self.hybrid:
+            search = self._hybrid_query(vector, query, k, filter)
+        else:
+            search = dict(
+                query=vector,
+                using=self.vector_store.vector_name,
+                query_filter=filter,
+                search_params=self.search_params,
+            )
+        return dict(
+            collection_name=self.collection_name,
+            limit=k,
+            with_payload=True,
+            with_vectors=False,
+            **search,
+        )
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """
+        ``vector_store.similarity_search_with_score``, except that a caller that already
+        embedded ``query`` (e.g. for routing) passes the ``vector`` instead of embedding
+        it again.
+        """
+        if vector is None:
+            vector = self.embeddings.embed_query(query)
+        response = self.client.query_points(**self._search(vector, query, k, filter))
+        return [(self._document_from_point(point), point.score) for point in response.points]
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Document]:
+        hits = self.similarity_search_with_score(query, k=k, filter=filter, vector=vector)
+        return [document for document, _ in hits]
+
+    async def asimilarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Tuple[Document, float]]:
+        if vector is None:
+            vector = await self.embeddings.aembed_query(query)
+        response = await self.async_client.query_points(**self._search(vector, query, k, filter))
+        return [(self._document_from_point(point), point.score) for point in response.points]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Document]:
+        hits = await self.asimilarity_search_with_score(query, k=k, filter=filter, vector=vector)
+        return [document for document, _ in hits]
+
+    async def asearch_sections(
+        self,
+        query: str,
+        k: int = 4,
+        oversample: int = 4,
+        filter: Optional[models.Filter] = None,
+        vector: Optional[List[float]] = None,
+    ) -> List[Document]:
+        hits = await self.asimilarity_search_with_score(
+            query, k=k * oversample, filter=filter, vector=vector
+        )
+        best = self._best_sections(hits, k)
+        multi_chunk = self._multi_chunk(best)
+        texts = await self.afetch_sections(multi_chunk) if multi_chunk else {}
+        return self._section_documents(best, texts)
@@ -0,0 +1,138 @@
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple, Union
+
+import regex
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Token counts only need to be close to the embedding model's, not exact: chunk sizes
+# stay well below the model's input limit.
+ENCODING_NAME = "cl100k_base"
+
+
+class Chunk(NamedTuple):
+    index: int
+    text: str
+    char_start: int
+    token_count: int
+
+
+class ApproximateEncoding:
+    """
+    Offline stand-in for a tiktoken encoding, used when ``cl100k_base`` can't be loaded
+    (tiktoken downloads it on first use). Text is split with cl100k_base's own
+    pre-tokenizer pattern and pieces longer than ``max_piece_chars`` are cut again, which
+    keeps counts on English legal text close to the real ones. Token ids index the pieces
+    seen so far, so ``decode`` works for anything this instance encoded.
+    """
+
+    # cl100k_base's pre-tokenizer; most of its pieces are single tokens.
+    PATTERN = regex.compile(
+        r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+"""
+        r"""| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+    )
+
+    def __init__(self, max_piece_chars: int = 10):
+        self.name = "approximate"
+        self.max_piece_chars = max_piece_chars
+        self._ids: Dict[str, int] = {}
+        self._pieces: List[str] = []
+        self._lock = threading.Lock()
+
+    def _pieces_of(self, text: str):
+        for match in self.PATTERN.finditer(text):
+            piece = match.group()
+            for start in range(0, len(piece), self.max_piece_chars):
+                yield piece[start : start + self.max_piece_chars]
+
+    def _id(self, piece: str) -> int:
+        token = self._ids.get(piece)
+        if token is None:
+            with self._lock:
+                token = self._ids.setdefault(piece, len(self._pieces))
+                if token == len(self._pieces):
+                    self._pieces.append(piece)
+        return token
+
+    def encode(self, text: str, disallowed_special=()) -> List[int]:
+        return [self._id(piece) for piece in self._pieces_of(text)]
+
+    def decode(self, tokens: List[int]) -> str:
+        return "".join(self._pieces[token] for token in tokens)
+
+    def decode_with_offsets(self, tokens: List[int]) -> Tuple[str, List[int]]:
+        offsets, position = [], 0
+        for token in tokens:
+            offsets.append(position)
+            position += len(self._pieces[token])
+        return self.decode(tokens), offsets
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = ENCODING_NAME) -> Union[tiktoken.Encoding, ApproximateEncoding]:
+    """
+    The tiktoken encoding ``name``, or an ``ApproximateEncoding`` if it can't be loaded
+    (e.g. no network and nothing in tiktoken's cache). Check ``.name`` to tell them apart.
+    """
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"tiktoken encoding {name} is not available ({e}); approximating tokens")
+        return ApproximateEncoding()
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def chunk_text(text: str, max_tokens: int = 512, overlap: int = 64) -> List[Chunk]:
+    """
+    Split ``text`` into windows of at most ``max_tokens`` tokens, each overlapping the
+    previous one by ``overlap`` tokens.
+
+    Chunks are exact slices of ``text`` (cut on token boundaries) and remember where they
+    start, so the original text can be stitched back together from them.
+    """
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+
+    encoding = get_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return [Chunk(index=0, text=text, char_start=0, token_count=len(tokens))]
+
+    decoded, offsets = encoding.decode_with_offsets(tokens)
+    if decoded != text:
+        # Only happens for text that does not round-trip (e.g. lone surrogates); slice the
+        # decoded text instead so offsets stay consistent.
+        text = decoded
+    offsets.append(len(text))
+
+    chunks = []
+    step = max_tokens - overlap
+    start = 0
+    while True:
+        end = min(start + max_tokens, len(tokens))
+        char_start, char_end = offsets[start], offsets[end]
+        chunks.append(
+            Chunk(
+                index=len(chunks),
+                text=text[char_start:char_end],
+                char_start=char_start,
+                token_count=end - start,
+            )
+        )
+        if end == len(tokens):
+            return chunks
+        start += step
+
+
+def stitch_chunks(chunks: List[Chunk]) -> str:
+    """Rebuild the original text from overlapping chunks, dropping the overlaps."""
+    text = ""
+    for chunk in sorted(chunks, key=lambda chunk: chunk.index):
+        text += chunk.text[max(len(text) - chunk.char_start, 0) :]
+    return text
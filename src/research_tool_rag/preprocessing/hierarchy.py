@@ -2,7 +2,7 @@ import logging
 from dataclasses import dataclass, field
 from itertools import chain
 from pathlib import Path
-from typing import Iterable, List, Literal, Tuple, Union
+from typing import Callable, Iterable, Iterator, List, Literal, NamedTuple, Optional, Tuple, Union
 from uuid import UUID
 
 from lxml import etree
@@ -11,24 +11,139 @@ from research_tool_rag.utils.utils import text_hash
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever a change here alters the sections produced for the same XML (text
+# extraction, hierarchical string formatting, ids, ...) so cached parses are invalidated.
+PARSER_VERSION = 1
 
-@dataclass
-class Node:
+
+class SectionRecord(NamedTuple):
+    """
+    Flat, picklable view of a leaf section: everything ingestion needs and no references
+    back into the tree, so it is cheap to send between processes.
+    """
+
+    id: str
+    number: str
     name: str
+    state: str
+    law_type: str
+    hierarchical_title: str
     hierarchical_name: str
     hierarchical_number: str
-    hierarchical_title: str
-    number: str
     content: str
-    version: str
-    id: UUID
-    parent: "Node"
-    child_nodes: List["Node"] = field(default_factory=list)
-    hierarchy: "Hierarchy" = field(init=True, default=None)
+
+
+class Node:
+    """
+    A node of a title's code hierarchy.
+
+    Only local fields and a parent reference are stored (``__slots__``, no ``__dict__``).
+    ``hierarchical_name``, ``hierarchical_number``, ``hierarchical_title`` and ``id`` are
+    derived from the parent chain the first time they are read and memoised, so building a
+    tree no longer materialises a full path string on every node.
+    """
+
+    __slots__ = (
+        "name",
+        "number",
+        "content",
+        "version",
+        "parent",
+        "child_nodes",
+        "hierarchy",
+        "_hierarchical_name",
+        "_hierarchical_number",
+        "_hierarchical_title",
+        "_id",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        number: str,
+        content: str,
+        version: str,
+        parent: Optional["Node"],
+        hierarchy: Optional["Hierarchy"] = None,
+    ):
+        self.name = name
+        self.number = number
+        self.content = content
+        self.version = version
+        self.parent = parent
+        self.child_nodes: List["Node"] = []
+        self.hierarchy = hierarchy
+        self._hierarchical_name = None
+        self._hierarchical_number = None
+        self._hierarchical_title = None
+        self._id = None
 
     def __repr__(self):
         return f"Node({self.number}-{self.name})"
 
+    def _derive(self, slot: str, root_value: Callable, join: Callable) -> str:
+        # Walk up to the nearest ancestor that already has the value, then fill it in on
+        # the way back down. Iterative, so tree depth is not bounded by the recursion limit.
+        pending = []
+        node = self
+        while node is not None and getattr(node, slot) is None:
+            pending.append(node)
+            node = node.parent
+        value = None if node is None else getattr(node, slot)
+        for node in reversed(pending):
+            value = root_value(node) if node.parent is None else join(value, node)
+            setattr(node, slot, value)
+        return value
+
+    @property
+    def hierarchical_name(self) -> str:
+        return self._derive(
+            "_hierarchical_name",
+            lambda node: node.name,
+            lambda parent, node: f"{parent} -> {node.name}".replace("  ", " ")
+            .replace("\n", "")
+            .strip(),
+        )
+
+    @property
+    def hierarchical_number(self) -> str:
+        return self._derive(
+            "_hierarchical_number",
+            lambda node: node.number,
+            lambda parent, node: f"{parent} -> {node.number}".replace("  ", " ")
+            .replace("\n", "")
+            .strip(),
+        )
+
+    @property
+    def hierarchical_title(self) -> str:
+        return self._derive(
+            "_hierarchical_title",
+            lambda node: f"{node.number} {node.name}".replace("  ", " ").replace("\n", "").strip(),
+            lambda parent, node: f"{parent} - {node.number} {node.name}".replace("  ", " ")
+            .replace("\n", "")
+            .strip(),
+        )
+
+    @property
+    def id(self) -> UUID:
+        if self._id is None:
+            self._id = UUID(text_hash(f"{self.hierarchical_title}-v{self.version}"), version=4)
+        return self._id
+
+    def to_record(self) -> SectionRecord:
+        return SectionRecord(
+            id=str(self.id),
+            number=self.number,
+            name=self.name,
+            state=self.hierarchy.state,
+            law_type=self.hierarchy.law_type,
+            hierarchical_title=self.hierarchical_title,
+            hierarchical_name=self.hierarchical_name,
+            hierarchical_number=self.hierarchical_number,
+            content=self.content,
+        )
+
     @staticmethod
     def _get_title(element: etree.Element) -> Tuple[str, str]:
         number = name = ""
@@ -107,42 +222,32 @@ class Hierarchy:
     def _depth_first_walk(
         self, node: Union[Node, None] = None
     ) -> Iterable[Union[Node, "Hierarchy"]]:
-        if node is None:
-            node = self
-        yield node
-        for child in node.child_nodes:
-            if child is None:
-                raise ValueError(
-                    f"Node {node} has a child node_id reference that does not exist in the repo"
-                )
-            yield from self._depth_first_walk(child)
+        # Explicit stack instead of recursion so deep trees never hit the recursion limit.
+        stack = [self if node is None else node]
+        while stack:
+            node = stack.pop()
+            yield node
+            for child in reversed(node.child_nodes):
+                if child is None:
+                    raise ValueError(
+                        f"Node {node} has a child node_id reference that does not exist in the repo"
+                    )
+                stack.append(child)
 
-    def _build_node(self, element: etree.Element, parent: Node) -> Node:
+    def _new_node(self, element: etree.Element, parent: Union[Node, None], content: str) -> Node:
         number, name = Node._get_title(element)
-        version = Node._get_version(element)
-        hierarchical_title = (
-            f"{parent.hierarchical_title} - {number} {name}".replace("  ", " ")
-            .replace("\n", "")
-            .strip()
-        )
-
-        node = Node(
+        return Node(
             name=name,
-            hierarchical_name=f"{parent.hierarchical_name} -> {name}".replace("  ", " ")
-            .replace("\n", "")
-            .strip(),
             number=number,
-            hierarchical_number=f"{parent.hierarchical_number} -> {number}".replace("  ", " ")
-            .replace("\n", "")
-            .strip(),
-            hierarchical_title=hierarchical_title,
-            content=Node._body_text(element),
-            version=version,
-            id=UUID(text_hash(f"{hierarchical_title}-v{version}"), version=4),
+            content=content,
+            version=Node._get_version(element),
             parent=parent,
             hierarchy=self,
         )
 
+    def _build_node(self, element: etree.Element, parent: Node) -> Node:
+        node = self._new_node(element, parent, Node._body_text(element))
+
         if Node.is_leaf_node(element):
             # logger.info(f"Created {node}")
             self.children.append(node)
@@ -160,25 +265,64 @@ class Hierarchy:
         """
         tree = etree.parse(self.path)
         root_element = tree.find('code[@type="Root"]')
-        number, name = Node._get_title(root_element)
-        version = Node._get_version(root_element)
-        hierarchical_title = f"{number} {name}".replace("  ", " ").replace("\n", "").strip()
-
-        self.root_node = Node(
-            name=name,
-            hierarchical_name=name,
-            number=number,
-            hierarchical_number=number,
-            hierarchical_title=hierarchical_title,
-            content="",
-            version=version,
-            id=UUID(text_hash(f"{hierarchical_title}-v{version}"), version=4),
-            parent=None,
-            hierarchy=self,
-        )
+        self.root_node = self._new_node(root_element, None, "")
 
         for child in root_element.findall("code"):
             child_node = self._build_node(child, self.root_node)
             self.root_node.child_nodes.append(child_node)
 
         return self.root_node
+
+    def iter_sections(self) -> Iterator[Node]:
+        """
+        Stream the leaf sections of the XML file in document order, without building the tree.
+
+        Yields the same nodes, in the same order, as ``build_hierarchy`` collects in
+        ``children``, but parses with ``iterparse`` and clears every element once it has
+        been consumed, so memory stays flat however large the file is. Ancestors are only
+        held while they are open and are linked to their children through ``parent`` alone:
+        ``child_nodes`` stays empty and ancestor ``content`` is not extracted, since only
+        leaf sections are ingested. Neither ``children`` nor ``root_node`` is populated
+        beyond the root itself.
+        """
+        # Open <code> elements, outermost first, each paired with its Node. A Node is built
+        # lazily: at its first child <code> (its own number/name/version are parsed by then)
+        # or at its end tag if it turns out to be a leaf.
+        stack: List[List] = []
+        for event, element in etree.iterparse(
+            str(self.path), events=("start", "end"), tag="code", huge_tree=True
+        ):
+            if event == "start":
+                if stack:
+                    frame = stack[-1]
+                    if frame[1] is None:
+                        parent = stack[-2][1] if len(stack) > 1 else None
+                        frame[1] = self._new_node(frame[0], parent, "")
+                        if parent is None:
+                            self.root_node = frame[1]
+                    stack.append([element, None])
+                elif self.root_node is None and self._is_root_element(element):
+                    stack.append([element, None])
+                continue
+
+            if not stack or stack[-1][0] is not element:
+                continue
+            _, node = stack.pop()
+            if node is None:
+                parent = stack[-1][1] if stack else None
+                if parent is None:
+                    self.root_node = self._new_node(element, None, "")
+                else:
+                    yield self._new_node(element, parent, Node._body_text(element))
+
+            # Drop the finished subtree and everything before it (including the parent's
+            # number/name/version, which are already captured in its Node).
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    @staticmethod
+    def _is_root_element(element: etree.Element) -> bool:
+        # Mirrors tree.find('code[@type="Root"]'): a Root <code> directly under the document root.
+        parent = element.getparent()
+        return element.get("type") == "Root" and parent is not None and parent.getparent() is None
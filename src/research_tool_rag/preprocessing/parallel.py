@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from research_tool_rag.preprocessing.hierarchy import Hierarchy, SectionRecord
+from research_tool_rag.preprocessing.parse_cache import ParsedCorpusCache
+from research_tool_rag.utils.utils import file_hash
+
+ParsedFile = Tuple[Path, List[SectionRecord], float]
+
+
+class FileParseError(Exception):
+    """Parsing ``path`` failed; the original exception is the ``__cause__``."""
+
+    def __init__(self, path: Path):
+        super().__init__(f"Failed to parse {path}")
+        self.path = path
+
+
+def parse_file(
+    path: Path, content_hash: Optional[str] = None, cache: Optional[ParsedCorpusCache] = None
+) -> ParsedFile:
+    """
+    Parse one XML file into section records. Runs inside pool workers, so it only returns
+    plain records (never ``Node`` objects with their parent/hierarchy back-references) plus
+    the seconds spent parsing. With a ``cache`` the records are loaded from it when present
+    and stored in it otherwise.
+    """
+    start = time.perf_counter()
+    if cache is not None:
+        content_hash = content_hash or file_hash(path)
+        if (records := cache.load(content_hash)) is not None:
+            return path, records, time.perf_counter() - start
+    records = [section.to_record() for section in Hierarchy(path=path).iter_sections()]
+    if cache is not None:
+        cache.put(content_hash, records)
+    return path, records, time.perf_counter() - start
+
+
+def parse_files(
+    files: Iterable[Union[Path, Tuple[Path, str]]],
+    workers: int,
+    max_in_flight: Optional[int] = None,
+    cache: Optional[ParsedCorpusCache] = None,
+) -> Iterator[ParsedFile]:
+    """
+    Shard ``files`` across a pool of ``workers`` processes and yield each parsed file as
+    soon as it is ready (completion order, not input order).
+
+    ``files`` holds paths or ``(path, content_hash)`` pairs and is consumed lazily; at most
+    ``max_in_flight`` files (default twice the worker count) are submitted at a time, so
+    memory stays bounded when the consumer is slower than the pool. A file that fails to
+    parse raises ``FileParseError``.
+    """
+    max_in_flight = max_in_flight or 2 * workers
+    files = iter(files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < max_in_flight:
+                item = next(files, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    path, content_hash = item if isinstance(item, tuple) else (item, None)
+                    in_flight[pool.submit(parse_file, path, content_hash, cache)] = path
+            if not in_flight:
+                return
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = in_flight.pop(future)
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    raise FileParseError(path) from e
+                yield parsed
@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+import pyarrow as pa
+
+from research_tool_rag.preprocessing.hierarchy import PARSER_VERSION, SectionRecord
+
+SCHEMA = pa.schema([(name, pa.string()) for name in SectionRecord._fields])
+
+
+class ParsedCorpusCache:
+    """
+    Flattened section records per XML file, stored as LZ4-compressed Arrow IPC files.
+
+    Entries are keyed by the file's content hash and ``PARSER_VERSION``, so an unchanged
+    fixture is parsed once and every later run (reindexing with another embedding model,
+    chunking experiments, ...) memory-maps its sections instead of walking the XML again.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    @classmethod
+    def default(cls) -> "ParsedCorpusCache":
+        return cls(Path(__file__).parent.parent.parent.parent.resolve() / "data" / "02.parsed")
+
+    def _path(self, content_hash: str) -> Path:
+        return self.root / f"{content_hash}-p{PARSER_VERSION}.arrow"
+
+    def __contains__(self, content_hash: str) -> bool:
+        return self._path(content_hash).exists()
+
+    def iter_batches(self, content_hash: str) -> Iterator[List[SectionRecord]]:
+        with pa.memory_map(str(self._path(content_hash))) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                columns = reader.get_batch(i).to_pydict()
+                yield [SectionRecord._make(row) for row in zip(*columns.values())]
+
+    def load(self, content_hash: str) -> Optional[List[SectionRecord]]:
+        if content_hash not in self:
+            return None
+        return [record for batch in self.iter_batches(content_hash) for record in batch]
+
+    def writer(self, content_hash: str) -> "CacheWriter":
+        return CacheWriter(self._path(content_hash))
+
+    def put(self, content_hash: str, records: Iterable[SectionRecord]) -> None:
+        with self.writer(content_hash) as writer:
+            writer.write(list(records))
+
+
+class CacheWriter:
+    """
+    Writes one cache entry incrementally, one record batch per ``write`` call, so a file
+    can be cached while it is being streamed. The entry only becomes visible (atomic
+    rename) when the context exits cleanly.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        self._sink = None
+        self._writer = None
+
+    def __enter__(self) -> "CacheWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._sink = pa.OSFile(str(self._tmp_path), "wb")
+        self._writer = pa.ipc.new_file(
+            self._sink, SCHEMA, options=pa.ipc.IpcWriteOptions(compression="lz4")
+        )
+        return self
+
+    def write(self, records: List[SectionRecord]) -> None:
+        if records:
+            columns = zip(*records)
+            self._writer.write_batch(
+                pa.record_batch([pa.array(column, pa.string()) for column in columns], SCHEMA)
+            )
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._writer.close()
+        self._sink.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.path)
+        else:
+            self._tmp_path.unlink(missing_ok=True)
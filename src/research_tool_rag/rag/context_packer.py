@@ -0,0 +1,143 @@
+import logging
+import re
+import zlib
+from typing import List, Optional, Set
+
+from langchain_core.documents import Document
+
+from research_tool_rag.db_store.sparse import HashedBM25
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends, clause ends and line breaks; statutes are mostly long ";"-joined clauses.
+_SENTENCE_END = re.compile(r"(?<=[.;:])\s+(?=[A-Z(0-9])|\n+")
+# Rough characters per token, for points ingested before token counts were stored.
+_CHARS_PER_TOKEN = 4
+
+
+def passage_tokens(document: Document) -> int:
+    """Token count of ``document`` from its payload (whole section or single chunk)."""
+    metadata = document.metadata
+    if "chunk_index" not in metadata and metadata.get("section_token_count"):
+        return metadata["section_token_count"]
+    if metadata.get("token_count"):
+        return metadata["token_count"]
+    return len(document.page_content) // _CHARS_PER_TOKEN + 1
+
+
+def _shingles(tokens: List[str], size: int = 3) -> Set[int]:
+    if len(tokens) < size:
+        return {zlib.crc32(" ".join(tokens).encode("utf-8"))}
+    return {
+        zlib.crc32(" ".join(tokens[i : i + size]).encode("utf-8"))
+        for i in range(len(tokens) - size + 1)
+    }
+
+
+def _split_words(text: str, max_chars: int) -> List[str]:
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        cut = cut if cut > 0 else max_chars
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    return pieces + [text] if text else pieces
+
+
+class ContextPacker:
+    """
+    Fits retrieved passages into a token budget before generation.
+
+    Passages are taken in ranking order. Near-duplicates of a passage already kept (word
+    3-gram Jaccard similarity of at least ``dedup_threshold``) are dropped. A passage that
+    fits the remaining budget and ``max_passage_tokens`` is kept whole; a larger one is cut
+    down to its sentences sharing the most terms with the question, kept in their original
+    order. Token counts come from the payload written at ingest (``section_token_count``,
+    ``token_count``); sentence costs are prorated by length, so nothing is re-tokenized.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 3000,
+        max_passage_tokens: int = 1200,
+        dedup_threshold: float = 0.8,
+        min_passage_tokens: int = 32,
+    ):
+        self.token_budget = token_budget
+        self.max_passage_tokens = max_passage_tokens
+        self.dedup_threshold = dedup_threshold
+        self.min_passage_tokens = min_passage_tokens
+
+    @classmethod
+    def from_config(cls, config) -> Optional["ContextPacker"]:
+        if not getattr(config, "context_packing_enabled", False):
+            return None
+        return cls(
+            token_budget=config.context_token_budget,
+            max_passage_tokens=config.context_max_passage_tokens,
+            dedup_threshold=config.context_dedup_threshold,
+        )
+
+    def _duplicate(self, shingles: Set[int], kept: List[Set[int]]) -> bool:
+        for other in kept:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.dedup_threshold:
+                return True
+        return False
+
+    @staticmethod
+    def extract(question_terms: Set[str], text: str, tokens: int, budget: int) -> str:
+        """The sentences of ``text`` most relevant to the question that fit ``budget``."""
+        per_char = tokens / max(len(text), 1)
+        # Run-on clauses longer than a quarter of the budget are cut at word boundaries.
+        max_chars = max(int(budget / 4 / per_char), 1)
+        sentences = [
+            piece
+            for sentence in _SENTENCE_END.split(text)
+            if sentence and sentence.strip()
+            for piece in _split_words(sentence.strip(), max_chars)
+        ]
+        ranked = sorted(
+            range(len(sentences)),
+            key=lambda i: (-len(question_terms & set(HashedBM25.tokenize(sentences[i]))), i),
+        )
+        chosen, used = [], 0.0
+        for i in ranked:
+            cost = len(sentences[i]) * per_char
+            if used + cost <= budget:
+                chosen.append(i)
+                used += cost
+        return " … ".join(sentences[i] for i in sorted(chosen))
+
+    def pack(self, question: str, documents: List[Document]) -> List[Document]:
+        question_terms = set(HashedBM25.tokenize(question))
+        packed: List[Document] = []
+        kept_shingles: List[Set[int]] = []
+        remaining = self.token_budget
+        for document in documents:
+            if remaining < self.min_passage_tokens:
+                break
+            shingles = _shingles(HashedBM25.tokenize(document.page_content))
+            if self._duplicate(shingles, kept_shingles):
+                continue
+            tokens = passage_tokens(document)
+            cap = min(remaining, self.max_passage_tokens)
+            content = document.page_content
+            if tokens > cap:
+                content = self.extract(question_terms, content, tokens, cap)
+                if not content:
+                    continue
+                tokens = min(round(len(content) * tokens / len(document.page_content)) + 1, cap)
+            kept_shingles.append(shingles)
+            remaining -= tokens
+            packed.append(
+                Document(
+                    page_content=content,
+                    metadata={**document.metadata, "packed_tokens": tokens},
+                )
+            )
+        logger.debug(
+            f"Packed {len(packed)}/{len(documents)} passages into "
+            f"{self.token_budget - remaining}/{self.token_budget} tokens"
+        )
+        return packed
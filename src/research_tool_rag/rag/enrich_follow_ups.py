@@ -0,0 +1,250 @@
+"""
+Offline enrichment: store candidate follow-up questions in every section's payload.
+
+For each section whose ``content_hash`` differs from the ``follow_ups_hash`` it was last
+enriched with (new, changed or never enriched sections), or whose ``follow_ups_version``
+differs from the current prompt, model and question count, an LLM writes a few questions a
+reader of that section is likely to ask next. They are merged into the ``metadata``
+payload of all the section's chunk points as ``follow_ups``, so at query time
+``suggested_prompts`` is assembled from the retrieved sections with no LLM tokens.
+
+Sections are processed in batches, each written as soon as it is generated, so an
+interrupted run resumes where it stopped. Generated questions are also kept in a local
+store keyed by content hash: re-ingesting a file re-creates its points without
+``follow_ups``, and unchanged sections then get theirs back without a new LLM call.
+
+    python -m research_tool_rag.rag.enrich_follow_ups --batch_size 16 --max_concurrency 4
+"""
+import argparse
+import json
+import logging
+import time
+from typing import Dict, Iterator, List, Optional
+
+from qdrant_client import models
+
+from research_tool_rag.configs import config
+from research_tool_rag.db_store.qdrant import QdrantDB
+from research_tool_rag.rag.suggestions import parse_prompts
+from research_tool_rag.utils.kv_store import SqliteKVStore
+from research_tool_rag.utils.memo import model_name, template_version
+from research_tool_rag.utils.utils import setup_logging, text_hash
+
+logger = logging.getLogger(__name__)
+
+# Long sections are cut here; the opening of a statute says what it is about.
+MAX_SECTION_CHARS = 6000
+
+FOLLOW_UPS_TEMPLATE = """
+You are a legal assistant with knowledge of US federal and state laws.
+
+Below is a statute section that was just shown to a user. Write {count} concise questions the user is likely to ask next about it or the rules around it. Each question must make sense on its own.
+
+Respond ONLY with a JSON array of strings.
+
+Section: {name}
+
+{text}
+
+JSON array:
+"""
+
+
+class FollowUpEnricher:
+    """Runs the enrichment described above over ``db``'s collection, using ``llm``."""
+
+    def __init__(
+        self,
+        db: QdrantDB,
+        llm,
+        store: Optional[SqliteKVStore] = None,
+        batch_size: int = 16,
+        max_concurrency: int = 4,
+        count: int = 3,
+    ):
+        self.db = db
+        self.llm = llm
+        self.store = store
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.count = count
+        # Changing the prompt or the model retires stored questions.
+        self.version = f"{template_version(FOLLOW_UPS_TEMPLATE)}:{model_name(llm)}:{count}"
+        self.metadata_key = db.vector_store.metadata_payload_key
+
+    def _field(self, name: str) -> str:
+        return f"{self.metadata_key}.{name}"
+
+    def _pending_sections(self) -> Iterator[dict]:
+        """First chunk of every section whose follow-ups are missing or stale."""
+        first_chunks = models.Filter(
+            should=[
+                models.FieldCondition(
+                    key=self._field("chunk_index"), match=models.MatchValue(value=0)
+                ),
+                models.IsEmptyCondition(
+                    is_empty=models.PayloadField(key=self._field("chunk_index"))
+                ),
+            ]
+        )
+        offset = None
+        while True:
+            points, offset = self.db.client.scroll(
+                collection_name=self.db.collection_name,
+                scroll_filter=first_chunks,
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            for point in points:
+                document = self.db._document_from_point(point)
+                metadata = document.metadata
+                section_id = metadata.get("section_id") or metadata["_id"]
+                content_hash = metadata.get("content_hash") or (
+                    text_hash(document.page_content) if document.page_content.strip() else ""
+                )
+                if not content_hash or (
+                    metadata.get("follow_ups_hash") == content_hash
+                    and metadata.get("follow_ups_version") == self.version
+                ):
+                    continue
+                yield {
+                    "section_id": section_id,
+                    "point_id": point.id,
+                    # Points ingested before chunking have no section_id to filter on.
+                    "legacy": "section_id" not in metadata,
+                    "name": metadata.get("hierarchical_name", ""),
+                    "text": document.page_content,
+                    "chunked": metadata.get("chunk_count", 1) > 1,
+                    "content_hash": content_hash,
+                }
+            if offset is None:
+                return
+
+    def _batches(self) -> Iterator[List[dict]]:
+        batch = []
+        for section in self._pending_sections():
+            batch.append(section)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _key(self, content_hash: str) -> str:
+        return f"{self.version}:{content_hash}"
+
+    def _generate(self, sections: List[dict]) -> Dict[str, List[str]]:
+        """Follow-ups per content hash: from the local store, else one batched LLM call."""
+        found = {}
+        if self.store is not None:
+            stored = self.store.get_many(self._key(s["content_hash"]) for s in sections)
+            for section in sections:
+                raw = stored.get(self._key(section["content_hash"]))
+                if raw is not None:
+                    found[section["content_hash"]] = json.loads(raw)
+        missing = [s for s in sections if s["content_hash"] not in found]
+        if not missing:
+            return found
+
+        chunked = [s["section_id"] for s in missing if s["chunked"]]
+        texts = self.db.fetch_sections(chunked) if chunked else {}
+        prompts = [
+            FOLLOW_UPS_TEMPLATE.format(
+                count=self.count,
+                name=s["name"],
+                text=texts.get(s["section_id"], s["text"])[:MAX_SECTION_CHARS],
+            )
+            for s in missing
+        ]
+        responses = self.llm.batch(
+            prompts, config={"max_concurrency": self.max_concurrency}, return_exceptions=True
+        )
+        generated = {}
+        for section, response in zip(missing, responses):
+            if isinstance(response, Exception):
+                logger.warning(f"Follow-ups for {section['section_id']} failed: {response}")
+                continue
+            text = response.content if hasattr(response, "content") else response
+            questions = parse_prompts(text, limit=self.count)
+            if questions:
+                generated[section["content_hash"]] = questions
+            else:
+                logger.warning(f"No follow-ups parsed for {section['section_id']}: {text!r}")
+        if self.store is not None and generated:
+            self.store.put_many(
+                {self._key(h): json.dumps(q).encode("utf-8") for h, q in generated.items()}
+            )
+        return {**found, **generated}
+
+    def _write(self, sections: List[dict], follow_ups: Dict[str, List[str]]) -> int:
+        written = 0
+        for section in sections:
+            questions = follow_ups.get(section["content_hash"])
+            if questions is None:
+                continue
+            # Every chunk of the section carries them, whichever chunk retrieval hits.
+            if section["legacy"]:
+                points = [section["point_id"]]
+            else:
+                points = self.db._section_filter([section["section_id"]])
+            # One call per section: batch_update_points drops ``key`` in local mode.
+            self.db.client.set_payload(
+                collection_name=self.db.collection_name,
+                payload={
+                    "follow_ups": questions,
+                    "follow_ups_hash": section["content_hash"],
+                    "follow_ups_version": self.version,
+                },
+                points=points,
+                # Merged into the nested metadata object, other fields untouched.
+                key=self.metadata_key,
+                wait=True,
+            )
+            written += 1
+        if written:
+            # Tells serving copies of the collection (the NumPy index) to reload.
+            self.db.mark_changed()
+        return written
+
+    def run(self) -> dict:
+        start = time.perf_counter()
+        stats = {"sections": 0, "enriched": 0, "failed": 0}
+        for batch in self._batches():
+            written = self._write(batch, self._generate(batch))
+            stats["sections"] += len(batch)
+            stats["enriched"] += written
+            stats["failed"] += len(batch) - written
+            logger.info(
+                f"Enriched {stats['enriched']} sections ({stats['failed']} failed) "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store follow-up questions in section payloads.")
+    parser.add_argument("--batch_size", type=int, default=16, help="Sections per LLM batch.")
+    parser.add_argument(
+        "--max_concurrency", type=int, default=4, help="Concurrent LLM requests per batch."
+    )
+    parser.add_argument("--count", type=int, default=3, help="Questions per section.")
+    args = parser.parse_args()
+
+    setup_logging("enrich_follow_ups", stream_handler=True)
+    config.use_config("online")
+    path = getattr(config, "follow_ups_store_path", None)
+    enricher = FollowUpEnricher(
+        QdrantDB(),
+        getattr(config, "suggestions_llm", None) or config.llm,
+        store=SqliteKVStore(path) if path else None,
+        batch_size=args.batch_size,
+        max_concurrency=args.max_concurrency,
+        count=args.count,
+    )
+    logger.info(f"Follow-up enrichment finished: {enricher.run()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,13 @@
 import argparse
 import logging
 from pathlib import Path
-import time
-
-from langchain_core.documents import Document
 
 from research_tool_rag.configs import config
+from research_tool_rag.db_store.answer_cache import SemanticAnswerCache
 from research_tool_rag.db_store.qdrant import QdrantDB
-from research_tool_rag.preprocessing.hierarchy import Hierarchy
+from research_tool_rag.preprocessing.parse_cache import ParsedCorpusCache
+from research_tool_rag.rag.ingest_manifest import IngestManifest
+from research_tool_rag.rag.ingest_pipeline import IngestPipeline
 from research_tool_rag.utils.utils import setup_logging
 
 logger = logging.getLogger(__name__)
@@ -101,57 +101,52 @@ logger.info("Starting to build hierarchy from XML file.")
 #         _ = vector_store.add_documents(documents=docs)
 
 
-def process_and_ingest(content_set):
-    l = ['judiciary.xml','legislative.xml','defense_emergency_act_1951.xml','regulation_of_lobbying_act.xml','canal.xml','retirement_and_social_security.xml','state_administrative_procedure_act.xml',
-         'emergency_housing_rent_control_law.xml','real_property_actions_and_proceedings.xml','nys_project_finance_agency_act.xml','second_class_cities.xml','personal_property.xml',
-         'surrogates_court_procedure.xml','civil_practice_law_and_rules.xml','lien.xml']
-    not_done = []
-    qdb = QdrantDB()
-    for files in Path(__file__).parent.parent.parent.parent.glob(
+def process_and_ingest(
+    content_set,
+    batch_size: int = 64,
+    workers: int = 1,
+    embed_workers: int = 4,
+    queue_size: int = 8,
+    force: bool = False,
+    reindex: bool = False,
+    drop_previous: bool = False,
+    parse_cache: bool = True,
+    chunk_tokens: int = 512,
+    chunk_overlap: int = 64,
+):
+    # A reindex fills a fresh versioned collection while the alias keeps serving the old one.
+    qdb = QdrantDB.new_version() if reindex else QdrantDB()
+    # Files already ingested (and unchanged since) are skipped via the manifest, so an
+    # interrupted run can simply be restarted.
+    manifest = IngestManifest.for_collection(qdb.collection_name, content_set)
+    if force:
+        manifest.reset()
+    # Entries for a collection that has since been recreated (or swapped behind the alias)
+    # describe points that are not there any more.
+    collection = qdb.resolve()
+    manifest.check_collection(collection, qdb.client.count(collection, exact=False).count)
+    files = Path(__file__).parent.parent.parent.parent.glob(
         f"data/00.raw/{content_set}/*/**/*.xml"
-    ):
-        if files.name in l:
-            continue
-        logger.info(f"Processing file: {files}")
-        title = Hierarchy(path=files)
-        title.build_hierarchy()
-        docs = []
-        for section in title.children:
-            idx = 0
-            docs.append(
-                Document(
-                    page_content=section.content,
-                    metadata={
-                        "section_id": str(section.id),
-                        "number": section.number,
-                        "name": section.name,
-                        "state": section.hierarchy.state,
-                        "law_type": section.hierarchy.law_type,
-                        "title": section.hierarchical_title,
-                        "hierarchical_name": section.hierarchical_name,
-                        "hierarchical_number": section.hierarchical_number,
-                        "paragraph_id": f"{str(section.id)}_{idx}",
-                    },
-                )
-            )
-
-        logger.info(f"Indexed sections from {files} into Qdrant.")
-
-        # text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        # all_splits = text_splitter.split_documents(docs)
-
-        # Index chunks
-        try:
-            for doc in docs:
-                _ = qdb.vector_store.add_documents(documents=[doc])
-                time.sleep(0.1)
-            l.append(files.name)
-                
-        except Exception as e:
-            print(f"Error indexing {files}: {e}")
-            print(l)
-            raise e
-                # not_done = not_done.append(files.name)
+    )
+    pipeline = IngestPipeline(
+        qdb,
+        batch_size=batch_size,
+        parse_workers=workers,
+        embed_workers=embed_workers,
+        queue_size=queue_size,
+        manifest=manifest,
+        parse_cache=ParsedCorpusCache.default() if parse_cache else None,
+        chunk_tokens=chunk_tokens,
+        chunk_overlap=chunk_overlap,
+    )
+    stats = pipeline.run(files)
+    if reindex:
+        # Cached answers are tied to the collection version, so promoting retires them.
+        qdb.promote(drop_previous=drop_previous)
+    elif stats["upsert"].items and getattr(config, "answer_cache_enabled", False):
+        # Same collection, new content: answers cached from the old content are stale.
+        SemanticAnswerCache(qdb).clear()
+    return stats
 
 
 if __name__ == "__main__":
@@ -159,7 +154,58 @@ if __name__ == "__main__":
     parser.add_argument(
         "--content_set", type=str, required=True, help="Which content set to ingest."
     )
+    parser.add_argument(
+        "--batch_size", type=int, default=64, help="Sections embedded and upserted per request."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes parsing XML files in parallel (1 parses in the ingest process).",
+    )
+    parser.add_argument(
+        "--embed_workers", type=int, default=4, help="Concurrent embedding requests."
+    )
+    parser.add_argument(
+        "--queue_size", type=int, default=8, help="Batches buffered between pipeline stages."
+    )
+    parser.add_argument(
+        "--chunk_tokens", type=int, default=512, help="Maximum tokens per embedded chunk."
+    )
+    parser.add_argument(
+        "--chunk_overlap", type=int, default=64, help="Tokens shared by consecutive chunks."
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Re-ingest every file, ignoring the manifest."
+    )
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="Build a new versioned collection and swap the serving alias to it when done.",
+    )
+    parser.add_argument(
+        "--drop_previous",
+        action="store_true",
+        help="With --reindex, delete the collection the alias pointed at before the swap.",
+    )
+    parser.add_argument(
+        "--no_parse_cache",
+        action="store_true",
+        help="Always parse the XML instead of reusing cached sections from earlier runs.",
+    )
     # parser.add_argument("--online_model", type=bool, default=False, help="Use online model for processing.")
     args = parser.parse_args()
     config.use_config("online")
-    process_and_ingest(args.content_set)
+    process_and_ingest(
+        args.content_set,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        embed_workers=args.embed_workers,
+        queue_size=args.queue_size,
+        force=args.force,
+        reindex=args.reindex,
+        drop_previous=args.drop_previous,
+        parse_cache=not args.no_parse_cache,
+        chunk_tokens=args.chunk_tokens,
+        chunk_overlap=args.chunk_overlap,
+    )
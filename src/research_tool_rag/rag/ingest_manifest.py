@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Literal, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Status = Literal["in_progress", "done", "failed"]
+
+
+class IngestManifest:
+    """
+    On-disk record of which XML files have been ingested into a collection.
+
+    Each entry stores the file's content hash, the parameters it was chunked with, its
+    section count and its status. A file is skipped on the next run only if it is ``done``
+    *and* its hash and parameters still match, so edited fixtures and a new chunk size or
+    parser version are picked up again automatically. The manifest also records the
+    concrete collection it describes (see ``check_collection``). It is rewritten atomically
+    after every change so a crash never leaves it half written.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.files = {}
+        self.collection: Optional[str] = None
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.collection = data.get("collection")
+
+    @classmethod
+    def for_collection(cls, collection_name: str, content_set: str) -> "IngestManifest":
+        root = Path(__file__).parent.parent.parent.parent.resolve()
+        return cls(root / "data" / "01.manifest" / collection_name / f"{content_set}.json")
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return Path(path).resolve().as_posix()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"collection": self.collection, "files": self.files}, f, indent=2, sort_keys=True
+            )
+        os.replace(tmp_path, self.path)
+
+    def _update(self, path: Path, status: Status, **fields) -> None:
+        with self._lock:
+            entry = self.files.setdefault(self._key(path), {})
+            entry.update(fields)
+            entry["status"] = status
+            entry["updated_at"] = datetime.now(timezone.utc).isoformat()
+            self._save()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.files = {}
+            self._save()
+
+    def check_collection(self, collection: str, points: int) -> bool:
+        """
+        Forget every entry if they were written for another concrete ``collection`` than
+        this one (e.g. an alias now pointing elsewhere), or if files are marked done but
+        the collection holds no ``points``: it was dropped and recreated since. Returns
+        whether the entries were dropped.
+        """
+        with self._lock:
+            done = any(entry.get("status") == "done" for entry in self.files.values())
+            stale = bool(self.files) and (self.collection != collection or (done and not points))
+            if stale:
+                logger.info(
+                    f"Manifest {self.path} was written for collection {self.collection}, "
+                    f"now {collection} with {points} points; re-ingesting every file"
+                )
+                self.files = {}
+            self.collection = collection
+            self._save()
+        return stale
+
+    def is_done(self, path: Path, content_hash: str, params: Optional[dict] = None) -> bool:
+        entry = self.files.get(self._key(path))
+        return (
+            bool(entry)
+            and entry["status"] == "done"
+            and entry["hash"] == content_hash
+            and entry.get("params") == params
+        )
+
+    def start(self, path: Path, content_hash: str, params: Optional[dict] = None) -> None:
+        self._update(
+            path, "in_progress", hash=content_hash, params=params, sections=None, error=None
+        )
+
+    def complete(self, path: Path, sections: int) -> None:
+        self._update(path, "done", sections=sections)
+
+    def fail(self, path: Path, error: Optional[str] = None) -> None:
+        self._update(path, "failed", error=error)
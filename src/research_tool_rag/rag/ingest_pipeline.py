@@ -0,0 +1,377 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from research_tool_rag.db_store.qdrant import QdrantDB
+from research_tool_rag.preprocessing.chunking import chunk_text, get_encoding
+from research_tool_rag.preprocessing.hierarchy import PARSER_VERSION, Hierarchy, SectionRecord
+from research_tool_rag.preprocessing.parallel import FileParseError, parse_files
+from research_tool_rag.preprocessing.parse_cache import ParsedCorpusCache
+from research_tool_rag.rag.ingest_manifest import IngestManifest
+from research_tool_rag.utils.utils import file_hash, text_hash
+
+logger = logging.getLogger(__name__)
+
+# Sentinel pushed through the queues to tell a stage worker to stop.
+_STOP = object()
+
+
+def chunk_point_id(section_id: str, idx: int) -> str:
+    # The first chunk keeps the section's own id, so unchunked sections keep the point ids
+    # they had before chunking; later chunks get ids derived from it deterministically.
+    if idx == 0:
+        return section_id
+    return str(uuid.uuid5(uuid.UUID(section_id), str(idx)))
+
+
+def section_to_documents(
+    section: SectionRecord, max_tokens: int = 512, overlap: int = 64
+) -> Tuple[List[Document], List[str]]:
+    chunks = chunk_text(section.content, max_tokens=max_tokens, overlap=overlap)
+    # Chunk i starts at token i * (max_tokens - overlap), so this is the section's exact
+    # token count without encoding it again. Context packing budgets with it at query time.
+    section_tokens = chunks[-1].index * (max_tokens - overlap) + chunks[-1].token_count
+    # Lets offline enrichment (enrich_follow_ups) tell new or changed sections apart.
+    content_hash = text_hash(section.content) if section.content.strip() else ""
+    documents = [
+        Document(
+            page_content=chunk.text,
+            metadata={
+                "section_id": section.id,
+                "number": section.number,
+                "name": section.name,
+                "state": section.state,
+                "law_type": section.law_type,
+                "title": section.hierarchical_title,
+                "hierarchical_name": section.hierarchical_name,
+                "hierarchical_number": section.hierarchical_number,
+                "paragraph_id": f"{section.id}_{chunk.index}",
+                "chunk_index": chunk.index,
+                "chunk_count": len(chunks),
+                "chunk_start": chunk.char_start,
+                "token_count": chunk.token_count,
+                "section_token_count": section_tokens,
+                "content_hash": content_hash,
+            },
+        )
+        for chunk in chunks
+    ]
+    return documents, [chunk_point_id(section.id, chunk.index) for chunk in chunks]
+
+
+@dataclass
+class Batch:
+    source: Path
+    documents: List[Document]
+    ids: List[str]
+    vectors: Optional[List[List[float]]] = None
+
+
+@dataclass
+class StageStats:
+    name: str
+    unit: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def summary(self, wall_seconds: float) -> str:
+        """
+        Wall rate is what the stage delivered end to end; busy rate is what it could deliver
+        if it never waited on its neighbours. A stage whose busy rate is close to its wall
+        rate is the bottleneck.
+        """
+        wall_rate = self.items / wall_seconds if wall_seconds else 0.0
+        busy_rate = self.items / self.busy_seconds if self.busy_seconds else 0.0
+        return (
+            f"{self.name:<8} {self.items:>8} {self.unit:<9} "
+            f"{wall_rate:>9.1f} {self.unit}/s wall  {busy_rate:>9.1f} {self.unit}/s busy"
+        )
+
+
+class IngestPipeline:
+    """
+    Staged ingestion: parse XML -> build Documents -> embed in batches -> bulk upsert.
+
+    Every stage runs in its own thread(s) and hands work downstream through bounded
+    queues, so parsing the next title, embedding the current batch and writing the
+    previous one to Qdrant overlap instead of running back to back. The bounded queues
+    keep memory flat: a slow stage back-pressures the stages feeding it.
+    """
+
+    def __init__(
+        self,
+        qdb: QdrantDB,
+        batch_size: int = 64,
+        parse_workers: int = 1,
+        embed_workers: int = 4,
+        upsert_workers: int = 1,
+        queue_size: int = 8,
+        report_every: float = 30.0,
+        manifest: Optional[IngestManifest] = None,
+        parse_cache: Optional[ParsedCorpusCache] = None,
+        chunk_tokens: int = 512,
+        chunk_overlap: int = 64,
+    ):
+        self.qdb = qdb
+        self.manifest = manifest
+        self.parse_cache = parse_cache
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        # Everything besides the file itself that decides which points a file becomes;
+        # stored with each manifest entry, so changing any of it re-ingests the file.
+        self.params = {
+            "chunk_tokens": chunk_tokens,
+            "chunk_overlap": chunk_overlap,
+            "parser_version": PARSER_VERSION,
+            "encoding": get_encoding().name,
+        }
+        self.embeddings = qdb.embeddings
+        self.batch_size = batch_size
+        self.parse_workers = parse_workers
+        self.embed_workers = embed_workers
+        self.upsert_workers = upsert_workers
+        self.report_every = report_every
+
+        self._embed_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._upsert_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._failed = threading.Event()
+        self._error: Optional[BaseException] = None
+        # Batches still in flight per file; the file is done when its count drops to zero.
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+        self.stats = {
+            "parse": StageStats("parse", "sections"),
+            "embed": StageStats("embed", "vectors"),
+            "upsert": StageStats("upsert", "vectors"),
+        }
+
+    def _put(self, q: queue.Queue, item) -> None:
+        while not self._failed.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        while not self._failed.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _fail(self, stage: str, exc: BaseException, path: Optional[Path] = None) -> None:
+        logger.exception(f"{stage} stage failed: {exc}")
+        if self._error is None:
+            self._error = exc
+        self._failed.set()
+        if self.manifest is not None and path is not None:
+            self.manifest.fail(path, error=repr(exc))
+
+    def _batch_done(self, path: Path) -> None:
+        with self._pending_lock:
+            pending = self._pending[path]
+            pending["batches"] -= 1
+            finished = pending["batches"] == 0
+            if finished:
+                del self._pending[path]
+        if finished:
+            logger.info(f"Indexed {pending['sections']} sections from {path} into Qdrant.")
+            if self.manifest is not None:
+                self.manifest.complete(path, pending["sections"])
+
+    def _count_sections(self, path: Path, sections: int) -> None:
+        with self._pending_lock:
+            self._pending[path]["sections"] += sections
+
+    def _emit(self, path: Path, documents: List[Document], ids: List[str]) -> None:
+        with self._pending_lock:
+            self._pending[path]["batches"] += 1
+        self._put(self._embed_queue, Batch(source=path, documents=documents, ids=ids))
+
+    def _files_to_parse(self, files: Iterable[Path]) -> Iterator[Tuple[Path, str]]:
+        for path in files:
+            if self._failed.is_set():
+                return
+            content_hash = file_hash(path)
+            if self.manifest is not None and self.manifest.is_done(path, content_hash, self.params):
+                logger.info(f"Skipping already ingested file: {path}")
+                continue
+            logger.info(f"Processing file: {path}")
+            if self.manifest is not None:
+                self.manifest.start(path, content_hash, self.params)
+            # The parse stage holds one extra "batch" for the file until it has read it
+            # to the end, so the file cannot be marked done while batches are still coming.
+            with self._pending_lock:
+                self._pending[path] = {"batches": 1, "sections": 0}
+            yield path, content_hash
+
+    def _parse_serial(
+        self, files: Iterable[Tuple[Path, str]]
+    ) -> Iterator[Tuple[Path, List[SectionRecord], float, bool]]:
+        for path, content_hash in files:
+            if self.parse_cache is not None and content_hash in self.parse_cache:
+                start = time.perf_counter()
+                for records in self.parse_cache.iter_batches(content_hash):
+                    yield path, records, time.perf_counter() - start, False
+                    start = time.perf_counter()
+                yield path, [], 0.0, True
+                continue
+
+            # Sections are streamed out of the XML and shipped as soon as a batch fills, so a
+            # large title never has to be held in memory as a whole. The cache entry is
+            # written batch by batch alongside and only published once the file is complete.
+            try:
+                with ExitStack() as stack:
+                    cache_writer = None
+                    if self.parse_cache is not None:
+                        cache_writer = stack.enter_context(self.parse_cache.writer(content_hash))
+                    records = []
+                    start = time.perf_counter()
+                    for section in Hierarchy(path=path).iter_sections():
+                        records.append(section.to_record())
+                        if len(records) == self.batch_size:
+                            if cache_writer is not None:
+                                cache_writer.write(records)
+                            yield path, records, time.perf_counter() - start, False
+                            records = []
+                            start = time.perf_counter()
+                    if cache_writer is not None:
+                        cache_writer.write(records)
+            except Exception as e:
+                raise FileParseError(path) from e
+            yield path, records, time.perf_counter() - start, True
+
+    def _parse_parallel(
+        self, files: Iterable[Tuple[Path, str]]
+    ) -> Iterator[Tuple[Path, List[SectionRecord], float, bool]]:
+        for path, records, seconds in parse_files(
+            files, self.parse_workers, cache=self.parse_cache
+        ):
+            yield path, records, seconds, True
+
+    def _parse_stage(self, files: Iterable[Path]) -> None:
+        path = None
+        try:
+            files = self._files_to_parse(files)
+            if self.parse_workers > 1:
+                parsed = self._parse_parallel(files)
+            else:
+                parsed = self._parse_serial(files)
+
+            documents, ids = [], []
+            for path, records, seconds, file_done in parsed:
+                if self._failed.is_set():
+                    return
+                start = time.perf_counter()
+                for record in records:
+                    # Point ids derive from Node.id, so re-ingesting a file overwrites its points.
+                    record_documents, record_ids = section_to_documents(
+                        record, self.chunk_tokens, self.chunk_overlap
+                    )
+                    documents.extend(record_documents)
+                    ids.extend(record_ids)
+                    while len(documents) >= self.batch_size:
+                        self._emit(path, documents[: self.batch_size], ids[: self.batch_size])
+                        documents, ids = documents[self.batch_size :], ids[self.batch_size :]
+                self.stats["parse"].add(len(records), seconds + time.perf_counter() - start)
+                self._count_sections(path, len(records))
+                # Batches never span files so a file is complete once its last batch lands.
+                if file_done:
+                    if documents:
+                        self._emit(path, documents, ids)
+                    documents, ids = [], []
+                    self._batch_done(path)
+        except FileParseError as e:
+            # Carries the file that failed to parse; ``path`` may still be the previous one.
+            self._fail("parse", e.__cause__, e.path)
+        except Exception as e:
+            self._fail("parse", e, path)
+
+    def _embed_stage(self) -> None:
+        batch = None
+        try:
+            while (batch := self._get(self._embed_queue)) is not _STOP:
+                start = time.perf_counter()
+                batch.vectors = self.embeddings.embed_documents(
+                    [doc.page_content for doc in batch.documents]
+                )
+                self.stats["embed"].add(len(batch.vectors), time.perf_counter() - start)
+                self._put(self._upsert_queue, batch)
+        except Exception as e:
+            self._fail("embed", e, batch.source if batch else None)
+
+    def _upsert_stage(self) -> None:
+        batch = None
+        try:
+            while (batch := self._get(self._upsert_queue)) is not _STOP:
+                start = time.perf_counter()
+                self.qdb.upsert_documents(batch.documents, batch.vectors, ids=batch.ids)
+                # Tells serving copies of the collection (the NumPy index) to reload.
+                self.qdb.mark_changed()
+                self.stats["upsert"].add(len(batch.documents), time.perf_counter() - start)
+                self._batch_done(batch.source)
+        except Exception as e:
+            self._fail("upsert", e, batch.source if batch else None)
+
+    def _join(self, threads: List[threading.Thread], started: float) -> None:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=self.report_every)
+                if thread.is_alive():
+                    self.log_progress(time.perf_counter() - started)
+
+    def log_progress(self, wall_seconds: float) -> None:
+        for stats in self.stats.values():
+            logger.info(stats.summary(wall_seconds))
+
+    def run(self, files: Iterable[Path]) -> dict:
+        started = time.perf_counter()
+
+        parser = threading.Thread(target=self._parse_stage, args=(files,), name="ingest-parse")
+        embedders = [
+            threading.Thread(target=self._embed_stage, name=f"ingest-embed-{i}")
+            for i in range(self.embed_workers)
+        ]
+        writers = [
+            threading.Thread(target=self._upsert_stage, name=f"ingest-upsert-{i}")
+            for i in range(self.upsert_workers)
+        ]
+        for thread in [parser, *embedders, *writers]:
+            thread.daemon = True
+            thread.start()
+
+        # Shut the stages down front to back so every queued batch is drained first.
+        self._join([parser], started)
+        for _ in embedders:
+            self._put(self._embed_queue, _STOP)
+        self._join(embedders, started)
+        for _ in writers:
+            self._put(self._upsert_queue, _STOP)
+        self._join(writers, started)
+
+        if self._error is not None:
+            raise self._error
+
+        wall_seconds = time.perf_counter() - started
+        logger.info(f"Ingestion finished in {wall_seconds:.1f}s")
+        self.log_progress(wall_seconds)
+        if hasattr(self.embeddings, "stats"):
+            logger.info(f"Embedding cache: {self.embeddings.stats()}")
+        return self.stats
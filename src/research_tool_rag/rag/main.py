@@ -1,9 +1,16 @@
+import json
 import logging
-from fastapi import FastAPI
+from typing import Literal, Optional
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from research_tool_rag.configs import config
+from research_tool_rag.db_store.embedding_cache import embedding_cache_stats
 from research_tool_rag.rag.pipeline import RAGPipeline
+from research_tool_rag.rag.suggestions import PENDING
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Research Tool",
@@ -33,18 +40,78 @@ async def read_root():
     logging.info("Root endpoint '/' accessed (health check).")
     return {"status": "ok", "message": "Research Tool API is running."}
 
+# Cache hit/miss counters
+@app.get("/stats")
+async def stats():
+    return {
+        "embedding_cache": embedding_cache_stats(),
+        "answer_cache": pipeline.answer_cache.stats() if pipeline.answer_cache else None,
+        "node_memo": pipeline.memo.stats(),
+        "router": pipeline.router.stats() if pipeline.router else None,
+        "reranker": pipeline.reranker.stats() if pipeline.reranker else None,
+        "speculative_retrieval": pipeline.speculation.stats(),
+    }
+
 # Request model for RAG endpoint
 class RAGRequest(BaseModel):
     query: str
     chat_history: list[dict] = []
+    # Optional retrieval filters, e.g. {"state": "NY", "law_type": "laws"}.
+    state: Optional[str] = None
+    law_type: Optional[Literal["laws", "regs", "regulations"]] = None
+    # Seconds the client will wait; optional steps such as reranking are skipped near it.
+    timeout: Optional[float] = None
 
 # RAG endpoint compatible with Streamlit
 @app.post("/rag")#, response_model=OutputState)
-def rag_query(request: RAGRequest):
+async def rag_query(request: RAGRequest):
     question = request.query or "Explain the penalties for violating agricultural market regulations in New York."
-    print(question)
+    logger.info(f"RAG question: {question!r}")
     # You can optionally pass chat_history to your pipeline if supported
-    result = pipeline.run(question=question)
+    result = await pipeline.arun(
+        question=question,
+        state_code=request.state,
+        law_type=request.law_type,
+        timeout=request.timeout,
+    )
     # result = {'answer':'this is generated msg','role':'bot','content':'message content',"suggested_prompts": ['whats up','nothing much']}
-    print(result['answer'])
+    logger.debug(f"RAG answer: {result['answer']!r}")
     return result
+
+# Streaming RAG endpoint: graph progress events, then answer tokens, as server-sent events
+@app.post("/rag/stream")
+async def rag_stream(request: RAGRequest):
+    question = request.query or "Explain the penalties for violating agricultural market regulations in New York."
+
+    async def events():
+        try:
+            async for event, data in pipeline.astream(
+                question=question,
+                state_code=request.state,
+                law_type=request.law_type,
+                timeout=request.timeout,
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            logging.exception("Streaming RAG request failed")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Follow-up prompts of an answer returned with a suggestions_id; waits up to `wait` seconds
+@app.get("/rag/suggestions/{suggestions_id}")
+async def rag_suggestions(suggestions_id: str, wait: float = 10.0):
+    prompts = None
+    if pipeline.suggestions:
+        prompts = await pipeline.suggestions.aresult(suggestions_id, timeout=wait)
+    if prompts is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired suggestions_id")
+    if prompts is PENDING:
+        return JSONResponse(status_code=202, content={"status": "pending"})
+    return {"suggestions_id": suggestions_id, "suggested_prompts": prompts}
@@ -1,15 +1,71 @@
 from langchain import hub
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_stream_writer
 from langgraph.graph import START, StateGraph
 from research_tool_rag.configs import config
-from research_tool_rag.db_store.qdrant import QdrantDB
+from research_tool_rag.db_store.answer_cache import SemanticAnswerCache
+from research_tool_rag.db_store.qdrant import QdrantDB, normalise_filters
+from research_tool_rag.rag.context_packer import ContextPacker
+from research_tool_rag.rag.reranker import CrossEncoderReranker
+from research_tool_rag.rag.router import GENERAL, LocalRouter
+from research_tool_rag.rag.suggestions import PENDING, FollowUpSuggestions
 from research_tool_rag.state.state_schema import InputState, OutputState, OverallState
-from typing import Literal
-import json, re
+from research_tool_rag.utils.json_stream import AnswerStreamParser
+from research_tool_rag.utils.memo import NodeMemo, model_name, template_version
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import AsyncIterator, List, Literal, Optional, Tuple
+import asyncio, logging, threading, time
+
+logger = logging.getLogger(__name__)
+
+GENERATE_NODES = ("generate_from_context_with_suggestions", "generate_direct_with_suggestions")
+ERROR_ANSWER = "⚠️ There was an error processing the response."
+
+
+class SpeculationStats:
+    """
+    Outcome of speculative retrievals. ``saved_ms`` is latency taken off the critical path
+    (the overlap of retrieval with classification), ``wasted_ms`` is retrieval work thrown
+    away because the question was not routed to ``retrieve``.
+    """
+
+    def __init__(self):
+        self.used = 0
+        self.discarded = 0
+        self.saved_ms = 0.0
+        self.wasted_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, used: bool, ms: float) -> dict:
+        with self._lock:
+            if used:
+                self.used += 1
+                self.saved_ms += ms
+            else:
+                self.discarded += 1
+                self.wasted_ms += ms
+        key = "saved_ms" if used else "wasted_ms"
+        return {"outcome": "used" if used else "discarded", key: round(ms, 1)}
+
+    def stats(self) -> dict:
+        return {
+            "used": self.used,
+            "discarded": self.discarded,
+            "saved_ms": round(self.saved_ms, 1),
+            "wasted_ms": round(self.wasted_ms, 1),
+            "mean_saved_ms": round(self.saved_ms / self.used, 1) if self.used else 0.0,
+        }
+
 
 class RAGPipeline:
     def __init__(self):
         self.db = QdrantDB()
         self.vector_store = self.db.vector_store
+        self.answer_cache = SemanticAnswerCache.from_config(self.db, config)
+        self.router = LocalRouter.from_config(self.db.embeddings, config)
+        self.reranker = CrossEncoderReranker.from_config(config)
+        self.packer = ContextPacker.from_config(config)
         self.prompt = hub.pull("rlm/rag-prompt")
         self.prompt.messages[
             0
@@ -18,6 +74,10 @@ Question: {question}
 Context: {context}
 Answer:"""
         self.llm = config.llm
+        self.suggestions = FollowUpSuggestions.from_config(config, self.llm)
+        self.memo = NodeMemo.from_config(config)
+        self.speculation = SpeculationStats()
+        self._speculative_pool = ThreadPoolExecutor(thread_name_prefix="speculative-retrieve")
         self.graph = self._build_graph()
 
         # US State Abbreviations as Literal Type
@@ -26,12 +86,94 @@ Answer:"""
 
         self.LawType = Literal["laws", "regulations"]
 
+    def _search_kwargs(self, sections: bool) -> dict:
+        # With a reranker, retrieval oversamples and the rerank node trims the list again.
+        if self.reranker is None:
+            return {}
+        if sections:
+            return {"k": self.reranker.candidates, "oversample": 1}
+        return {"k": self.reranker.candidates}
+
+    def search(
+        self,
+        question: str,
+        state_code: Optional[str] = None,
+        law_type: Optional[str] = None,
+        vector: Optional[List[float]] = None,
+    ):
+        filter = self.db.metadata_filter(state_code, law_type)
+        if getattr(config, "retrieval_mode", "sections") == "sections":
+            return self.db.search_sections(
+                query=question, filter=filter, vector=vector, **self._search_kwargs(True)
+            )
+        return self.db.similarity_search(
+            query=question, filter=filter, vector=vector, **self._search_kwargs(False)
+        )
+
+    async def asearch(
+        self,
+        question: str,
+        state_code: Optional[str] = None,
+        law_type: Optional[str] = None,
+        vector: Optional[List[float]] = None,
+    ):
+        filter = self.db.metadata_filter(state_code, law_type)
+        if getattr(config, "retrieval_mode", "sections") == "sections":
+            return await self.db.asearch_sections(
+                query=question, filter=filter, vector=vector, **self._search_kwargs(True)
+            )
+        return await self.db.asimilarity_search(
+            query=question, filter=filter, vector=vector, **self._search_kwargs(False)
+        )
+
+    @staticmethod
+    def _filters(state: InputState) -> Tuple[Optional[str], Optional[str]]:
+        return state.get("state_code"), state.get("law_type")
+
+    @staticmethod
+    def _speculated(state: OverallState) -> bool:
+        # Only valid for the question it was run for (not e.g. a HyDE rewrite of it).
+        return bool(state.get("context")) and state.get("speculative_question") == state["question"]
+
     def retrieve(self, state: InputState) -> OverallState:
-        # retriever= self.vector_store.as_retriever(search_kwargs={'k':4,'filter': {'state':state.get("state_code",'ny').lower()}})
-        # retrieved_docs = retriever.invoke(state['question'])
-        retrieved_docs = self.vector_store.similarity_search(query=state["question"])
-                                                # filter={"state":state.get('state_code','ny').lower()})
-        return {"question": state["question"], "context": retrieved_docs}
+        if self._speculated(state):
+            return {"question": state["question"], "context": state["context"]}
+        context = self.search(state["question"], *self._filters(state))
+        return {"question": state["question"], "context": context}
+
+    async def aretrieve(self, state: InputState) -> OverallState:
+        if self._speculated(state):
+            return {"question": state["question"], "context": state["context"]}
+        context = await self.asearch(state["question"], *self._filters(state))
+        return {"question": state["question"], "context": context}
+
+    def _rerank_skipped(self, state: OverallState) -> bool:
+        deadline = state.get("deadline")
+        if deadline is None:
+            return False
+        remaining = deadline - time.time()
+        needed = self.reranker.estimate(len(state["context"])) + config.rerank_deadline_reserve
+        if remaining < needed:
+            logger.info(f"Skipping rerank: {remaining:.2f}s left, {needed:.2f}s needed")
+            return True
+        return False
+
+    def rerank(self, state: OverallState) -> OverallState:
+        if self._rerank_skipped(state):
+            return {"context": self.reranker.skip(state["context"])}
+        return {"context": self.reranker.rerank(state["question"], state["context"])}
+
+    async def arerank(self, state: OverallState) -> OverallState:
+        if self._rerank_skipped(state):
+            return {"context": self.reranker.skip(state["context"])}
+        return {"context": await self.reranker.arerank(state["question"], state["context"])}
+
+    def pack_context(self, state: OverallState) -> OverallState:
+        return {"context": self.packer.pack(state["question"], state["context"])}
+
+    async def apack_context(self, state: OverallState) -> OverallState:
+        # Pure CPU work over payload token counts, well under a millisecond per passage.
+        return self.pack_context(state)
 
     # def _build_graph(self):
         # graph_builder = StateGraph(InputState, output=OutputState)
@@ -42,29 +184,346 @@ Answer:"""
         # graph = graph_builder.compile()
         # return graph
 
-    def run(self, question: str, thread: int = 1):
+    @staticmethod
+    def _inputs(
+        question: str, state_code: Optional[str], law_type: Optional[str], timeout: Optional[float]
+    ) -> dict:
+        # Normalised once here ("NY" -> "ny", "regulations" -> "regs"), so the graph, the
+        # retrieval filter and the answer cache scope all see the same values.
+        state_code, law_type = normalise_filters(state_code, law_type)
+        return {
+            "question": question,
+            "state_code": state_code,
+            "law_type": law_type,
+            "deadline": time.time() + timeout if timeout else None,
+        }
+
+    @staticmethod
+    def _scope(inputs: dict) -> str:
+        return f"{inputs['state_code'] or '*'}:{inputs['law_type'] or '*'}"
+
+    def run(
+        self,
+        question: str,
+        thread: int = 1,
+        state_code: Optional[str] = None,
+        law_type: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Answer ``question``, optionally filtered by state and law type. ``timeout`` is how
+        many seconds the caller will wait; optional steps (rerank) are skipped near it.
+
+        ``suggested_prompts`` comes from the retrieved sections' payloads when they were
+        enriched offline. Otherwise it is left empty: the prompts are generated after the
+        answer and fetched with ``suggestions.result(response["suggestions_id"], timeout)``
+        (``aresult`` from async code). Cache hits carry them already; error answers get
+        none.
+        """
+        inputs = self._inputs(question, state_code, law_type, timeout)
+        scope = self._scope(inputs)
+        if self.answer_cache and (cached := self.answer_cache.lookup(question, scope)):
+            return cached
         config = {"configurable": {"thread_id": str(thread)}}
-        response = self.graph.invoke({"question": question}, config=config)
+        response = self._response(self.graph.invoke(inputs, config=config))
         # breakpoint()
+        if self.suggestions and not response["suggested_prompts"] and self._cacheable(response):
+            response["suggestions_id"] = self.suggestions.submit(
+                self._follow_up, question, dict(response), scope
+            )
+        elif self.answer_cache and self._cacheable(response):
+            self.answer_cache.store(question, response, scope)
         return response
 
+    async def arun(
+        self,
+        question: str,
+        thread: int = 1,
+        state_code: Optional[str] = None,
+        law_type: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        """Same as ``run`` but awaits every LLM and Qdrant call instead of blocking a thread."""
+        inputs = self._inputs(question, state_code, law_type, timeout)
+        scope = self._scope(inputs)
+        if self.answer_cache and (cached := await self.answer_cache.alookup(question, scope)):
+            return cached
+        config = {"configurable": {"thread_id": str(thread)}}
+        response = self._response(await self.graph.ainvoke(inputs, config=config))
+        if self.suggestions and not response["suggested_prompts"] and self._cacheable(response):
+            response["suggestions_id"] = self.suggestions.acreate(
+                self._afollow_up(question, dict(response), scope)
+            )
+        elif self.answer_cache and self._cacheable(response):
+            await self.answer_cache.astore(question, response, scope)
+        return response
+
+    @staticmethod
+    def _cacheable(response: dict) -> bool:
+        return response.get("answer") not in (None, "", ERROR_ANSWER)
+
+    @staticmethod
+    def _response(output: dict) -> dict:
+        return {"sources": [], "suggested_prompts": [], **output}
+
+    def _follow_up(self, question: str, response: dict, scope: str) -> List[str]:
+        # Deferred job: the answer is cached once its prompts exist, so hits include them.
+        prompts = self.suggestions.generate(question, response["answer"], response["sources"])
+        if self.answer_cache:
+            self.answer_cache.store(question, {**response, "suggested_prompts": prompts}, scope)
+        return prompts
+
+    async def _afollow_up(self, question: str, response: dict, scope: str) -> List[str]:
+        prompts = await self.suggestions.agenerate(
+            question, response["answer"], response["sources"]
+        )
+        if self.answer_cache:
+            response = {**response, "suggested_prompts": prompts}
+            await self.answer_cache.astore(question, response, scope)
+        return prompts
+
+    async def astream(
+        self,
+        question: str,
+        thread: int = 1,
+        state_code: Optional[str] = None,
+        law_type: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Run the graph and yield ``(event, data)`` pairs as it progresses: ``classified``
+        (route), ``rewritten`` (HyDE query), ``retrieved`` (hit count), ``reranked`` (kept
+        count, with a reranker), ``packed`` (passages and tokens, with context packing),
+        ``sources``, ``token`` with each new piece of the answer text (decoded from the
+        JSON the LLM writes), ``answer`` with the full ``OutputState`` and then, once they
+        are generated, ``suggestions`` with the follow-up prompts; if they take longer than
+        ``suggestions.stream_wait`` seconds it has ``"pending": True`` and no prompts, which
+        are then fetched by ``suggestions_id``. A semantic cache hit
+        yields ``cached`` and ``sources`` followed by the stored answer, prompts included.
+        """
+        inputs = self._inputs(question, state_code, law_type, timeout)
+        scope = self._scope(inputs)
+        if self.answer_cache and (cached := await self.answer_cache.alookup(question, scope)):
+            yield "cached", {}
+            yield "sources", {"sources": cached.get("sources", [])}
+            yield "answer", cached
+            return
+        config = {"configurable": {"thread_id": str(thread)}}
+        suggestions_id = None
+        async for mode, chunk in self.graph.astream(
+            inputs, config=config, stream_mode=["updates", "custom"]
+        ):
+            if mode == "custom":
+                yield "token", chunk
+                continue
+            for node, update in chunk.items():
+                if node == "classify_query":
+                    yield "classified", {
+                        "route": update["route"],
+                        "speculation": update.get("speculation"),
+                    }
+                elif node == "rewrite_query":
+                    yield "rewritten", {"question": update["question"]}
+                elif node in ("retrieve", "rerank", "pack_context"):
+                    context = update["context"]
+                    if node == "retrieve":
+                        yield "retrieved", {"count": len(context)}
+                    elif node == "rerank":
+                        yield "reranked", {"count": len(context)}
+                    else:
+                        tokens = sum(doc.metadata["packed_tokens"] for doc in context)
+                        yield "packed", {"count": len(context), "tokens": tokens}
+                    if node == self._context_node:
+                        yield "sources", {"sources": self._sources(context)}
+                elif node in GENERATE_NODES:
+                    answer = self._response(update)
+                    if (
+                        self.suggestions
+                        and not answer["suggested_prompts"]
+                        and self._cacheable(answer)
+                    ):
+                        suggestions_id = self.suggestions.acreate(
+                            self._afollow_up(question, dict(answer), scope)
+                        )
+                        answer["suggestions_id"] = suggestions_id
+                    elif self.answer_cache and self._cacheable(answer):
+                        await self.answer_cache.astore(question, answer, scope)
+                    yield "answer", answer
+        if suggestions_id is not None:
+            prompts = await self.suggestions.aresult(
+                suggestions_id, timeout=self.suggestions.stream_wait
+            )
+            if prompts is PENDING:
+                yield "suggestions", {
+                    "suggestions_id": suggestions_id,
+                    "suggested_prompts": [],
+                    "pending": True,
+                }
+            else:
+                yield "suggestions", {
+                    "suggestions_id": suggestions_id,
+                    "suggested_prompts": prompts or [],
+                }
+
+    @staticmethod
+    def _node(func, afunc):
+        # One graph serves both paths: invoke() calls func, ainvoke() calls afunc.
+        return RunnableLambda(func, afunc=afunc, name=func.__name__)
+
+    def _memoized(self, node: str, func, afunc, prompt, extra: str = ""):
+        # The output only depends on the question, the prompt template (plus anything else
+        # passed as ``extra``) and the model.
+        version = template_version(prompt({"question": "{question}"}) + extra)
+        model = model_name(self.llm)
+        question = lambda state: state["question"]
+        return (
+            self.memo.wrap(node, func, question, version, model),
+            self.memo.wrap(node, afunc, question, version, model),
+        )
+
+    def _should_speculate(self, state: InputState) -> bool:
+        # Small talk caught by a router rule is never retrieved for.
+        return not (self.router and self.router.rule(state["question"]) == GENERAL)
+
+    def _speculation_result(self, state, update, docs, used: bool, ms: float) -> OverallState:
+        update = {**update, "speculation": self.speculation.record(used, ms)}
+        if used:
+            update.update(context=docs, speculative_question=state["question"])
+        return update
+
+    def _speculative(self, classify):
+        """
+        Run retrieval for the question while ``classify`` decides the route, instead of
+        after it. The documents are kept if the route is ``retrieve``, dropped otherwise.
+        With the local router, the question is embedded once, up front, and the vector is
+        handed to both the router and the search.
+        """
+
+        @wraps(classify)
+        def speculative(state):
+            if not self._should_speculate(state):
+                return classify(state)
+
+            start = time.perf_counter()
+            vector = self.db.embeddings.embed_query(state["question"]) if self.router else None
+
+            def timed_search():
+                searched = time.perf_counter()
+                docs = self.search(state["question"], *self._filters(state), vector=vector)
+                return docs, time.perf_counter() - searched
+
+            future = self._speculative_pool.submit(timed_search)
+            update = classify(state, vector=vector)
+            classified = time.perf_counter() - start
+            if update["route"] == "retrieve":
+                docs, searched = future.result()
+                saved = min(classified, searched) * 1000
+                return self._speculation_result(state, update, docs, True, saved)
+            if future.cancel():
+                # Never started (pool busy): nothing was wasted.
+                return self._speculation_result(state, update, None, False, 0.0)
+            if future.done() and future.exception() is None:
+                wasted = future.result()[1] * 1000
+                return self._speculation_result(state, update, None, False, wasted)
+            # Still running: let it finish in the background; count the time spent so far.
+            return self._speculation_result(state, update, None, False, classified * 1000)
+
+        return speculative
+
+    def _aspeculative(self, aclassify):
+        @wraps(aclassify)
+        async def aspeculative(state):
+            if not self._should_speculate(state):
+                return await aclassify(state)
+
+            start = time.perf_counter()
+            vector = None
+            if self.router:
+                vector = await self.db.embeddings.aembed_query(state["question"])
+
+            async def timed_search():
+                searched = time.perf_counter()
+                docs = await self.asearch(state["question"], *self._filters(state), vector=vector)
+                return docs, time.perf_counter() - searched
+
+            task = asyncio.create_task(timed_search())
+            try:
+                update = await aclassify(state, vector=vector)
+            except BaseException:
+                task.cancel()
+                raise
+            classified = time.perf_counter() - start
+            if update["route"] == "retrieve":
+                docs, searched = await task
+                saved = min(classified, searched) * 1000
+                return self._speculation_result(state, update, docs, True, saved)
+            if task.done() and not task.cancelled() and task.exception() is None:
+                wasted = task.result()[1] * 1000
+                return self._speculation_result(state, update, None, False, wasted)
+            task.cancel()
+            return self._speculation_result(state, update, None, False, classified * 1000)
+
+        return aspeculative
+
     def _build_graph(self):
-        graph_builder = StateGraph(InputState, output=OutputState)
+        # Declared explicitly: wrapped nodes carry no type hints to infer channels from.
+        graph_builder = StateGraph(OverallState, input=InputState, output=OutputState)
+
+        graph_builder.add_node(
+            "rewrite_query",
+            self._node(
+                *self._memoized(
+                    "rewrite_query", self.hyde_generate, self.ahyde_generate, self._hyde_prompt
+                )
+            ),
+        )
+        graph_builder.add_node("retrieve", self._node(self.retrieve, self.aretrieve))
+        graph_builder.add_node(
+            "generate_from_context_with_suggestions",
+            self._node(
+                self.generate_from_context_with_suggestions,
+                self.agenerate_from_context_with_suggestions,
+            ),
+        )
+        graph_builder.add_node(
+            "generate_direct_with_suggestions",
+            self._node(
+                self.generate_direct_with_suggestions, self.agenerate_direct_with_suggestions
+            ),
+        )
 
-        graph_builder.add_node("classify_query", self.classify_query)
-        graph_builder.add_node("rewrite_query", self.hyde_generate)
-        graph_builder.add_node("retrieve", self.retrieve)
-        graph_builder.add_node("generate_from_context_with_suggestions", self.generate_from_context_with_suggestions)
-        graph_builder.add_node("generate_direct_with_suggestions", self.generate_direct_with_suggestions)
+        classify, aclassify = self._memoized(
+            "classify_query",
+            self.classify_query,
+            self.aclassify_query,
+            self._classify_prompt,
+            extra=self.router.version if self.router else "",
+        )
+        if getattr(config, "speculative_retrieval", False):
+            # Wraps the memoized node, so speculative documents never land in the memo.
+            classify, aclassify = self._speculative(classify), self._aspeculative(aclassify)
+        graph_builder.add_node("classify_query", self._node(classify, aclassify))
 
+        graph_builder.add_edge(START, "classify_query")
         graph_builder.add_conditional_edges(
-            START,
-            self.classify_query,
+            "classify_query",
+            self.next_step,
             ['retrieve','generate_direct_with_suggestions','rewrite_query']
         )
 
         graph_builder.add_edge("rewrite_query", "retrieve")
-        graph_builder.add_edge("retrieve", "generate_from_context_with_suggestions")
+        # retrieve -> [rerank] -> [pack_context] -> generate; the optional steps are only
+        # wired in when configured. _context_node is the one whose documents reach the prompt.
+        self._context_node = "retrieve"
+        for node, func, afunc, enabled in (
+            ("rerank", self.rerank, self.arerank, self.reranker is not None),
+            ("pack_context", self.pack_context, self.apack_context, self.packer is not None),
+        ):
+            if enabled:
+                graph_builder.add_node(node, self._node(func, afunc))
+                graph_builder.add_edge(self._context_node, node)
+                self._context_node = node
+        graph_builder.add_edge(self._context_node, "generate_from_context_with_suggestions")
 
         graph = graph_builder.compile()
         return graph
@@ -74,8 +533,69 @@ Answer:"""
         response = self.llm.invoke(prompt)
         return response.content if hasattr(response, "content") else response
 
-    def classify_query(self, state: InputState) -> Literal['generate_direct_with_suggestions','retrieve','rewrite_query']:
-        prompt = f"""
+    async def allm_invoke(self, prompt):
+        response = await self.llm.ainvoke(prompt)
+        return response.content if hasattr(response, "content") else response
+
+    async def allm_stream(self, prompt) -> Tuple[str, List[str]]:
+        """
+        Stream a JSON answer/suggested_prompts completion. The ``answer`` text is decoded
+        as it arrives and sent to graph.astream(stream_mode="custom") before the suggested
+        prompts are generated; the writer is a no-op outside of astream.
+        """
+        writer = get_stream_writer()
+        parser = AnswerStreamParser()
+        async for chunk in self.llm.astream(prompt):
+            text = chunk.content if hasattr(chunk, "content") else chunk
+            if delta := parser.feed(text):
+                writer({"token": delta})
+        return self._answer(parser)
+
+    @staticmethod
+    def _sources(docs):
+        return [doc.metadata["hierarchical_name"] for doc in docs]
+
+    @staticmethod
+    def _answer(parser: AnswerStreamParser) -> Tuple[str, List[str]]:
+        answer, suggested_prompts = parser.result()
+        if answer is None:
+            return ERROR_ANSWER, []
+        return answer, suggested_prompts
+
+    def _parse_answer(self, llm_output: str) -> Tuple[str, List[str]]:
+        # Same parser as the streaming path, so a finished answer followed by garbage or a
+        # truncated suggested_prompts list is kept rather than replaced by ERROR_ANSWER.
+        parser = AnswerStreamParser()
+        parser.feed(llm_output)
+        return self._answer(parser)
+
+    def classify_query(
+        self, state: InputState, vector: Optional[List[float]] = None
+    ) -> OverallState:
+        # The local router answers most questions; the LLM only sees the ones it abstains on.
+        # ``vector`` is the question's embedding when speculative retrieval already made it.
+        classification = self.router.route(state["question"], vector) if self.router else None
+        if classification is None:
+            classification = self.llm_invoke(self._classify_prompt(state))
+        return {"route": self._route(classification)}
+
+    async def aclassify_query(
+        self, state: InputState, vector: Optional[List[float]] = None
+    ) -> OverallState:
+        classification = None
+        if self.router:
+            classification = await self.router.aroute(state["question"], vector)
+        if classification is None:
+            classification = await self.allm_invoke(self._classify_prompt(state))
+        return {"route": self._route(classification)}
+
+    @staticmethod
+    def next_step(state: OverallState) -> Literal['generate_direct_with_suggestions','retrieve','rewrite_query']:
+        return state["route"]
+
+    @staticmethod
+    def _classify_prompt(state: InputState) -> str:
+        return f"""
 You are an intelligent reasoning assistant for a research chatbot.
 
 Given a user's question, your task is to decide how the system should process it. Choose ONLY one of the following actions:
@@ -93,17 +613,27 @@ Respond ONLY with one of: general, good_for_retrieval, needs_hyde
 
 Action:
 """
+
+    @staticmethod
+    def _route(classification: str) -> str:
         classify_keys = {"general":"generate_direct_with_suggestions","good_for_retrieval":"retrieve","needs_hyde":"rewrite_query"}
-        classification = self.llm_invoke(prompt).strip().lower()
+        classification = classification.strip().lower()
         # breakpoint()
-        if classification in {"generate", "good_for_retrieval","needs_hyde"}:
-            next_step = classify_keys.get(classification,"generate_direct_with_suggestions")
-            return next_step
-        return "generate_direct_with_suggestions"
+        return classify_keys.get(classification, "generate_direct_with_suggestions")
     
 
     def hyde_generate(self, state: OverallState)-> OverallState:
-        hyde_prompt = f"""
+        enriched_query = self.llm_invoke(self._hyde_prompt(state)).strip()
+        # enriched_query = self.llm.invoke(hyde_prompt)
+        return {'question':enriched_query or state['question']}
+
+    async def ahyde_generate(self, state: OverallState)-> OverallState:
+        enriched_query = (await self.allm_invoke(self._hyde_prompt(state))).strip()
+        return {'question':enriched_query or state['question']}
+
+    @staticmethod
+    def _hyde_prompt(state: OverallState) -> str:
+        return f"""
 You are a helpful assistant generating a hypothetical document or enriched query to improve information retrieval.
 Given the following user question, rewrite it with additional detail to make retrieval more effective. The retrieval used cosine similarity with the stored documents.
 The stored documents are about laws and regulation in US for all states and federal too.
@@ -113,25 +643,63 @@ User Question:
 
 Enriched Query:
 """
-        enriched_query = self.llm_invoke(hyde_prompt).strip()
-        # enriched_query = self.llm.invoke(hyde_prompt)
-        return {'question':enriched_query or self['question']}
 
     
+    @staticmethod
+    def _payload_follow_ups(docs, limit: int = 3) -> List[str]:
+        # Questions precomputed per section by rag.enrich_follow_ups: the best section's
+        # first question, then the next section's, and so on, without repeats.
+        if not getattr(config, "follow_ups_from_payload", False):
+            return []
+        per_section = [doc.metadata.get("follow_ups") or [] for doc in docs]
+        prompts, seen = [], set()
+        for rank in range(max(map(len, per_section), default=0)):
+            for questions in per_section:
+                if rank < len(questions) and questions[rank].lower() not in seen:
+                    seen.add(questions[rank].lower())
+                    prompts.append(questions[rank])
+                    if len(prompts) == limit:
+                        return prompts
+        return prompts
+
     def generate_from_context_with_suggestions(self, state: OverallState)-> OutputState:
-        source = [doc.metadata["hierarchical_name"] for doc in state["context"]]
-        docs_content = "\n\n".join(doc.page_content for doc in state["context"])
-        prompt = f"""
+        source = self._sources(state["context"])
+        answer, suggested_prompts = self._parse_answer(self.llm_invoke(self._context_prompt(state)))
+        suggested_prompts = self._payload_follow_ups(state["context"]) or suggested_prompts
+        return {'sources':source, 'suggested_prompts':suggested_prompts, 'answer':answer}
+
+    async def agenerate_from_context_with_suggestions(self, state: OverallState)-> OutputState:
+        source = self._sources(state["context"])
+        answer, suggested_prompts = await self.allm_stream(self._context_prompt(state))
+        suggested_prompts = self._payload_follow_ups(state["context"]) or suggested_prompts
+        return {'sources':source, 'suggested_prompts':suggested_prompts, 'answer':answer}
+
+    def _json_format(self, answer: str, prompts: str, prompts_note: str) -> str:
+        if self.suggestions:
+            # Follow-up prompts are generated separately, after the answer is returned.
+            return f'{{\n  "answer": "{answer}"\n}}'
+        return (
+            f'{{\n  "answer": "{answer}",\n  "suggested_prompts": {prompts}\n}}\n\n'
+            f'The "suggested_prompts" list can contain 1 to 3 {prompts_note}'
+        )
+
+    def _context_prompt(self, state: OverallState) -> str:
+        # Numbered in the same order as the returned sources, so "[2]" points at sources[1].
+        docs_content = "\n\n".join(
+            f"[{i}] {doc.metadata.get('hierarchical_name', '')}\n{doc.page_content}"
+            for i, doc in enumerate(state["context"], 1)
+        )
+        json_format = self._json_format(
+            "<Your clear, helpful answer to the user's question, based on the provided documents, citing the numbered documents you rely on like [1]. If the documents do not contain relevant information, say so politely.>",
+            '["<First suggested follow-up prompt>", "<Second prompt>", "<Third prompt>"]',
+            "concise, relevant follow-up questions or topics the user might ask next to continue the conversation.",
+        )
+        return f"""
 You are an intelligent assistant for a research chatbot. 
 
 For every request, respond ONLY with a valid JSON object matching the following format:
 
-{{
-  "answer": "<Your clear, helpful answer to the user's question, based on the provided documents. If the documents do not contain relevant information, say so politely.>",
-  "suggested_prompts": ["<First suggested follow-up prompt>", "<Second prompt>", "<Third prompt>"]
-}}
-
-The "suggested_prompts" list can contain 1 to 3 concise, relevant follow-up questions or topics the user might ask next to continue the conversation.
+{json_format}
 
 Do not include any text outside the JSON block. No explanations, no extra formatting — only valid JSON.
 
@@ -144,33 +712,28 @@ Do not include any text outside the JSON block. No explanations, no extra format
 Respond with JSON format only:
 """
 
-        llm_output = self.llm_invoke(prompt)
-        
-        try:
-            llm_output = json.loads(re.sub(r"^```json\s*|```$", "", llm_output.strip(), flags=re.IGNORECASE).strip())
-            answer = llm_output['answer']
-            suggested_prompts = llm_output['suggested_prompts']
-        except (json.JSONDecodeError, ValueError) as e:
-            answer = "⚠️ There was an error processing the response."
-            suggested_prompts = []
-
-        
-        return {'sources':source, 'suggested_prompts':suggested_prompts, 'answer':answer}
-    
     def generate_direct_with_suggestions(self, state: OverallState)-> OutputState:
-        prompt = f"""
+        answer, suggested_prompts = self._parse_answer(self.llm_invoke(self._direct_prompt(state)))
+        return {'suggested_prompts':suggested_prompts, 'answer':answer}
+
+    async def agenerate_direct_with_suggestions(self, state: OverallState)-> OutputState:
+        answer, suggested_prompts = await self.allm_stream(self._direct_prompt(state))
+        return {'suggested_prompts':suggested_prompts, 'answer':answer}
+
+    def _direct_prompt(self, state: OverallState) -> str:
+        json_format = self._json_format(
+            "<Your helpful, friendly answer to the user's question>",
+            '["<First follow-up prompt>", "<Second follow-up prompt>", "<Third follow-up prompt>"]',
+            """concise, relevant follow-up questions or topics to keep the conversation going.
+Remember that you are a legal assistant and have knowledge of US federal and states laws. Suggest follow up prompts by keeping this in mind.
+ALWAYS suggest prompts that users are likely to ask next.""",
+        )
+        return f"""
 You are a helpful chatbot that answers general, conversational, or knowledge-based questions.
 
 For every request, respond ONLY with a valid JSON object matching the following format:
 
-{{
-  "answer": "<Your helpful, friendly answer to the user's question>",
-  "suggested_prompts": ["<First follow-up prompt>", "<Second follow-up prompt>", "<Third follow-up prompt>"]
-}}
-
-The "suggested_prompts" list can contain 1 to 3 concise, relevant follow-up questions or topics to keep the conversation going.
-Remember that you are a legal assistant and have knowledge of US federal and states laws. Suggest follow up prompts by keeping this in mind.
-ALWAYS suggest prompts that users are likely to ask next.
+{json_format}
 
 Do not include any text outside the JSON block. No commentary, no extra explanations — only valid JSON.
 
@@ -179,13 +742,3 @@ User's Question:
 
 Respond with JSON:
 """
-        llm_output = self.llm_invoke(prompt)
-        try:
-            llm_output = json.loads(re.sub(r"^```json\s*|```$", "", llm_output, flags=re.IGNORECASE).strip())
-            answer = llm_output['answer']
-            suggested_prompts = llm_output['suggested_prompts']
-        except (json.JSONDecodeError, ValueError) as e:
-            answer = "⚠️ There was an error processing the response."
-            suggested_prompts = []
-        
-        return {'suggested_prompts':suggested_prompts, 'answer':answer}
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores retrieved documents against the question with a small local cross-encoder
+    and keeps the ``top_n`` best.
+
+    Retrieval oversamples (``candidates`` hits) and this trims the list down, so the
+    generation prompt shrinks while precision improves. Inference runs on CPU in batches
+    of ``batch_size`` pairs; each batch's latency is recorded, and ``estimate()`` turns the
+    recent per-pair cost into a time budget so callers can skip reranking under a tight
+    deadline. The model is loaded on first use.
+    """
+
+    # Cross-encoders truncate at ~512 tokens anyway; don't tokenize whole long sections.
+    MAX_CHARS = 2000
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        top_n: int = 4,
+        candidates: int = 40,
+        batch_size: int = 16,
+        device: str = "cpu",
+    ):
+        self.model_name = model_name
+        self.top_n = top_n
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+        # (pairs, seconds) of recent batches, for stats() and estimate().
+        self._batches: deque = deque(maxlen=256)
+        self.reranked = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_config(cls, config) -> Optional["CrossEncoderReranker"]:
+        if not getattr(config, "rerank_enabled", False):
+            return None
+        return cls(
+            model_name=config.rerank_model,
+            top_n=config.rerank_top_n,
+            candidates=config.rerank_candidates,
+            batch_size=config.rerank_batch_size,
+        )
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    # Imported here: pulls in torch, which only rerank-enabled processes need.
+                    from sentence_transformers import CrossEncoder
+
+                    logger.info(f"Loading reranker {self.model_name} on {self.device}")
+                    self._model = CrossEncoder(self.model_name, device=self.device)
+        return self._model
+
+    def score(self, question: str, docs: List[Document]) -> List[float]:
+        pairs = [(question, doc.page_content[: self.MAX_CHARS]) for doc in docs]
+        scores: List[float] = []
+        for start in range(0, len(pairs), self.batch_size):
+            batch = pairs[start : start + self.batch_size]
+            began = time.perf_counter()
+            scores.extend(float(s) for s in self.model.predict(batch, batch_size=len(batch)))
+            seconds = time.perf_counter() - began
+            self._batches.append((len(batch), seconds))
+            logger.debug(f"Reranked batch of {len(batch)} in {seconds * 1000:.1f} ms")
+        return scores
+
+    def rerank(self, question: str, docs: List[Document]) -> List[Document]:
+        if len(docs) <= 1:
+            return docs
+        scores = self.score(question, docs)
+        ranked = sorted(zip(docs, scores), key=lambda pair: pair[1], reverse=True)
+        for doc, score in ranked:
+            doc.metadata["rerank_score"] = score
+        self.reranked += 1
+        return [doc for doc, _ in ranked[: self.top_n]]
+
+    async def arerank(self, question: str, docs: List[Document]) -> List[Document]:
+        # CPU-bound inference; keep it off the event loop.
+        return await asyncio.to_thread(self.rerank, question, docs)
+
+    def skip(self, docs: List[Document]) -> List[Document]:
+        """Fallback when there is no time to rerank: keep the retrieval order."""
+        self.skipped += 1
+        return docs[: self.top_n]
+
+    def estimate(self, count: int) -> float:
+        """Expected seconds to rerank ``count`` documents, from recent batches (0 if none)."""
+        pairs = sum(size for size, _ in self._batches)
+        if not pairs:
+            return 0.0
+        return count * sum(seconds for _, seconds in self._batches) / pairs
+
+    def stats(self) -> dict:
+        latencies = sorted(seconds * 1000 for _, seconds in self._batches)
+
+        def percentile(pct: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(int(len(latencies) * pct), len(latencies) - 1)], 1)
+
+        return {
+            "model": self.model_name,
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+            "batches": len(latencies),
+            "batch_ms_p50": percentile(0.5),
+            "batch_ms_p95": percentile(0.95),
+        }
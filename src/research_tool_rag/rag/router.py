@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GENERAL = "general"
+RETRIEVAL = "good_for_retrieval"
+HYDE = "needs_hyde"
+
+# Labelled examples the centroids are built from. Keep them short and typical: every
+# example is embedded once per process (and cached by the embedding cache after that).
+EXAMPLES: Dict[str, List[str]] = {
+    GENERAL: [
+        "hi",
+        "hello there",
+        "good morning",
+        "thanks, that helps",
+        "who are you?",
+        "what can you do?",
+        "how are you today?",
+        "tell me a joke",
+        "what is the capital of France?",
+        "what is a statute?",
+        "what is the difference between a law and a regulation?",
+        "bye",
+    ],
+    RETRIEVAL: [
+        "What are the penalties for violating agricultural market regulations in New York?",
+        "How long must a bank hold unclaimed deposits before reporting them to the comptroller?",
+        "What does New York abandoned property law say about uncashed payroll checks?",
+        "Who is allowed to operate a vessel on the New York state canal system?",
+        "What notice must a landlord give before terminating a month-to-month tenancy in New York?",
+        "What is the statute of limitations for breach of contract in New York?",
+        "Which records must a licensed pharmacy keep under New York education law?",
+        "What fees apply to registering a boat on New York canals?",
+        "Under what conditions can the canal corporation lease canal lands?",
+        "How is abandoned property held by insurance companies reported in New York?",
+        "What are the requirements for a valid will in New York?",
+        "What does section 1300 of the abandoned property law cover?",
+    ],
+    HYDE: [
+        "canal stuff",
+        "that law about money nobody claimed",
+        "rules?",
+        "boats",
+        "is this legal",
+        "what about the thing with the property",
+        "my neighbour and the fence",
+        "penalties",
+        "can they do that to me",
+        "landlord problem",
+        "old bank account",
+        "water rights maybe",
+    ],
+}
+
+# Obvious small talk never needs the embedding model or the LLM.
+_SMALL_TALK = re.compile(
+    r"^\s*(hi+|hey+|hello+|yo|hiya|howdy|good (morning|afternoon|evening|night)|"
+    r"thanks?( you)?|thank you( so much)?|thx|ty|ok(ay)?|cool|great|bye|goodbye|"
+    r"see you|how are you( doing)?( today)?|who are you|what can you do)\W*$",
+    re.IGNORECASE,
+)
+# Explicit citations are unambiguous retrieval queries.
+_CITATION = re.compile(r"(§|\bsection\s+\d|\bart(icle)?\.?\s+\d|\bchapter\s+\d)", re.IGNORECASE)
+
+
+class LocalRouter:
+    """
+    Picks ``general`` / ``good_for_retrieval`` / ``needs_hyde`` without an LLM call.
+
+    Small talk and explicit citations are decided by rules. Everything else is embedded
+    and compared with the normalised centroid of each label's examples; the nearest label
+    wins if its cosine similarity is at least ``min_similarity`` and beats the runner-up by
+    ``margin``. Otherwise the router abstains (returns None) and the caller falls back to
+    the LLM. Callers that already embedded the question pass its ``vector``; otherwise it
+    goes through the (cached) embedding model, so the retrieval that usually follows
+    reuses it instead of embedding the question again.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        examples: Dict[str, List[str]] = EXAMPLES,
+        min_similarity: float = 0.55,
+        margin: float = 0.05,
+    ):
+        self.embeddings = embeddings
+        self.examples = examples
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.labels = list(examples)
+        # Changes whenever the examples or thresholds do, for memoized routing decisions.
+        self.version = f"{sorted(examples.items())}:{min_similarity}:{margin}"
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        # Routes run on the serving thread pool; counts are updated under their own lock.
+        self._counts_lock = threading.Lock()
+        self.counts = {"rule": 0, "centroid": 0, "abstain": 0}
+
+    @classmethod
+    def from_config(cls, embeddings, config) -> Optional["LocalRouter"]:
+        if not getattr(config, "router_enabled", False):
+            return None
+        return cls(
+            embeddings,
+            min_similarity=config.router_min_similarity,
+            margin=config.router_margin,
+        )
+
+    @staticmethod
+    def _normalise(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+    def _build_centroids(self, vectors: List[List[float]]) -> np.ndarray:
+        centroids, start = [], 0
+        for label in self.labels:
+            count = len(self.examples[label])
+            centroids.append(self._normalise(vectors[start : start + count]).mean(axis=0))
+            start += count
+        return self._normalise(centroids)
+
+    def _all_examples(self) -> List[str]:
+        return [text for label in self.labels for text in self.examples[label]]
+
+    def centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    # Examples are questions: embedded like the queries they are compared
+                    # with (query and document vectors can differ, e.g. Gemini task types).
+                    vectors = [self.embeddings.embed_query(text) for text in self._all_examples()]
+                    self._centroids = self._build_centroids(vectors)
+        return self._centroids
+
+    async def acentroids(self) -> np.ndarray:
+        if self._centroids is None:
+            vectors = await asyncio.gather(
+                *(self.embeddings.aembed_query(text) for text in self._all_examples())
+            )
+            self._centroids = self._build_centroids(vectors)
+        return self._centroids
+
+    def rule(self, question: str) -> Optional[str]:
+        if _SMALL_TALK.match(question):
+            return GENERAL
+        if _CITATION.search(question):
+            return RETRIEVAL
+        return None
+
+    def decide(self, vector, centroids: np.ndarray) -> Tuple[Optional[str], float]:
+        """Label (or None to abstain) and margin over the runner-up for one query vector."""
+        scores = centroids @ self._normalise(vector)
+        order = np.argsort(scores)[::-1]
+        best, runner_up = scores[order[0]], scores[order[1]]
+        if best >= self.min_similarity and best - runner_up >= self.margin:
+            return self.labels[order[0]], float(best - runner_up)
+        return None, float(best - runner_up)
+
+    def _count(self, label: Optional[str], how: str) -> Optional[str]:
+        with self._counts_lock:
+            self.counts[how if label is not None else "abstain"] += 1
+        return label
+
+    def route(self, question: str, vector: Optional[List[float]] = None) -> Optional[str]:
+        if (label := self.rule(question)) is not None:
+            return self._count(label, "rule")
+        if vector is None:
+            vector = self.embeddings.embed_query(question)
+        label, _ = self.decide(vector, self.centroids())
+        return self._count(label, "centroid")
+
+    async def aroute(self, question: str, vector: Optional[List[float]] = None) -> Optional[str]:
+        if (label := self.rule(question)) is not None:
+            return self._count(label, "rule")
+        centroids = await self.acentroids()
+        if vector is None:
+            vector = await self.embeddings.aembed_query(question)
+        label, _ = self.decide(vector, centroids)
+        return self._count(label, "centroid")
+
+    def stats(self) -> dict:
+        with self._counts_lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        local = counts["rule"] + counts["centroid"]
+        return {**counts, "local_rate": round(local / total, 4) if total else 0.0}
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Awaitable, Callable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PENDING = object()
+
+
+def parse_prompts(llm_output: str, limit: int = 3) -> List[str]:
+    """The JSON array of prompts in ``llm_output`` (code fences and chatter ignored)."""
+    start, end = llm_output.find("["), llm_output.rfind("]")
+    if start == -1 or end < start:
+        return []
+    try:
+        prompts = json.loads(llm_output[start : end + 1])
+    except json.JSONDecodeError:
+        return []
+    if not isinstance(prompts, list):
+        return []
+    return [str(prompt).strip() for prompt in prompts if str(prompt).strip()][:limit]
+
+
+class FollowUpSuggestions:
+    """
+    Generates the 1-3 follow-up prompts shown under an answer, off the answer's critical
+    path.
+
+    The answer is returned as soon as it is generated, together with a ``suggestions_id``;
+    the prompts are computed by a deferred job (a worker thread for the sync path, an
+    asyncio task for the async one) with ``llm``, which can be a cheaper model than the one
+    answering. Clients fetch them by id, or receive them as a follow-up stream event.
+    Results are kept for ``ttl`` seconds, at most ``max_pending`` of them; a stream waits
+    ``stream_wait`` seconds for them before reporting them pending.
+    """
+
+    def __init__(
+        self,
+        llm,
+        ttl: float = 300.0,
+        max_pending: int = 10_000,
+        workers: int = 4,
+        stream_wait: float = 10.0,
+    ):
+        self.llm = llm
+        self.ttl = ttl
+        self.stream_wait = stream_wait
+        self.max_pending = max_pending
+        self._jobs: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="suggestions")
+
+    @classmethod
+    def from_config(cls, config, llm) -> Optional["FollowUpSuggestions"]:
+        if not getattr(config, "suggestions_enabled", False):
+            return None
+        return cls(
+            getattr(config, "suggestions_llm", None) or llm,
+            ttl=config.suggestions_ttl,
+            stream_wait=config.suggestions_stream_wait,
+        )
+
+    @staticmethod
+    def _prompt(question: str, answer: str, sources: List[str]) -> str:
+        sources_text = "\n".join(f"- {source}" for source in sources) or "- (none)"
+        return f"""
+You are a legal assistant with knowledge of US federal and state laws, suggesting what the user is likely to ask next.
+
+Given the user's question, the answer they received and the statute sections it was based on, write 1 to 3 concise follow-up questions.
+
+Respond ONLY with a JSON array of strings, for example: ["<First follow-up prompt>", "<Second prompt>"]
+
+User's Question:
+{question}
+
+Answer:
+{answer}
+
+Sections:
+{sources_text}
+
+JSON array:
+"""
+
+    @staticmethod
+    def _text(response) -> str:
+        return response.content if hasattr(response, "content") else response
+
+    def generate(self, question: str, answer: str, sources: List[str]) -> List[str]:
+        return parse_prompts(self._text(self.llm.invoke(self._prompt(question, answer, sources))))
+
+    async def agenerate(self, question: str, answer: str, sources: List[str]) -> List[str]:
+        response = await self.llm.ainvoke(self._prompt(question, answer, sources))
+        return parse_prompts(self._text(response))
+
+    def _add(self, job: Union[Future, "asyncio.Task"]) -> str:
+        suggestions_id = uuid.uuid4().hex
+        now = time.monotonic()
+        with self._lock:
+            while self._jobs and (
+                len(self._jobs) >= self.max_pending
+                or next(iter(self._jobs.values()))[0] < now - self.ttl
+            ):
+                self._jobs.popitem(last=False)
+            self._jobs[suggestions_id] = (now, job)
+        return suggestions_id
+
+    def submit(self, func: Callable[..., List[str]], *args) -> str:
+        """Run ``func(*args)`` in a worker thread; returns the id to fetch its result by."""
+        return self._add(self._pool.submit(func, *args))
+
+    def acreate(self, coro: Awaitable[List[str]]) -> str:
+        """Schedule ``coro`` on the running loop; returns the id to fetch its result by."""
+        return self._add(asyncio.ensure_future(coro))
+
+    def _job(self, suggestions_id: str) -> Optional[Union[Future, "asyncio.Task"]]:
+        with self._lock:
+            created, job = self._jobs.get(suggestions_id, (None, None))
+        if job is None or created < time.monotonic() - self.ttl:
+            return None
+        return job
+
+    def result(self, suggestions_id: str, timeout: Optional[float] = None):
+        """
+        Blocking ``aresult`` for sync callers. Jobs scheduled on an event loop (``acreate``)
+        cannot be waited for from here: they are ``PENDING`` until done.
+        """
+        job = self._job(suggestions_id)
+        if job is None:
+            return None
+        try:
+            if isinstance(job, asyncio.Future):
+                return job.result() if job.done() else PENDING
+            return job.result(timeout)
+        except FutureTimeoutError:
+            return PENDING
+        except Exception:
+            logger.exception(f"Generating suggestions {suggestions_id} failed")
+            return []
+
+    async def aresult(self, suggestions_id: str, timeout: Optional[float] = None):
+        """
+        The prompts for ``suggestions_id``, waiting up to ``timeout`` seconds. Returns
+        ``PENDING`` if they are not ready by then and None for unknown or expired ids.
+        """
+        job = self._job(suggestions_id)
+        if job is None:
+            return None
+        future = job if isinstance(job, asyncio.Future) else asyncio.wrap_future(job)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return PENDING
+        except Exception:
+            logger.exception(f"Generating suggestions {suggestions_id} failed")
+            return []
@@ -1,7 +1,7 @@
 from langchain_core.documents import Document
 from langgraph.graph import MessagesState
 from pydantic import BaseModel
-from typing_extensions import List
+from typing_extensions import List, Optional
 from pydantic import BaseModel, Field
 
 class State(MessagesState):
@@ -13,6 +13,11 @@ class State(MessagesState):
 
 class InputState(MessagesState):
     question: str
+    # Retrieval filters, normalised to payload values ("ny", "laws" / "regs"); None = any.
+    state_code: Optional[str]
+    law_type: Optional[str]
+    # Epoch seconds by which the caller wants the answer; optional steps are skipped near it.
+    deadline: Optional[float]
 
 
 class OutputState(BaseModel):
@@ -25,6 +30,13 @@ class OutputState(BaseModel):
 
 class OverallState(MessagesState):
     question: str
+    state_code: Optional[str]
+    law_type: Optional[str]
+    deadline: Optional[float]
+    route: str
     context: List[Document]
+    # Set when classify_query retrieved for `speculative_question` while classifying.
+    speculative_question: str
+    speculation: dict
     answer: str
     source: List[str]
@@ -0,0 +1,147 @@
+import json
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class AnswerStreamParser:
+    """
+    Incremental parser for the generation contract
+    ``{"answer": "...", "suggested_prompts": ["...", ...]}``.
+
+    ``feed()`` consumes LLM output as it arrives and returns the newly decoded part of the
+    ``answer`` string, so the answer can be streamed before ``suggested_prompts`` is even
+    generated. Anything before the first ``{`` (a code fence, a preamble) and after the
+    matching ``}`` is ignored. ``result()`` parses the object with ``json.loads`` when it is
+    complete and valid; otherwise it recovers what was finished: the answer if its string
+    was closed, and every suggested prompt string that was closed.
+    """
+
+    def __init__(self):
+        self.raw: List[str] = []  # the object's text, from "{" to the matching "}"
+        self.done = False
+        self._stack: List[str] = []
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._in_string = False
+        self._string_is_key = False
+        self._string: List[str] = []
+        self._escape: Optional[str] = None  # "\\" after a backslash, "\\uXXX..." in a \u escape
+        self._high_surrogate: Optional[str] = None
+        self.answer: Optional[str] = None
+        self.suggested_prompts: List[str] = []
+
+    def _streaming_answer(self) -> bool:
+        return (
+            not self._string_is_key
+            and self._stack == ["{"]
+            and self._key == "answer"
+            and self.answer is None
+        )
+
+    def _add_char(self, char: str, emitted: List[str]) -> None:
+        if self._high_surrogate is not None:
+            pair = self._high_surrogate + char
+            self._high_surrogate = None
+            if "\udc00" <= char <= "\udfff":
+                char = pair.encode("utf-16", "surrogatepass").decode("utf-16")
+        elif "\ud800" <= char <= "\udbff":
+            self._high_surrogate = char
+            return
+        self._string.append(char)
+        if self._streaming_answer():
+            emitted.append(char)
+
+    def _close_string(self) -> None:
+        text = "".join(self._string)
+        self._in_string = False
+        if self._string_is_key:
+            self._key = text
+        elif self._stack == ["{", "["] and self._key == "suggested_prompts":
+            self.suggested_prompts.append(text)
+        elif self._stack == ["{"]:
+            # A value closed: a stray string after it (a missing comma) has no key.
+            if self._key == "answer" and self.answer is None:
+                self.answer = text
+            self._key = None
+
+    def _string_char(self, char: str, emitted: List[str]) -> None:
+        if self._escape is not None:
+            self._escape += char
+            if self._escape.startswith("\\u"):
+                if len(self._escape) == 6:
+                    try:
+                        self._add_char(chr(int(self._escape[2:], 16)), emitted)
+                    except ValueError:
+                        pass
+                    self._escape = None
+                return
+            if char != "u":
+                self._add_char(_ESCAPES.get(char, char), emitted)
+                self._escape = None
+            return
+        if char == "\\":
+            self._escape = "\\"
+        elif char == '"':
+            self._close_string()
+        else:
+            self._add_char(char, emitted)
+
+    def _structural_char(self, char: str) -> None:
+        if char == '"':
+            self._in_string = True
+            self._string_is_key = self._stack[-1] == "{" and self._expect_key
+            self._string = []
+        elif char in "{[":
+            self._stack.append(char)
+            self._expect_key = char == "{"
+        elif char in "}]":
+            self._stack.pop()
+            if not self._stack:
+                self.done = True
+            elif self._stack == ["{"]:
+                self._key = None
+        elif char == ":" and self._stack[-1] == "{":
+            self._expect_key = False
+        elif char == "," and self._stack[-1] == "{":
+            self._expect_key = True
+
+    def feed(self, text: str) -> str:
+        """Consume the next piece of output; return the answer text it completed."""
+        emitted: List[str] = []
+        for char in text:
+            if self.done:
+                break
+            if not self._stack:
+                if char != "{":
+                    continue
+                self._stack.append("{")
+                self._expect_key = True
+                self.raw.append(char)
+                continue
+            self.raw.append(char)
+            if self._in_string:
+                self._string_char(char, emitted)
+            else:
+                self._structural_char(char)
+        return "".join(emitted)
+
+    def result(self) -> Tuple[Optional[str], List[str]]:
+        """``(answer, suggested_prompts)``; answer is None if no complete answer was seen."""
+        if self.done:
+            try:
+                parsed = json.loads("".join(self.raw))
+                answer = parsed.get("answer")
+                prompts = parsed.get("suggested_prompts") or []
+                if isinstance(answer, str) and isinstance(prompts, list):
+                    # json.loads keeps the last of repeated keys; the first was streamed.
+                    answer = answer if self.answer is None else self.answer
+                    return answer, [str(prompt) for prompt in prompts]
+            except (json.JSONDecodeError, AttributeError):
+                pass
+        if self.answer is not None:
+            logger.warning("Recovered the answer from malformed or truncated LLM output")
+        return self.answer, list(self.suggested_prompts)
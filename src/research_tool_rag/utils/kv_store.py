@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+
+class SqliteKVStore:
+    """
+    Small, thread-safe key/value store of bytes on a local SQLite file.
+
+    Supports batched reads and writes and keeps at most ``max_entries`` rows, evicting the
+    least recently used ones. Entries written with a ``ttl`` (seconds) expire after it.
+
+    Writes don't count the rows: the store remembers how many rows it had at the last
+    check, and only checks again (sweeping expired rows and evicting down to
+    ``LOW_WATER`` x ``max_entries``) once enough rows may have been written to reach the
+    cap, or every ``SWEEP_EVERY`` rows. Writes from other processes sharing the file are
+    only seen at those checks.
+    """
+
+    # SQLite caps the number of bound parameters per statement.
+    _CHUNK = 500
+    # Evicting below the cap leaves room for this many writes before the next check.
+    LOW_WATER = 0.9
+    SWEEP_EVERY = 1000
+
+    def __init__(self, path: Union[str, Path], max_entries: Optional[int] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv "
+            "(key TEXT PRIMARY KEY, value BLOB, accessed REAL, expires REAL)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(kv)")]
+        if "expires" not in columns:
+            # Files created before entries could expire.
+            self._conn.execute("ALTER TABLE kv ADD COLUMN expires REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_accessed ON kv (accessed)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_expires ON kv (expires)")
+        # Rows written since the last check, and how many may be before the next one.
+        self._written = 0
+        self._check_after = 0
+        self._evict()
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), self._CHUNK):
+                chunk = keys[i : i + self._CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM kv WHERE key IN ({marks}) "
+                    "AND (expires IS NULL OR expires > ?)",
+                    [*chunk, now],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE kv SET accessed = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, bytes], ttl: Optional[float] = None) -> None:
+        if not items:
+            return
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv (key, value, accessed, expires) VALUES (?, ?, ?, ?)",
+                [(key, value, now, expires) for key, value in items.items()],
+            )
+            # An upper bound: replaced keys don't add rows.
+            self._written += len(items)
+            if self._written >= self._check_after:
+                self._evict()
+            self._conn.commit()
+
+    def put(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.put_many({key: value}, ttl=ttl)
+
+    def _evict(self) -> None:
+        self._conn.execute("DELETE FROM kv WHERE expires <= ?", (time.time(),))
+        self._written = 0
+        if self.max_entries is None:
+            self._check_after = self.SWEEP_EVERY
+            return
+        count = self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+        if count >= self.max_entries:
+            keep = int(self.max_entries * self.LOW_WATER)
+            self._conn.execute(
+                "DELETE FROM kv WHERE key IN (SELECT key FROM kv ORDER BY accessed LIMIT ?)",
+                (count - keep,),
+            )
+            count = keep
+        self._check_after = max(1, min(self.SWEEP_EVERY, self.max_entries - count))
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import warnings
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, BaseMessage
+
+from research_tool_rag.utils.kv_store import SqliteKVStore
+from research_tool_rag.utils.utils import text_hash
+
+logger = logging.getLogger(__name__)
+
+
+def model_name(llm) -> str:
+    return str(
+        getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+    )
+
+
+def template_version(template: str) -> str:
+    """Short fingerprint of a prompt template, so editing the prompt retires old entries."""
+    return text_hash(template)[:8]
+
+
+def _revive(raw: bytes):
+    with warnings.catch_warnings():
+        # loads() is flagged beta but is the supported way to revive serialised messages.
+        warnings.filterwarnings("ignore", message="The function `loads` is in beta")
+        return loads(raw.decode("utf-8"))
+
+
+def _replayed(value):
+    """
+    A memoized output as a new one: messages get fresh ids (``add_messages`` replaces the
+    message with a known id instead of appending) and so do their tool calls (a ToolNode
+    answers every tool call id once).
+    """
+    if isinstance(value, BaseMessage):
+        update = {"id": str(uuid.uuid4())}
+        if isinstance(value, AIMessage) and value.tool_calls:
+            update["tool_calls"] = [
+                {**call, "id": f"call_{uuid.uuid4().hex}"} for call in value.tool_calls
+            ]
+        return value.model_copy(update=update)
+    if isinstance(value, dict):
+        return {name: _replayed(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_replayed(item) for item in value)
+    return value
+
+
+class _LRU:
+    """In-process tier: a bounded, thread-safe LRU whose entries expire individually."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value, ttl: Optional[float]) -> None:
+        with self._lock:
+            self._items[key] = (None if ttl is None else time.time() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+class NodeMemo:
+    """
+    Memoizes deterministic, LLM-calling graph nodes.
+
+    A node's output is cached under ``(node name, prompt-template version, model,
+    text_hash(input))`` in two tiers: an in-process LRU and a persistent ``SqliteKVStore``
+    shared by every process on the host. Nodes opt in through ``ttls``
+    (``{node name: seconds}``); nodes without an entry run unmemoized. Outputs are
+    serialised with ``langchain_core.load`` so dicts holding messages round-trip; hits
+    return copies with fresh message and tool call ids.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path, None],
+        ttls: Dict[str, float],
+        lru_size: int = 1024,
+        max_entries: Optional[int] = 100_000,
+    ):
+        self.ttls = dict(ttls)
+        self.lru = _LRU(lru_size)
+        self.store = SqliteKVStore(path, max_entries) if path else None
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> "NodeMemo":
+        return cls(
+            getattr(config, "node_memo_path", None),
+            getattr(config, "node_memo_ttls", {}),
+            lru_size=getattr(config, "node_memo_lru_size", 1024),
+        )
+
+    def _count(self, node: str, outcome: str) -> None:
+        with self._lock:
+            counters = self.counters.setdefault(node, {"memory": 0, "disk": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def _get(self, node: str, key: str):
+        value = self.lru.get(key)
+        if value is not None:
+            self._count(node, "memory")
+            return value
+        if self.store is not None:
+            raw = self.store.get(key)
+            if raw is not None:
+                value = _revive(raw)
+                self.lru.put(key, value, self.ttls[node])
+                self._count(node, "disk")
+                return value
+        self._count(node, "misses")
+        return None
+
+    def _put(self, node: str, key: str, value) -> None:
+        ttl = self.ttls[node]
+        self.lru.put(key, value, ttl)
+        if self.store is not None:
+            self.store.put(key, dumps(value).encode("utf-8"), ttl=ttl)
+
+    def wrap(
+        self,
+        node: str,
+        func: Callable,
+        key: Callable[[Any], str],
+        version: str,
+        model: str,
+    ) -> Callable:
+        """
+        Return ``func`` memoized as ``node`` (or ``func`` itself if the node has no TTL).
+
+        ``key`` maps the node input (the graph state) to the text the output depends on,
+        ``version`` identifies the prompt template and ``model`` the LLM answering it.
+        Coroutine functions get an async wrapper whose disk reads run in a worker thread.
+        """
+        if node not in self.ttls:
+            return func
+        prefix = f"{node}:{version}:{model}:"
+
+        def make_key(state) -> Optional[str]:
+            text = key(state)
+            return prefix + text_hash(text) if text and text.strip() else None
+
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def amemoized(state, *args, **kwargs):
+                cache_key = make_key(state)
+                if cache_key is None:
+                    return await func(state, *args, **kwargs)
+                value = self.lru.get(cache_key)
+                if value is not None:
+                    self._count(node, "memory")
+                    return _replayed(value)
+                value = await asyncio.to_thread(self._get, node, cache_key)
+                if value is not None:
+                    return _replayed(value)
+                value = await func(state, *args, **kwargs)
+                await asyncio.to_thread(self._put, node, cache_key, value)
+                return value
+
+            return amemoized
+
+        @wraps(func)
+        def memoized(state, *args, **kwargs):
+            cache_key = make_key(state)
+            if cache_key is None:
+                return func(state, *args, **kwargs)
+            value = self._get(node, cache_key)
+            if value is not None:
+                return _replayed(value)
+            value = func(state, *args, **kwargs)
+            self._put(node, cache_key, value)
+            return value
+
+        return memoized
+
+    def stats(self) -> Dict[str, dict]:
+        report = {}
+        with self._lock:
+            for node, counters in self.counters.items():
+                hits = counters["memory"] + counters["disk"]
+                total = hits + counters["misses"]
+                report[node] = {
+                    **counters,
+                    "hit_rate": round(hits / total, 4) if total else 0.0,
+                }
+        return report
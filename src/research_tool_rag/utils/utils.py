@@ -40,3 +40,11 @@ def setup_logging(name: str, level: int = logging.INFO, stream_handler: bool = T
         stream_handler = logging.StreamHandler()
         stream_handler.setFormatter(formatter)
         logger.addHandler(stream_handler)
+
+
+def file_hash(path: Path, algo=hashlib.sha256, block_size: int = 1 << 20) -> str:
+    digest = algo()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,70 @@
+import os
+import re
+import sys
+import uuid
+import zlib
+from pathlib import Path
+from typing import List
+
+import pytest
+
+# The config module prompts for the key on import; tests never call the real model.
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+from research_tool_rag.configs import config  # noqa: E402
+from research_tool_rag.preprocessing.chunking import get_encoding  # noqa: E402
+
+EMBEDDING_DIM = 64
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words vectors: alphabetic words hashed into ``dim`` buckets plus a
+    constant component. Numbers and "§" are left out, the way dense models blur them.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.calls = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        vector = [0.0] * self.dim
+        vector[0] = 1.0
+        for word in re.findall(r"[a-z]+", text.lower()):
+            vector[1 + zlib.crc32(word.encode("utf-8")) % (self.dim - 1)] += 1.0
+        norm = sum(v * v for v in vector) ** 0.5
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture(scope="session")
+def encoding():
+    """The chunking tokenizer: cl100k_base, or its offline approximation without network."""
+    return get_encoding()
+
+
+@pytest.fixture
+def local_config():
+    """``config`` on an embedded in-memory Qdrant with fake embeddings and no disk caches."""
+    saved = dict(vars(config))
+    settings = {
+        "embeddings": FakeEmbeddings(),
+        "embedding_dim": EMBEDDING_DIM,
+        "db_path": ":memory:",
+        "collection_name": f"TEST_{uuid.uuid4().hex}",
+        "embedding_cache_path": None,
+        "node_memo_path": None,
+        "follow_ups_store_path": None,
+        "router_enabled": False,
+    }
+    config.model_db_config = settings
+    config._init_run_config(settings)
+    yield config
+    vars(config).clear()
+    vars(config).update(saved)
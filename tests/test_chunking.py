@@ -0,0 +1,27 @@
+from research_tool_rag.preprocessing import chunking
+from research_tool_rag.preprocessing.chunking import ApproximateEncoding, chunk_text, stitch_chunks
+
+TEXT = (
+    "§ 1300-7. Every agricultural producer shall file a report with the commissioner's "
+    "office within 30 days.\n\n(a) A producer who fails to file is liable to a penalty."
+)
+
+
+def test_approximate_encoding_round_trips_with_offsets():
+    encoding = ApproximateEncoding()
+    tokens = encoding.encode(TEXT)
+    decoded, offsets = encoding.decode_with_offsets(tokens)
+    assert decoded == TEXT
+    assert offsets == sorted(offsets) and offsets[0] == 0
+    # Common words are one token each, like cl100k_base; long ones are cut.
+    assert encoding.decode([tokens[7]]) == " Every"
+    assert len(TEXT.split()) < len(tokens) < len(TEXT) / 2
+
+
+def test_chunk_text_falls_back_to_the_approximation(monkeypatch):
+    monkeypatch.setattr(chunking, "get_encoding", lambda name=None: ApproximateEncoding())
+    text = " ".join([TEXT] * 10)
+    chunks = chunk_text(text, max_tokens=32, overlap=8)
+    assert len(chunks) > 1
+    assert all(chunk.token_count <= 32 for chunk in chunks)
+    assert stitch_chunks(chunks) == text
@@ -0,0 +1,106 @@
+import uuid
+
+from langchain_core.documents import Document
+
+from research_tool_rag.preprocessing.chunking import count_tokens
+from research_tool_rag.preprocessing.hierarchy import SectionRecord
+from research_tool_rag.rag.context_packer import ContextPacker, passage_tokens
+from research_tool_rag.rag.ingest_pipeline import section_to_documents
+
+PENALTY_TEXT = (
+    "Every producer shall file a report each month. "
+    "A producer who fails to file is liable to a civil penalty of five hundred dollars. "
+    "The commissioner may extend the filing date. "
+    "Reports are kept for three years."
+)
+LONG_TEXT = " ".join(
+    [PENALTY_TEXT]
+    + [f"The office in district {i} is open on weekdays from nine to five." for i in range(20)]
+)
+
+
+def test_passage_tokens_prefers_payload_counts():
+    section = Document(page_content="x" * 400, metadata={"section_token_count": 90})
+    assert passage_tokens(section) == 90
+    # A raw chunk hit counts its own tokens, not its section's.
+    chunk = Document(
+        page_content="x" * 400,
+        metadata={"chunk_index": 1, "token_count": 40, "section_token_count": 90},
+    )
+    assert passage_tokens(chunk) == 40
+    # Points ingested before token counts were stored: about 4 characters a token.
+    assert passage_tokens(Document(page_content="x" * 400, metadata={})) == 101
+
+
+def test_extract_keeps_relevant_sentences_in_order():
+    tokens, budget = 300, 100
+    extracted = ContextPacker.extract({"penalty", "file", "producer"}, LONG_TEXT, tokens, budget)
+    sentences = extracted.split(" … ")
+    assert sentences[:2] == [
+        "Every producer shall file a report each month.",
+        "A producer who fails to file is liable to a civil penalty of five hundred dollars.",
+    ]
+    # Whole sentences of the section, in their original order, within the budget.
+    positions = [LONG_TEXT.index(sentence) for sentence in sentences]
+    assert positions == sorted(positions)
+    assert sum(len(sentence) for sentence in sentences) * tokens / len(LONG_TEXT) <= budget
+
+
+def test_extract_cuts_run_on_clauses_at_word_boundaries():
+    words = [f"word{i}" for i in range(200)]
+    text = " ".join(words)
+    extracted = ContextPacker.extract({"word3"}, text, tokens=400, budget=100)
+    pieces = extracted.split(" … ")
+    assert len(pieces) > 1 and pieces[0].startswith("word0 word1 word2 word3 ")
+    assert all(set(piece.split()) <= set(words) for piece in pieces)
+    assert sum(len(piece) for piece in pieces) * 400 / len(text) <= 100
+
+
+def test_pack_drops_near_duplicates_and_respects_budget():
+    documents = [
+        Document(page_content=PENALTY_TEXT, metadata={"section_id": "a", "token_count": 60}),
+        Document(page_content=PENALTY_TEXT + " ", metadata={"section_id": "b", "token_count": 60}),
+        Document(page_content=LONG_TEXT, metadata={"section_id": "c", "token_count": 300}),
+        Document(page_content="Unrelated tail.", metadata={"section_id": "d", "token_count": 5}),
+    ]
+    packer = ContextPacker(token_budget=200, max_passage_tokens=120, min_passage_tokens=10)
+    packed = packer.pack("What is the penalty for failing to file?", documents)
+
+    assert [doc.metadata["section_id"] for doc in packed] == ["a", "c", "d"]
+    assert packed[0].page_content == PENALTY_TEXT
+    assert packed[0].metadata["packed_tokens"] == 60
+    # The long section is cut to its cap and tagged with what it now costs.
+    assert len(packed[1].page_content) < len(LONG_TEXT)
+    assert "penalty" in packed[1].page_content
+    assert packed[1].metadata["packed_tokens"] <= 120
+    assert sum(doc.metadata["packed_tokens"] for doc in packed) <= 200
+
+
+def test_pack_stops_below_min_passage_tokens():
+    documents = [
+        Document(page_content=f"Passage {i} about tolls.", metadata={"token_count": 45})
+        for i in range(4)
+    ]
+    packer = ContextPacker(token_budget=100, max_passage_tokens=100, min_passage_tokens=32)
+    assert len(packer.pack("tolls", documents)) == 2
+
+
+def test_section_token_count_matches_the_section(encoding):
+    content = " ".join(f"Clause {i}: the keeper collects the toll at lock {i}." for i in range(40))
+    section = SectionRecord(
+        id=str(uuid.uuid5(uuid.NAMESPACE_URL, "ny/canal/12")),
+        number="12",
+        name="Canal tolls",
+        state="ny",
+        law_type="laws",
+        hierarchical_title="Canal Law",
+        hierarchical_name="Canal Law -> § 12 Canal tolls",
+        hierarchical_number="CAN 12",
+        content=content,
+    )
+    documents, ids = section_to_documents(section, max_tokens=64, overlap=16)
+    assert len(documents) > 1
+    assert ids[0] == section.id and len(set(ids)) == len(ids)
+    expected = count_tokens(content)
+    assert {doc.metadata["section_token_count"] for doc in documents} == {expected}
+    assert sum(doc.metadata["token_count"] for doc in documents) > expected
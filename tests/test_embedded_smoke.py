@@ -0,0 +1,189 @@
+import asyncio
+import uuid
+
+import pytest
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from research_tool_rag.db_store.answer_cache import SemanticAnswerCache
+from research_tool_rag.db_store.qdrant import QdrantDB
+from research_tool_rag.preprocessing.hierarchy import SectionRecord
+from research_tool_rag.rag import pipeline as pipeline_module
+from research_tool_rag.rag.enrich_follow_ups import FollowUpEnricher
+from research_tool_rag.rag.ingest_pipeline import section_to_documents
+
+CANAL_TEXT = " ".join(
+    f"Rule {i}. Vessels on the canal pay a toll of {i} dollars per lock and must stop at "
+    f"the gate when the keeper signals."
+    for i in range(1, 13)
+)
+# Section ids are uuids: chunk point ids are derived from them.
+CANAL_ID = str(uuid.uuid5(uuid.NAMESPACE_URL, "ny/canal/12"))
+MARKETS_ID = str(uuid.uuid5(uuid.NAMESPACE_URL, "ny/agriculture-and-markets/5"))
+SECTIONS = [
+    SectionRecord(
+        id=CANAL_ID,
+        number="12",
+        name="Canal tolls",
+        state="ny",
+        law_type="laws",
+        hierarchical_title="Canal Law",
+        hierarchical_name="Canal Law -> § 12 Canal tolls",
+        hierarchical_number="CAN 12",
+        content=CANAL_TEXT,
+    ),
+    SectionRecord(
+        id=MARKETS_ID,
+        number="5",
+        name="Market reports",
+        state="ny",
+        law_type="laws",
+        hierarchical_title="Agriculture and Markets Law",
+        hierarchical_name="Agriculture and Markets Law -> § 5 Market reports",
+        hierarchical_number="AGM 5",
+        content="Agricultural producers must file market reports with the commissioner.",
+    ),
+]
+
+
+def ingest(db: QdrantDB) -> None:
+    for section in SECTIONS:
+        documents, ids = section_to_documents(section, max_tokens=48, overlap=8)
+        vectors = db.embeddings.embed_documents([doc.page_content for doc in documents])
+        db.upsert_documents(documents, vectors, ids)
+
+
+@pytest.fixture
+def db(local_config, encoding):
+    db = QdrantDB()
+    ingest(db)
+    return db
+
+
+def test_upsert_writes_every_chunk(db):
+    chunks = [len(section_to_documents(s, max_tokens=48, overlap=8)[0]) for s in SECTIONS]
+    assert chunks[0] > 1
+    assert db.client.count(db.collection_name).count == sum(chunks)
+
+
+def test_search_sections_rebuilds_chunked_sections(db):
+    found = db.search_sections("canal vessel toll at the lock gate", k=2)
+    assert found[0].metadata["section_id"] == CANAL_ID
+    assert found[0].page_content == CANAL_TEXT
+    assert "chunk_index" not in found[0].metadata
+
+    found = asyncio.run(db.asearch_sections("canal vessel toll at the lock gate", k=2))
+    assert found[0].metadata["section_id"] == CANAL_ID
+    assert found[0].page_content == CANAL_TEXT
+
+
+def test_answer_cache_in_embedded_mode(db):
+    cache = SemanticAnswerCache(db, max_entries=2)
+    # Embedded Qdrant scans payloads, so no indexes are created.
+    assert not db.client.get_collection(cache.collection_name).payload_schema
+
+    answer = {"answer": "Tolls are set per lock.", "sources": [], "suggested_prompts": []}
+    cache.store("What are the canal tolls?", answer, "ny:*")
+    assert cache.lookup("what are the canal tolls?", "ny:*") == answer
+    assert cache.lookup("What are the canal tolls?", "ca:*") is None
+    assert asyncio.run(cache.alookup("What are the canal tolls?", "ny:*")) == answer
+
+    asyncio.run(cache.astore("Who files market reports?", answer, "ny:*"))
+    cache.store("When must vessels stop?", answer, "ny:*")
+    cache.evict()
+    assert db.client.count(cache.collection_name).count == 2
+
+
+def test_enrichment_reruns_when_the_prompt_version_changes(db):
+    llm = RunnableLambda(lambda prompt: '["Who sets the toll?", "When is it due?"]')
+    marker = db.change_marker()
+    assert FollowUpEnricher(db, llm, count=2).run()["enriched"] == 2
+    # Serving copies of the collection see the payload writes.
+    assert db.change_marker() != marker
+    # Unchanged sections with follow-ups of the current version are skipped.
+    assert FollowUpEnricher(db, llm, count=2).run()["sections"] == 0
+
+    enricher = FollowUpEnricher(db, llm, count=1)
+    assert enricher.run()["enriched"] == 2
+    found = db.search_sections("canal vessel toll at the lock gate", k=1)[0].metadata
+    assert found["follow_ups"] == ["Who sets the toll?"]
+    assert found["follow_ups_version"] == enricher.version
+
+
+def fake_llm(prompt) -> str:
+    prompt = prompt if isinstance(prompt, str) else prompt.to_string()
+    if prompt.rstrip().endswith("Action:"):
+        return "good_for_retrieval"
+    return '{"answer": "Vessels pay a toll per lock [1].", "suggested_prompts": ["Who sets it?"]}'
+
+
+@pytest.fixture
+def rag(local_config, encoding, monkeypatch):
+    local_config.llm = RunnableLambda(fake_llm)
+    local_config.suggestions_enabled = False
+    local_config.speculative_retrieval = False
+    monkeypatch.setattr(
+        pipeline_module.hub,
+        "pull",
+        lambda name: ChatPromptTemplate.from_messages([("human", "{question}\n{context}")]),
+    )
+    rag = pipeline_module.RAGPipeline()
+    ingest(rag.db)
+    return rag
+
+
+def test_pipeline_answers_and_caches(rag):
+    response = rag.run("What toll do canal vessels pay?", state_code="NY")
+    assert response["answer"] == "Vessels pay a toll per lock [1]."
+    assert response["suggested_prompts"] == ["Who sets it?"]
+    assert response["sources"][0] == "Canal Law -> § 12 Canal tolls"
+
+    calls = rag.db.embeddings.calls
+    assert rag.run("What toll do canal vessels pay?", state_code="NY") == response
+    assert rag.answer_cache.hits == 1
+    # A hit costs the question's embedding only.
+    assert rag.db.embeddings.calls == calls + 1
+
+
+def test_pipeline_streams_events(rag):
+    async def collect():
+        return [event async for event in rag.astream("Which canal vessels must stop?")]
+
+    events = asyncio.run(collect())
+    names = [name for name, _ in events]
+    assert names[0] == "classified"
+    assert "sources" in names and "token" in names
+    assert "".join(data["token"] for name, data in events if name == "token") == (
+        "Vessels pay a toll per lock [1]."
+    )
+    assert events[-1][0] == "answer"
+
+    events = asyncio.run(collect())
+    assert [name for name, _ in events] == ["cached", "sources", "answer"]
+
+
+def test_speculative_retrieval_embeds_the_question_once(local_config, encoding, monkeypatch):
+    local_config.llm = RunnableLambda(fake_llm)
+    local_config.suggestions_enabled = False
+    local_config.answer_cache_enabled = False
+    local_config.speculative_retrieval = True
+    local_config.router_enabled = True
+    monkeypatch.setattr(
+        pipeline_module.hub,
+        "pull",
+        lambda name: ChatPromptTemplate.from_messages([("human", "{question}\n{context}")]),
+    )
+    rag = pipeline_module.RAGPipeline()
+    ingest(rag.db)
+    rag.router.centroids()
+    question = "What toll do canal vessels pay?"
+    embedded = []
+    embed_query = rag.db.embeddings.embed_query
+    monkeypatch.setattr(
+        rag.db.embeddings, "embed_query", lambda text: embedded.append(text) or embed_query(text)
+    )
+
+    response = rag.run(question, state_code="NY")
+    assert response["sources"][0] == "Canal Law -> § 12 Canal tolls"
+    assert rag.speculation.stats()["used"] == 1
+    assert embedded == [question]
@@ -0,0 +1,65 @@
+import pytest
+
+from research_tool_rag.preprocessing.hierarchy import Hierarchy
+
+# Leaves at different depths, a multi-line name with markup in it, sections without a
+# version or a number, and codetext nested in other elements.
+TITLE_XML = """<?xml version="1.0"?>
+<doc><meta/><code type="Root"><number>CAN</number><name>Canal Law</name>
+  <code type="Article"><number>1</number><name>Short title;
+    <i>definitions</i> and scope</name><version>2</version>
+    <codetext>Article heading.</codetext>
+    <code type="Section"><number>1</number><name>Short title.</name><version>3</version>
+      <content><codetext>This chapter shall be known as the canal law.</codetext></content>
+    </code>
+    <code type="Part"><number>1-A</number><name>Definitions</name>
+      <code type="Section"><number>2</number><name>Definitions.</name>
+        <content><p><codetext>"Canal" means </codetext><codetext>a state canal.</codetext></p></content>
+      </code>
+      <code type="Section"><number></number><name>Unnumbered rule.</name>
+        <content><codetext>Applies to every lock.</codetext></content>
+      </code>
+    </code>
+  </code>
+  <code type="Article"><number>2</number><name>Tolls</name>
+    <code type="Section"><number>12</number><name>Canal tolls.</name><version>2</version>
+      <content><codetext>Tolls are set each season.</codetext></content>
+    </code>
+  </code>
+  <code type="Section"><number>99</number><name>Repealer.</name>
+    <content><codetext>Prior acts are repealed.</codetext></content>
+  </code>
+</code></doc>
+"""
+
+
+@pytest.fixture
+def title_path(tmp_path):
+    # Hierarchy reads the state, law type and title from the fixture directory layout.
+    directory = tmp_path.joinpath(
+        "00.raw", "ny-laws", "canal", "fixtures", "02.purged", "2024", "0420-000000", "ny"
+    )
+    path = directory / "statute" / "xml" / "canal.xml"
+    path.parent.mkdir(parents=True)
+    path.write_text(TITLE_XML, encoding="utf-8")
+    return path
+
+
+def test_iter_sections_matches_build_hierarchy(title_path):
+    built = Hierarchy(path=title_path)
+    built.build_hierarchy()
+    expected = [section.to_record() for section in built.children]
+
+    streamed = [section.to_record() for section in Hierarchy(path=title_path).iter_sections()]
+
+    assert len(expected) == 5
+    assert streamed == expected
+    # The derived fields come from the parent chain, which iter_sections never builds.
+    assert streamed[1].hierarchical_name == (
+        "Canal Law -> Short title; and scope -> Definitions -> Definitions."
+    )
+    assert streamed[1].hierarchical_number == "CAN -> 1 -> 1-A -> 2"
+    assert streamed[4].hierarchical_number == "CAN -> 99"
+    assert [record.number for record in streamed] == ["1", "2", "", "12", "99"]
+    assert len({record.id for record in streamed}) == 5
+    assert streamed[1].content == '"Canal" means a state canal.'
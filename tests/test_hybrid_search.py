@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+from research_tool_rag.db_store.qdrant import QdrantDB
+from research_tool_rag.db_store.sparse import HashedBM25
+
+SECTIONS = {
+    "ny-lab-1300-7": ("ny", "§ 1300-7. Agricultural producers must file market reports."),
+    "ny-lab-1300-8": ("ny", "§ 1300-8. Agricultural producers must keep market records."),
+    "ny-can-12": ("ny", "§ 12. Canal tolls are set by the corporation each season."),
+    "ca-agr-55": ("ca", "§ 1300-7. Agricultural market reports are filed with the state."),
+}
+
+
+def test_tokenize_keeps_section_numbers_and_drops_stopwords():
+    tokens = HashedBM25.tokenize("What is the penalty under § 1300-7 of the Labor Law, 4.1?")
+    assert tokens == ["penalty", "under", "§", "1300-7", "labor", "law", "4.1"]
+
+
+def test_query_vector_weighs_distinct_tokens_once():
+    vector = HashedBM25().embed_query("canal canal tolls")
+    assert sorted(vector.values) == [1.0, 1.0]
+    assert len(set(vector.indices)) == len(vector.indices)
+
+
+@pytest.fixture
+def db(local_config):
+    db = QdrantDB()
+    documents = [
+        Document(
+            page_content=text,
+            metadata={"section_id": section_id, "state": state, "law_type": "laws"},
+        )
+        for section_id, (state, text) in SECTIONS.items()
+    ]
+    vectors = db.embeddings.embed_documents([doc.page_content for doc in documents])
+    db.upsert_documents(documents, vectors)
+    return db
+
+
+def test_local_collection_is_hybrid(db):
+    assert db.local and db.hybrid
+
+
+def test_search_sections_fuses_bm25_hits(db):
+    # The dense fake ignores numbers, so only the BM25 half can rank these first.
+    found = db.search_sections("§ 1300-7", k=2)
+    assert {doc.metadata["section_id"] for doc in found} == {"ny-lab-1300-7", "ca-agr-55"}
+
+    found = db.search_sections("§ 1300-7", k=2, filter=db.metadata_filter("NY", "laws"))
+    assert [doc.metadata["section_id"] for doc in found][0] == "ny-lab-1300-7"
+    assert "ca-agr-55" not in {doc.metadata["section_id"] for doc in found}
+
+
+def test_async_search_matches_sync(db):
+    query = "agricultural market records"
+    sync_ids = [doc.metadata["section_id"] for doc in db.search_sections(query, k=3)]
+    hits = asyncio.run(db.asimilarity_search_with_score(query, k=3))
+    assert [doc.metadata["section_id"] for doc, _ in hits] == sync_ids
+    assert sync_ids[0] == "ny-lab-1300-8"
+    # Reciprocal rank fusion scores, best first.
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+
+    found = asyncio.run(db.asearch_sections(query, k=3))
+    assert [doc.metadata["section_id"] for doc in found] == sync_ids
+
+
+def test_search_with_a_precomputed_vector_skips_the_embedding(db):
+    query = "agricultural market records"
+    expected = [doc.metadata["section_id"] for doc in db.search_sections(query, k=3)]
+    vector = db.embeddings.embed_query(query)
+    calls = db.embeddings.calls
+    found = db.search_sections(query, k=3, vector=vector)
+    assert [doc.metadata["section_id"] for doc in found] == expected
+    found = asyncio.run(db.asearch_sections(query, k=3, vector=vector))
+    assert [doc.metadata["section_id"] for doc in found] == expected
+    assert db.embeddings.calls == calls
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from research_tool_rag.rag.ingest_manifest import IngestManifest
+
+PARAMS = {"chunk_tokens": 512, "chunk_overlap": 64, "parser_version": 1, "encoding": "cl100k_base"}
+FILE = Path("title-1.xml")
+
+
+def test_changed_parameters_re_ingest_the_file(tmp_path):
+    manifest = IngestManifest(tmp_path / "manifest.json")
+    manifest.start(FILE, "abc", PARAMS)
+    manifest.complete(FILE, sections=3)
+
+    reloaded = IngestManifest(tmp_path / "manifest.json")
+    assert reloaded.is_done(FILE, "abc", PARAMS)
+    assert not reloaded.is_done(FILE, "abd", PARAMS)
+    assert not reloaded.is_done(FILE, "abc", {**PARAMS, "chunk_tokens": 256})
+    assert not reloaded.is_done(FILE, "abc", {**PARAMS, "parser_version": 2})
+
+
+def test_recreated_or_swapped_collection_resets_the_manifest(tmp_path):
+    manifest = IngestManifest(tmp_path / "manifest.json")
+    assert not manifest.check_collection("laws_v1", points=0)
+    manifest.start(FILE, "abc", PARAMS)
+    manifest.complete(FILE, sections=3)
+
+    assert not IngestManifest(tmp_path / "manifest.json").check_collection("laws_v1", points=9)
+    # Dropped and recreated under the same name: done files but no points.
+    reloaded = IngestManifest(tmp_path / "manifest.json")
+    assert reloaded.check_collection("laws_v1", points=0)
+    assert not reloaded.is_done(FILE, "abc", PARAMS)
+
+    manifest = IngestManifest(tmp_path / "manifest.json")
+    manifest.start(FILE, "abc", PARAMS)
+    manifest.complete(FILE, sections=3)
+    # The alias now points at another collection.
+    assert IngestManifest(tmp_path / "manifest.json").check_collection("laws_v2", points=9)
+    assert IngestManifest(tmp_path / "manifest.json").collection == "laws_v2"
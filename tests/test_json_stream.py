@@ -0,0 +1,66 @@
+import json
+
+from research_tool_rag.utils.json_stream import AnswerStreamParser
+
+
+def feed_all(pieces):
+    parser = AnswerStreamParser()
+    streamed = "".join(parser.feed(piece) for piece in pieces)
+    return parser, streamed
+
+
+def test_streams_answer_and_parses_prompts():
+    text = json.dumps({"answer": "Fines up to $500.", "suggested_prompts": ["Who enforces it?"]})
+    parser, streamed = feed_all(text[i : i + 3] for i in range(0, len(text), 3))
+    assert streamed == "Fines up to $500."
+    assert parser.done
+    assert parser.result() == ("Fines up to $500.", ["Who enforces it?"])
+
+
+def test_unicode_escape_split_across_chunks():
+    parser, streamed = feed_all(['{"answer": "caf\\u00', "e9 \\ud83d", '\\ude00"}'])
+    assert streamed == "café 😀"
+    assert parser.result() == ("café 😀", [])
+
+
+def test_code_fence_and_preamble_are_ignored():
+    text = 'Here you go:\n```json\n{"answer": "Yes.", "suggested_prompts": []}\n```\n'
+    parser, streamed = feed_all([text])
+    assert streamed == "Yes."
+    assert parser.result() == ("Yes.", [])
+
+
+def test_truncated_output_keeps_closed_strings():
+    parser, streamed = feed_all(['{"answer": "Done.", "suggested_prompts": ["One?", "Tw'])
+    assert streamed == "Done."
+    assert not parser.done
+    assert parser.result() == ("Done.", ["One?"])
+
+
+def test_truncated_answer_has_no_result():
+    parser, streamed = feed_all(['{"answer": "Half an ans'])
+    assert streamed == "Half an ans"
+    assert parser.result() == (None, [])
+
+
+def test_missing_comma_does_not_overwrite_answer():
+    parser, streamed = feed_all(['{"answer": "First." "Second." "suggested_prompts": ["Q?"]}'])
+    assert streamed == "First."
+    assert parser.result() == ("First.", [])
+
+
+def test_repeated_answer_key_keeps_the_first():
+    parser, streamed = feed_all(['{"answer": "First.", "answer": "Second."}'])
+    assert streamed == "First."
+    assert parser.result() == ("First.", [])
+
+
+def test_value_after_nested_container_is_not_the_answer():
+    parser, streamed = feed_all(['{"answer": ["a"] "b", "suggested_prompts": []}'])
+    assert streamed == ""
+    assert parser.answer is None
+
+
+def test_text_after_the_object_is_ignored():
+    parser, _ = feed_all(['{"answer": "A."} {"answer": "B."}'])
+    assert parser.result() == ("A.", [])
@@ -0,0 +1,33 @@
+from research_tool_rag.db_store.embedding_cache import CachedEmbeddings
+from research_tool_rag.utils.kv_store import SqliteKVStore
+
+
+def test_eviction_keeps_recent_entries_without_counting_every_put(tmp_path):
+    store = SqliteKVStore(tmp_path / "kv.sqlite", max_entries=100)
+    counts = []
+    store._conn.set_trace_callback(
+        lambda statement: counts.append(statement) if "COUNT(*)" in statement else None
+    )
+    for i in range(1000):
+        store.put(f"key{i}", b"value")
+    assert len(store) <= 100
+    assert store.get("key999") == b"value" and store.get("key0") is None
+    # Evicting down to 90 rows leaves 10 puts before the next count.
+    assert len(counts) <= 1000 // 10 + 1
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    store = SqliteKVStore(tmp_path / "kv.sqlite")
+    store.put("old", b"value", ttl=-1)
+    store.put("new", b"value")
+    assert store.get_many(["old", "new"]) == {"new": b"value"}
+
+
+def test_embedding_cache_counts_hits_and_misses_per_text(local_config, tmp_path):
+    embeddings = local_config.model_db_config["embeddings"]
+    cache = CachedEmbeddings(embeddings, SqliteKVStore(tmp_path / "kv.sqlite"))
+    cache.embed_documents(["canal tolls", "canal tolls", "vessel permits"])
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert cache.embeddings.calls == 2
+    cache.embed_documents(["canal tolls", "lock hours"])
+    assert (cache.hits, cache.misses) == (1, 4)
@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from research_tool_rag.db_store import numpy_index
+from research_tool_rag.db_store.numpy_index import NumpyDB, NumpyIndex, open_db
+from research_tool_rag.db_store.qdrant import QdrantDB
+
+SECTIONS = {
+    "ny-can-12": ("ny", "Canal tolls are set by the corporation each season."),
+    "ny-agm-5": ("ny", "Agricultural producers must file market reports."),
+    "ca-agr-55": ("ca", "Agricultural market reports are filed with the state."),
+}
+
+
+@pytest.fixture
+def collection(local_config, tmp_path):
+    local_config.numpy_index_dir = tmp_path
+    db = QdrantDB()
+    documents = [
+        Document(
+            page_content=text,
+            metadata={"section_id": section_id, "state": state, "law_type": "laws"},
+        )
+        for section_id, (state, text) in SECTIONS.items()
+    ]
+    vectors = db.embeddings.embed_documents([doc.page_content for doc in documents])
+    db.upsert_documents(documents, vectors)
+    return db
+
+
+def test_small_dense_collections_are_served_from_numpy(collection, local_config):
+    # Hybrid: NumPy would drop BM25 fusion, so only when listed explicitly.
+    assert collection.hybrid
+    assert isinstance(open_db(), QdrantDB)
+    local_config.numpy_index_collections = [collection.collection_name]
+    assert isinstance(open_db(), NumpyDB)
+
+    local_config.numpy_index_collections = ()
+    local_config.hybrid_retrieval = False
+    assert isinstance(open_db(), NumpyDB)
+    local_config.numpy_index_max_points = 2
+    assert isinstance(open_db(), QdrantDB)
+    local_config.numpy_index_max_points = 0
+    assert isinstance(open_db(), QdrantDB)
+
+
+def test_search_from_the_index(collection, local_config):
+    local_config.numpy_index_collections = [collection.collection_name]
+    db = open_db()
+    found = db.search_sections("agricultural market reports", k=2)
+    assert {doc.metadata["section_id"] for doc in found} == {"ny-agm-5", "ca-agr-55"}
+    found = asyncio.run(
+        db.asearch_sections("agricultural market reports", k=2, filter=db.metadata_filter("CA"))
+    )
+    assert [doc.metadata["section_id"] for doc in found] == ["ca-agr-55"]
+
+
+def test_saved_index_is_reused(collection, local_config, monkeypatch):
+    local_config.numpy_index_collections = [collection.collection_name]
+    first = open_db().index
+
+    def rebuild(*args, **kwargs):
+        raise AssertionError("index rebuilt")
+
+    monkeypatch.setattr(NumpyIndex, "from_qdrant", rebuild)
+    assert open_db().index.fingerprint == first.fingerprint
+
+
+def follow_ups(db) -> dict:
+    hits = db.similarity_search_with_score("canal tolls", k=3)
+    return {doc.metadata["section_id"]: doc.metadata.get("follow_ups") for doc, _ in hits}
+
+
+def test_payload_writes_are_picked_up(collection, local_config):
+    local_config.numpy_index_collections = [collection.collection_name]
+    db = open_db()
+    assert not db.refresh()
+    collection.client.set_payload(
+        collection_name=collection.collection_name,
+        payload={"follow_ups": ["Who sets the tolls?"]},
+        points=collection._section_filter(["ny-can-12"]),
+        key=collection.vector_store.metadata_payload_key,
+        wait=True,
+    )
+    collection.mark_changed()
+    assert follow_ups(db)["ny-can-12"] is None
+    assert db.refresh()
+    assert follow_ups(db)["ny-can-12"] == ["Who sets the tolls?"]
+
+
+def test_searches_refresh_in_the_background(collection, local_config, monkeypatch):
+    local_config.numpy_index_collections = [collection.collection_name]
+    db = open_db()
+    collection.client.set_payload(
+        collection_name=collection.collection_name,
+        payload={"follow_ups": ["Who sets the tolls?"]},
+        points=collection._section_filter(["ny-can-12"]),
+        key=collection.vector_store.metadata_payload_key,
+        wait=True,
+    )
+    collection.mark_changed()
+    monkeypatch.setattr(NumpyDB, "REFRESH_INTERVAL", 0.0)
+    deadline = time.monotonic() + 10
+    while follow_ups(db)["ny-can-12"] is None:
+        assert time.monotonic() < deadline, "index was not refreshed"
+        time.sleep(0.05)
+
+
+def test_fingerprint_tracks_count_and_change_marker(collection, monkeypatch):
+    name = collection.collection_name
+    before = numpy_index._fingerprint(collection, name)
+    assert numpy_index._fingerprint(collection, name) == before
+    collection.mark_changed()
+    marked = numpy_index._fingerprint(collection, name)
+    assert marked != before
+    collection.client.delete(name, points_selector=collection._section_filter(["ny-agm-5"]))
+    assert numpy_index._fingerprint(collection, name) != marked
+
+    # Never a scan of the points, however large the collection.
+    def scroll(*args, **kwargs):
+        raise AssertionError("collection scanned")
+
+    monkeypatch.setattr(collection.client, "scroll", scroll)
+    numpy_index._fingerprint(collection, name)
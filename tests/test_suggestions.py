@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+from research_tool_rag.rag.suggestions import PENDING, FollowUpSuggestions, parse_prompts
+
+
+def test_parse_prompts_ignores_fences_and_blanks():
+    text = '```json\n["What is the fine?", " ", "Who enforces it?"]\n```'
+    assert parse_prompts(text) == ["What is the fine?", "Who enforces it?"]
+    assert parse_prompts("no list here") == []
+
+
+def test_result_waits_for_worker_thread_jobs():
+    suggestions = FollowUpSuggestions(llm=None)
+    release = threading.Event()
+    suggestions_id = suggestions.submit(lambda: release.wait() and ["Next?"])
+    assert suggestions.result(suggestions_id, timeout=0.05) is PENDING
+    release.set()
+    assert suggestions.result(suggestions_id, timeout=5) == ["Next?"]
+    assert suggestions.result("unknown") is None
+
+
+def test_failed_job_has_no_prompts():
+    suggestions = FollowUpSuggestions(llm=None)
+    suggestions_id = suggestions.submit(lambda: 1 / 0)
+    assert suggestions.result(suggestions_id, timeout=5) == []
+
+
+def test_aresult_times_out_as_pending():
+    async def scenario():
+        suggestions = FollowUpSuggestions(llm=None)
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+            return ["Next?"]
+
+        suggestions_id = suggestions.acreate(job())
+        assert await suggestions.aresult(suggestions_id, timeout=0.05) is PENDING
+        # Sync callers on the loop's thread never block on a loop task.
+        assert suggestions.result(suggestions_id, timeout=5) is PENDING
+        release.set()
+        assert await suggestions.aresult(suggestions_id, timeout=5) == ["Next?"]
+        assert suggestions.result(suggestions_id) == ["Next?"]
+
+    asyncio.run(scenario())